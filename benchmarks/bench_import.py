@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""Measure cold-start import time of the CLI and server modules.
+
+Each sample imports the module in a fresh interpreter with no GEMINI_API_KEY
+set, then loads a text input the way a text-only CLI run does. Exits non-zero
+when the median exceeds --max-seconds or a lazily loaded dependency was
+imported anyway, so it can guard cold start in CI.
+
+Usage: python benchmarks/bench_import.py [--module main] [--samples 5] [--max-seconds 5]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src')
+
+# Only needed for PDFs, URLs, images or actual Gemini calls
+LAZY_MODULES = [
+    'pymupdf',
+    'google.generativeai',
+    'google.genai',
+    'llama_index.readers.web',
+    'llama_index.llms.google_genai',
+    'llama_index.embeddings.google_genai',
+]
+
+PROBE = """
+import json, sys, time
+started = time.perf_counter()
+import {module}
+imported = time.perf_counter() - started
+import main
+list(main.iter_from_type("text", "hello"))
+print(json.dumps({{
+    "import_seconds": imported,
+    "loaded": [name for name in {lazy!r} if name in sys.modules],
+}}))
+"""
+
+
+def sample(module):
+    env = {k: v for k, v in os.environ.items() if k != 'GEMINI_API_KEY'}
+    output = subprocess.run(
+        [sys.executable, '-c', PROBE.format(module=module, lazy=LAZY_MODULES)],
+        cwd=SRC_DIR, env=env, capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--module', default='main', choices=['main', 'app'])
+    parser.add_argument('--samples', type=int, default=5)
+    parser.add_argument('--max-seconds', type=float, default=5.0)
+    args = parser.parse_args()
+
+    samples = [sample(args.module) for _ in range(args.samples)]
+    times = [s['import_seconds'] for s in samples]
+    loaded = sorted({name for s in samples for name in s['loaded']})
+    median = statistics.median(times)
+    print(json.dumps({
+        'module': args.module,
+        'median_seconds': round(median, 3),
+        'min_seconds': round(min(times), 3),
+        'max_seconds': round(max(times), 3),
+        'eagerly_loaded': loaded,
+    }, indent=2))
+
+    if median > args.max_seconds or loaded:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+"""Offline end-to-end benchmark with deterministic Gemini stand-ins.
+
+Measures ingestion throughput (load_from_type + build_query_engine), query
+latency percentiles, short keyword lookups that skip the query embedding,
+batched question throughput, /api/add-context cost as a session's sources
+grow, and memory held by many concurrent sessions in the Flask app, with
+distinct and identical uploads. Needs no API key or network; set
+--llm-latency-ms / --embed-latency-ms to simulate the API.
+
+Usage: python benchmarks/bench_pipeline.py [--output results.json] [--quick]
+"""
+
+import argparse
+import atexit
+import gc
+import json
+import os
+import re
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pymupdf
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.append(os.path.join(ROOT, 'src'))
+
+# Cold caches every run, in a directory removed on exit unless CACHE_DIR is
+# given, and the fakes are not subject to Gemini quotas
+if 'CACHE_DIR' not in os.environ:
+    os.environ['CACHE_DIR'] = tempfile.mkdtemp(prefix='bench-cache-')
+    atexit.register(shutil.rmtree, os.environ['CACHE_DIR'], ignore_errors=True)
+os.environ.setdefault('GEMINI_REQUESTS_PER_MINUTE', '100000000')
+os.environ.setdefault('GEMINI_TOKENS_PER_MINUTE', '100000000000')
+
+# From src/ and benchmarks/, imported once the environment above is set
+import main as pipeline  # noqa: E402
+import metrics  # noqa: E402
+from app import app, sessions  # noqa: E402
+from fakes import FakeEmbedding, FakeGenerativeModel, FakeLLM  # noqa: E402
+
+SAMPLE_TEXT_PATH = os.path.join(ROOT, 'sample_long_text.txt')
+
+
+def percentiles(latencies_ms):
+    return {
+        'count': len(latencies_ms),
+        'mean_ms': round(float(np.mean(latencies_ms)), 3),
+        'p50_ms': round(float(np.percentile(latencies_ms, 50)), 3),
+        'p95_ms': round(float(np.percentile(latencies_ms, 95)), 3),
+        'p99_ms': round(float(np.percentile(latencies_ms, 99)), 3),
+    }
+
+
+def make_pdf(path, text, pages):
+    """Write a ``pages``-page PDF, each page holding a copy of ``text``."""
+    with pymupdf.open() as pdf:
+        for number in range(pages):
+            page = pdf.new_page()
+            page.insert_textbox(page.rect + (36, 36, -36, -36), f"Page {number + 1}\n{text}", fontsize=7)
+        pdf.save(path)
+
+
+def bench_ingestion(text, pdf_path):
+    results = {}
+    for input_type, value in (('text', text), ('pdf', pdf_path)):
+        started = time.perf_counter()
+        docs = pipeline.load_from_type(input_type, value)
+        loaded = time.perf_counter()
+        # build_query_engine, keeping the index to report its size
+        index = pipeline.build_index(docs)
+        index.as_query_engine()
+        indexed = time.perf_counter()
+        chars = sum(len(doc.text) for doc in docs)
+        results[input_type] = {
+            'documents': len(docs),
+            'characters': chars,
+            'nodes': index.vector_store.node_count,
+            'load_seconds': round(loaded - started, 3),
+            'index_seconds': round(indexed - loaded, 3),
+            'chars_per_second': round(chars / (indexed - started), 1),
+        }
+    return results
+
+
+def bench_queries(text, questions):
+    engine = pipeline.build_query_engine(pipeline.load_from_type('text', text))
+    latencies = []
+    for question in questions:
+        started = time.perf_counter()
+        str(engine.query(question))
+        latencies.append((time.perf_counter() - started) * 1000)
+    return percentiles(latencies)
+
+
+def bench_keyword_queries(text, paragraphs, count):
+    """Lookups of each paragraph's longest word, and how many were answered without an embedding call."""
+    engine = pipeline.build_query_engine(pipeline.load_from_type('text', text))
+    terms = [max(re.findall(r"[A-Za-z]\w+", p), key=len) for p in paragraphs]
+    before = metrics.counters['rag_keyword_fast_path_total']
+    latencies = []
+    for i in range(count):
+        started = time.perf_counter()
+        str(engine.query(terms[i % len(terms)]))
+        latencies.append((time.perf_counter() - started) * 1000)
+    return {**percentiles(latencies), 'fast_path_queries': metrics.counters['rag_keyword_fast_path_total'] - before}
+
+
+def bench_query_batch(text, questions):
+    """The same questions through answer_questions: one embedding pass, concurrent synthesis."""
+    index = pipeline.build_index(pipeline.load_from_type('text', text))
+    _, stats = pipeline.answer_questions(index, questions)
+    return stats
+
+
+def wait_for_job(client, job_id, timeout=300):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = client.get(f'/api/jobs/{job_id}').get_json()
+        if job.get('status') in ('done', 'failed'):
+            return job
+        time.sleep(0.01)
+    raise TimeoutError(f'job {job_id} did not finish')
+
+
+def bench_add_context(client, paragraphs, steps):
+    session_id = client.post('/api/upload', json={'text': paragraphs[0]}).get_json()['session_id']
+    wait_for_job(client, session_id)
+    results = []
+    for step in range(steps):
+        text = paragraphs[(step + 1) % len(paragraphs)] + f"\nAddition {step + 1}."
+        started = time.perf_counter()
+        response = client.post('/api/add-context', json={'session_id': session_id, 'text': text}).get_json()
+        elapsed = (time.perf_counter() - started) * 1000
+        if not response.get('success'):
+            raise RuntimeError(response.get('error'))
+        session = sessions.get(session_id)
+        results.append({
+            'sources': step + 2,
+            'nodes': session.node_count,
+            'latency_ms': round(elapsed, 3),
+        })
+    return results
+
+
+def bench_sessions(client, text, count, identical=False):
+    """Memory held by ``count`` sessions; with ``identical`` they all upload the same text."""
+    gc.collect()
+    tracemalloc.start()
+    baseline, _ = tracemalloc.get_traced_memory()
+    started = time.perf_counter()
+    session_ids = [
+        client.post('/api/upload', json={'text': text if identical else f"Session {i}.\n{text}"}).get_json()['session_id']
+        for i in range(count)
+    ]
+    for session_id in session_ids:
+        wait_for_job(client, session_id)
+    elapsed = time.perf_counter() - started
+    gc.collect()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    stats = sessions.stats()
+    return {
+        'sessions': count,
+        'seconds': round(elapsed, 3),
+        'traced_mb': round((current - baseline) / 1024 / 1024, 2),
+        'traced_peak_mb': round((peak - baseline) / 1024 / 1024, 2),
+        'per_session_kb': round((current - baseline) / count / 1024, 1),
+        'store': stats,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--llm-latency-ms', type=float, default=0.0)
+    parser.add_argument('--token-latency-ms', type=float, default=0.0)
+    parser.add_argument('--embed-latency-ms', type=float, default=0.0)
+    parser.add_argument('--text-copies', type=int, default=20, help='copies of sample_long_text.txt to ingest')
+    parser.add_argument('--pdf-pages', type=int, default=50)
+    parser.add_argument('--queries', type=int, default=50)
+    parser.add_argument('--add-context-steps', type=int, default=10)
+    parser.add_argument('--sessions', type=int, default=20)
+    parser.add_argument('--quick', action='store_true', help='tiny sizes, for smoke tests')
+    parser.add_argument('--output', help='also write the JSON results to this file')
+    args = parser.parse_args()
+    if args.quick:
+        args.text_copies, args.pdf_pages, args.queries = 2, 3, 5
+        args.add_context_steps, args.sessions = 2, 2
+
+    pipeline.configure_models(
+        llm=FakeLLM(latency_ms=args.llm_latency_ms, token_latency_ms=args.token_latency_ms),
+        embed_model=FakeEmbedding(latency_ms=args.embed_latency_ms),
+        gemini_model=FakeGenerativeModel(latency_ms=args.llm_latency_ms),
+    )
+    client = app.test_client()
+
+    with open(SAMPLE_TEXT_PATH) as f:
+        sample = f.read()
+    paragraphs = [p for p in sample.split('\n\n') if p.strip()]
+    text = '\n\n'.join([sample] * args.text_copies)
+    questions = [p.split('.')[0] + '?' for p in paragraphs]
+    questions = [questions[i % len(questions)] for i in range(args.queries)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        pdf_path = os.path.join(tmp, 'bench.pdf')
+        make_pdf(pdf_path, sample, args.pdf_pages)
+        results = {
+            'config': {k: v for k, v in vars(args).items() if k != 'output'},
+            'ingestion': bench_ingestion(text, pdf_path),
+            'query': bench_queries(text, questions),
+            'keyword_query': bench_keyword_queries(sample, paragraphs, args.queries),
+            'query_batch': bench_query_batch(text, questions),
+            'add_context': bench_add_context(client, paragraphs, args.add_context_steps),
+            'sessions': bench_sessions(client, sample, args.sessions),
+            'shared_sessions': bench_sessions(client, sample, args.sessions, identical=True),
+        }
+
+    output = json.dumps(results, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+
+
+if __name__ == '__main__':
+    main()
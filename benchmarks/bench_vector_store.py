@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""Compare SimpleVectorStore with NumpyVectorStore on memory and top-k latency.
+
+Usage: python benchmarks/bench_vector_store.py [--nodes 5000] [--dim 768] [--queries 200]
+"""
+
+import argparse
+import gc
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import numpy as np
+from llama_index.core.schema import TextNode
+from llama_index.core.vector_stores import SimpleVectorStore
+from llama_index.core.vector_stores.types import VectorStoreQuery
+
+from vector_store import NumpyVectorStore
+
+
+def build(store, vectors):
+    """Add one node per row and return the bytes the store retains afterwards."""
+    gc.collect()
+    tracemalloc.start()
+    # Nodes and their embedding lists are created under tracing, then dropped,
+    # so only what the store keeps alive is counted
+    nodes = [TextNode(id_=str(i), text="", embedding=v.tolist()) for i, v in enumerate(vectors)]
+    store.add(nodes)
+    del nodes
+    gc.collect()
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return retained
+
+
+def time_queries(store, queries, top_k):
+    latencies = []
+    for query in queries:
+        started = time.perf_counter()
+        store.query(VectorStoreQuery(query_embedding=query, similarity_top_k=top_k))
+        latencies.append((time.perf_counter() - started) * 1000)
+    return {
+        'p50_ms': round(float(np.percentile(latencies, 50)), 3),
+        'p95_ms': round(float(np.percentile(latencies, 95)), 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--nodes', type=int, default=5000)
+    parser.add_argument('--dim', type=int, default=768)
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--top-k', type=int, default=2)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    vectors = rng.normal(size=(args.nodes, args.dim)).astype(np.float32)
+    queries = rng.normal(size=(args.queries, args.dim)).astype(np.float32).tolist()
+
+    results = {}
+    stores = {
+        'simple': SimpleVectorStore(),
+        'numpy_float32': NumpyVectorStore(),
+        'numpy_int8': NumpyVectorStore(quantization='int8'),
+    }
+    for name, store in stores.items():
+        memory = build(store, vectors)
+        results[name] = {'memory_mb': round(memory / 1024 / 1024, 2), **time_queries(store, queries, args.top_k)}
+
+    print(json.dumps({'nodes': args.nodes, 'dim': args.dim, 'results': results}, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+"""Deterministic local stand-ins for Gemini, with configurable artificial latency."""
+
+import hashlib
+import re
+import time
+from types import SimpleNamespace
+
+import numpy as np
+from llama_index.core.base.embeddings.base import BaseEmbedding
+from llama_index.core.llms import CompletionResponse, CustomLLM, LLMMetadata
+
+
+def _words(text):
+    return re.findall(r"\w+", text.lower())
+
+
+class FakeLLM(CustomLLM):
+    """Answers with the first words of the retrieved context, one token per word."""
+
+    latency_ms: float = 0.0
+    token_latency_ms: float = 0.0
+    answer_words: int = 30
+
+    @classmethod
+    def class_name(cls):
+        return "FakeLLM"
+
+    @property
+    def metadata(self):
+        return LLMMetadata(model_name="fake-llm")
+
+    def _answer(self, prompt):
+        # Answer from the retrieved context rather than echoing the template
+        context = prompt.split("---------------------")[1] if "---------------------" in prompt else prompt
+        return " ".join(context.split()[:self.answer_words])
+
+    def complete(self, prompt, formatted=False, **kwargs):
+        answer = self._answer(prompt)
+        time.sleep((self.latency_ms + self.token_latency_ms * len(answer.split())) / 1000)
+        return CompletionResponse(text=answer)
+
+    def stream_complete(self, prompt, formatted=False, **kwargs):
+        answer = self._answer(prompt)
+
+        def gen():
+            time.sleep(self.latency_ms / 1000)
+            text = ""
+            for word in answer.split():
+                time.sleep(self.token_latency_ms / 1000)
+                delta = word if not text else f" {word}"
+                text += delta
+                yield CompletionResponse(text=text, delta=delta)
+
+        return gen()
+
+
+class FakeEmbedding(BaseEmbedding):
+    """Hashed bag-of-words vectors, so texts sharing words land close together."""
+
+    dim: int = 256
+    latency_ms: float = 0.0
+
+    @classmethod
+    def class_name(cls):
+        return "FakeEmbedding"
+
+    def _vector(self, text):
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for word in _words(text):
+            digest = hashlib.blake2b(word.encode(), digest_size=4).digest()
+            vector[int.from_bytes(digest, "little") % self.dim] += 1.0
+        norm = np.linalg.norm(vector)
+        return (vector / norm if norm else vector).tolist()
+
+    def _get_query_embedding(self, query):
+        time.sleep(self.latency_ms / 1000)
+        return self._vector(query)
+
+    async def _aget_query_embedding(self, query):
+        return self._get_query_embedding(query)
+
+    def _get_text_embedding(self, text):
+        return self._get_text_embeddings([text])[0]
+
+    def _get_text_embeddings(self, texts):
+        return self._embed_texts(texts)
+
+    def _embed_texts(self, texts, task_type=None):
+        # One simulated round trip per batch, like GoogleGenAIEmbedding's batched call
+        time.sleep(self.latency_ms / 1000)
+        return [self._vector(text) for text in texts]
+
+
+class FakeGenerativeModel:
+    """Stands in for ``genai.GenerativeModel`` in OCR, summaries and the Gemini fallback."""
+
+    def __init__(self, latency_ms=0.0):
+        self.latency_ms = latency_ms
+
+    def generate_content(self, contents, **kwargs):
+        time.sleep(self.latency_ms / 1000)
+        parts = contents if isinstance(contents, list) else [contents]
+        text = " ".join(p for p in parts if isinstance(p, str))
+        return SimpleNamespace(text="Summary: " + " ".join(text.split()[-40:]))
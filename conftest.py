@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+sys.path.append('src')
+
+# main and app read CACHE_DIR when they are imported; keep this run's caches out of the repo
+_CACHE_DIR = tempfile.mkdtemp(prefix='test-cache-')
+os.environ.setdefault('CACHE_DIR', _CACHE_DIR)
+
+
+def pytest_unconfigure(config):
+    shutil.rmtree(_CACHE_DIR, ignore_errors=True)
+
+
+class FakeGemini:
+    """GenerativeModel stand-in that records its prompts and numbers its replies."""
+
+    def __init__(self):
+        self.prompts = []
+        self._lock = threading.Lock()
+
+    def generate_content(self, contents, **kwargs):
+        with self._lock:
+            self.prompts.append(contents)
+            return SimpleNamespace(text=f"Response {len(self.prompts)}.")
+
+
+@pytest.fixture
+def gemini():
+    return FakeGemini()
+
+
+@pytest.fixture
+def pipeline(tmp_path, monkeypatch, gemini):
+    """main with offline models and empty caches under tmp_path.
+
+    The LlamaIndex settings and instrumentation that configure_models installs
+    are process-wide, so they are put back afterwards.
+    """
+    from llama_index.core import Settings
+    from llama_index.core.embeddings import MockEmbedding
+    from llama_index.core.instrumentation import get_dispatcher
+    from llama_index.core.llms import MockLLM
+
+    import main
+    from embedding_cache import EmbeddingCache
+    from text_cache import TextCache
+
+    saved = Settings._llm, Settings._embed_model, Settings._callback_manager
+    dispatcher = get_dispatcher()
+    handlers = list(dispatcher.event_handlers)
+    monkeypatch.setattr(main, 'CACHE_DIR', str(tmp_path))
+    monkeypatch.setattr(main, 'embedding_cache', EmbeddingCache(str(tmp_path / 'embeddings'), main.EMBED_MODEL_NAME))
+    monkeypatch.setattr(main, 'ocr_cache', TextCache(str(tmp_path / 'ocr')))
+    monkeypatch.setattr(main, 'summary_cache', TextCache(str(tmp_path / 'summaries')))
+    monkeypatch.setattr(main, '_index_cache', None)
+    monkeypatch.setattr(main, '_web_fetcher', None)
+    monkeypatch.setattr(main, '_gemini_models', {})
+    monkeypatch.setattr(main, '_models_configured', False)
+    monkeypatch.setattr(main, '_instrumented', False)
+    main.configure_models(llm=MockLLM(max_tokens=6), embed_model=MockEmbedding(embed_dim=8), gemini_model=gemini)
+    try:
+        yield main
+    finally:
+        Settings._llm, Settings._embed_model, Settings._callback_manager = saved
+        dispatcher.event_handlers = handlers
+
+
+@pytest.fixture
+def client(pipeline, tmp_path, monkeypatch):
+    """Flask test client over a fresh session store and shared-source registry."""
+    import app
+    from session_store import SessionStore
+    from shared_sources import SharedSourceRegistry
+
+    sources = SharedSourceRegistry(str(tmp_path / 'shared'))
+    monkeypatch.setattr(app, 'sources', sources)
+    monkeypatch.setattr(app, 'sessions', SessionStore(
+        str(tmp_path / 'sessions'), memory_budget_bytes=10**9, idle_ttl_seconds=3600, sources=sources
+    ))
+    return app.app.test_client()
+
+
+@pytest.fixture
+def upload(client):
+    """Upload text (or a JSON body such as ``url=...``) and wait for its background ingestion; returns the session id."""
+    def upload_json(text=None, **data):
+        session_id = client.post('/api/upload', json={'text': text} if text is not None else data).get_json()['session_id']
+        deadline = time.monotonic() + 30
+        while client.get(f'/api/jobs/{session_id}').get_json()['status'] not in ('done', 'failed'):
+            assert time.monotonic() < deadline, "ingestion timed out"
+            time.sleep(0.02)
+        return session_id
+
+    return upload_json
@@ -0,0 +1,129 @@
+import os
+import re
+import threading
+import time
+from collections import Counter, OrderedDict
+
+import numpy as np
+
+ANSWER_CACHE_MAX_ENTRIES = int(os.environ.get("ANSWER_CACHE_MAX_ENTRIES", "256"))
+ANSWER_CACHE_TTL_SECONDS = int(os.environ.get("ANSWER_CACHE_TTL_SECONDS", "3600"))
+ANSWER_CACHE_SIMILARITY = float(os.environ.get("ANSWER_CACHE_SIMILARITY", "0.95"))
+
+# Process-wide counters across every session's cache, for measuring hit rate
+totals = Counter()
+_totals_lock = threading.Lock()
+
+
+def _count(name):
+    with _totals_lock:
+        totals[name] += 1
+
+
+def normalize_question(question):
+    return " ".join(re.sub(r"[^\w\s]", "", question.lower()).split())
+
+
+def key_terms(question):
+    """Numbers, identifiers and capitalized names, which embeddings barely tell apart."""
+    words = re.findall(r"[\w-]+", question)
+    return frozenset(
+        word.lower() for i, word in enumerate(words)
+        if any(c.isdigit() for c in word) or (i > 0 and word[0].isupper() and word != "I")
+    )
+
+
+class AnswerCache:
+    """Per-session answers, matched on the exact question first, then by embedding similarity."""
+
+    def __init__(self, max_entries=ANSWER_CACHE_MAX_ENTRIES, ttl_seconds=ANSWER_CACHE_TTL_SECONDS,
+                 similarity_threshold=ANSWER_CACHE_SIMILARITY):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.similarity_threshold = similarity_threshold
+        # Bumped whenever the index changes, so answers computed against the
+        # old index are not stored after an invalidation
+        self.generation = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _expire(self):
+        cutoff = time.monotonic() - self.ttl_seconds
+        for key, entry in list(self._entries.items()):
+            if entry["created"] < cutoff:
+                del self._entries[key]
+
+    def get_exact(self, question):
+        key = normalize_question(question)
+        with self._lock:
+            self._expire()
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+        _count("exact_hits")
+        return entry["answer"]
+
+    def get_similar(self, question, embedding):
+        """Return the answer to the closest cached question above the threshold, if any.
+
+        Only questions with the same key terms are considered, so "revenue in
+        2022" never reuses the answer to "revenue in 2023".
+        """
+        terms = key_terms(question)
+        with self._lock:
+            self._expire()
+            candidates = [
+                (k, e) for k, e in self._entries.items()
+                if e["embedding"] is not None and e["terms"] == terms
+            ]
+            if embedding is None or not candidates:
+                _count("misses")
+                return None
+            matrix = np.stack([e["embedding"] for _, e in candidates])
+            query = np.asarray(embedding, dtype=np.float32)
+            query /= np.linalg.norm(query) or 1.0
+            scores = matrix @ query
+            best = int(np.argmax(scores))
+            if scores[best] < self.similarity_threshold:
+                _count("misses")
+                return None
+            key, entry = candidates[best]
+            self._entries.move_to_end(key)
+        _count("semantic_hits")
+        return entry["answer"]
+
+    def put(self, question, embedding, answer, generation=None):
+        if embedding is not None:
+            embedding = np.asarray(embedding, dtype=np.float32)
+            embedding /= np.linalg.norm(embedding) or 1.0
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+            key = normalize_question(question)
+            self._entries[key] = {
+                "answer": answer, "embedding": embedding, "terms": key_terms(question), "created": time.monotonic()
+            }
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self.generation += 1
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+def stats():
+    with _totals_lock:
+        lookups = totals["exact_hits"] + totals["semantic_hits"] + totals["misses"]
+        hits = totals["exact_hits"] + totals["semantic_hits"]
+        return {
+            "exact_hits": totals["exact_hits"],
+            "semantic_hits": totals["semantic_hits"],
+            "misses": totals["misses"],
+            "hit_rate": round(hits / lookups, 3) if lookups else None,
+        }
@@ -1,29 +1,285 @@
-from flask import Flask, request, jsonify, render_template
+from flask import Flask, request, jsonify, render_template, Response, stream_with_context, g
 from flask_cors import CORS
+from llama_index.core import QueryBundle
 import os
+import json
+import queue
+import threading
+import time
 import uuid
+from concurrent.futures import ThreadPoolExecutor
+from werkzeug.exceptions import RequestEntityTooLarge
 from werkzeug.utils import secure_filename
-import tempfile
 from main import (
-    load_from_type, build_query_engine, generate_summary, generate_preview,
-    search_web_with_google, answer_with_gemini, is_answer_not_found
+    load_from_type, iter_from_type, build_index, insert_documents, generate_summary,
+    merge_summaries, generate_preview, answer_from_web, answer_questions,
+    is_answer_not_found, embed_query, embed_queries, embedding_cache, ocr_cache, summary_cache,
+    gemini_limiter, configure_models, get_web_fetcher, source_key, CACHE_DIR, SERVING_MODE
 )
+from session_catalog import SessionCatalog
+from session_store import SessionStore
+from shared_sources import SharedSource, SharedSourceRegistry
+from jobs import IngestionQueue
+from uploads import ChunkedUploads, SpooledUploadRequest
+import answer_cache
+import compression
+import metrics
+
+# Uploaded files are read straight from the request into memory and handed to
+# PyMuPDF / PIL as bytes; UPLOAD_MAX_MB is enforced while the body streams in.
+# Larger files go through the resumable /api/uploads endpoints in chunks
+UPLOAD_MAX_MB = int(os.environ.get('UPLOAD_MAX_MB', '32'))
+UPLOAD_SPOOL_MB = int(os.environ.get('UPLOAD_SPOOL_MB', str(UPLOAD_MAX_MB)))
+UPLOAD_CHUNKED_MAX_MB = int(os.environ.get('UPLOAD_CHUNKED_MAX_MB', '1024'))
+UPLOAD_DIR = os.path.join(CACHE_DIR, 'uploads')
+
+class UploadRequest(SpooledUploadRequest):
+    spool_bytes = UPLOAD_SPOOL_MB * 1024 * 1024
+    spool_dir = UPLOAD_DIR
 
 app = Flask(__name__, template_folder='../templates', static_folder='../static')
+app.request_class = UploadRequest
+app.config['MAX_CONTENT_LENGTH'] = UPLOAD_MAX_MB * 1024 * 1024
 CORS(app)
 app.secret_key = os.environ.get('SECRET_KEY', 'dev-secret-key-change-in-production')
 
-# Store query engines in memory (in production, use Redis or similar)
-query_engines = {}
-document_summaries = {}
-session_documents = {}  # Store documents for each session to support adding context
+chunked_uploads = ChunkedUploads(UPLOAD_DIR, max_bytes=UPLOAD_CHUNKED_MAX_MB * 1024 * 1024)
+
+# With SERVING_MODE=multiprocess, sessions are written through to disk and
+# published in a SQLite catalog, so any worker can serve any session_id
+MULTIPROCESS = SERVING_MODE == 'multiprocess'
+catalog = SessionCatalog(os.path.join(CACHE_DIR, 'sessions', 'catalog.sqlite3')) if MULTIPROCESS else None
+
+# Identical uploads share one index and summary, keyed by content hash and
+# freed once no session references them
+sources = SharedSourceRegistry(os.path.join(CACHE_DIR, 'shared'), mmap=MULTIPROCESS)
+
+# Sessions live in memory up to a budget; idle or least recently used ones
+# are persisted to disk and reloaded on their next request
+sessions = SessionStore(
+    os.path.join(CACHE_DIR, 'sessions'),
+    memory_budget_bytes=int(os.environ.get('SESSION_MEMORY_BUDGET_MB', '512')) * 1024 * 1024,
+    idle_ttl_seconds=int(os.environ.get('SESSION_IDLE_TTL_SECONDS', '1800')),
+    sources=sources,
+    catalog=catalog
+)
+
+ingestion_queue = IngestionQueue(
+    max_workers=int(os.environ.get('INGEST_WORKERS', '4')),
+    # Job progress is published too, since polling may reach another worker
+    on_change=(lambda job: catalog.put_job(job.job_id, job.to_dict())) if catalog else None
+)
+
+# Speculative fallback (opt-in): the top retrieval score decides, before any
+# synthesis, whether to answer from the web directly, race the web fallback
+# against synthesis, or just synthesize from the document
+SPECULATIVE_FALLBACK = os.environ.get('SPECULATIVE_FALLBACK', '0') == '1'
+FALLBACK_SKIP_SCORE = float(os.environ.get('FALLBACK_SKIP_SCORE', '0.45'))
+FALLBACK_RACE_SCORE = float(os.environ.get('FALLBACK_RACE_SCORE', '0.6'))
+fallback_executor = ThreadPoolExecutor(max_workers=int(os.environ.get('FALLBACK_WORKERS', '8')))
+
+QUERY_BATCH_MAX_QUESTIONS = int(os.environ.get('QUERY_BATCH_MAX_QUESTIONS', '500'))
 
-UPLOAD_FOLDER = tempfile.gettempdir()
 ALLOWED_EXTENSIONS = {'pdf', 'png', 'jpg', 'jpeg', 'gif', 'bmp', 'tiff'}
 
+@app.before_request
+def ensure_models():
+    # Gemini clients are set up on the first API call instead of at import,
+    # so reloaded sessions and query engines always find them configured
+    if request.path.startswith('/api/'):
+        configure_models()
+
+@app.before_request
+def start_request_timing():
+    g.request_started = time.perf_counter()
+    g.timings, g.timings_token = metrics.start_timings()
+
+@app.after_request
+def record_request_timing(response):
+    if 'request_started' not in g:
+        return response
+    elapsed = time.perf_counter() - g.request_started
+    metrics.stop_timings(g.timings_token)
+    metrics.request_seconds.observe(request.endpoint or 'unknown', elapsed)
+    
+    # ?timings=1 adds this request's per-stage breakdown to JSON responses
+    if request.args.get('timings') == '1' and response.is_json:
+        data = response.get_json()
+        if isinstance(data, dict):
+            data['timings'] = {**metrics.round_timings(g.timings), 'total': round(elapsed, 4)}
+            response.set_data(json.dumps(data))
+    return response
+
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
+def file_type(filename):
+    return 'pdf' if filename.rsplit('.', 1)[1].lower() == 'pdf' else 'image'
+
+def read_uploaded_files():
+    """Read the request's files into memory and return (input_type, value, filenames).
+
+    ``value`` holds the file bytes, or a list of them. Several files are only
+    accepted when they are all images, which are then OCR'd concurrently.
+    """
+    files = [
+        file for file in request.files.getlist('file')
+        if file and file.filename != '' and allowed_file(file.filename)
+    ]
+    if not files:
+        return None
+    
+    filenames = [secure_filename(file.filename) for file in files]
+    input_types = {file_type(name) for name in filenames}
+    if len(files) > 1 and input_types != {'image'}:
+        raise ValueError('Multiple files are only supported for images')
+    
+    contents = [file.read() for file in files]
+    value = contents[0] if len(contents) == 1 else contents
+    return input_types.pop(), value, filenames
+
+def summarize(job, docs, input_type):
+    with job.stage('summary'):
+        job.summary = generate_summary(docs, input_type)
+    return job.summary
+
+def ingest(job, session_id, input_type, value, cleanup=None):
+    """Background ingestion: pages stream into indexing while they are still being loaded.
+
+    Loading runs on its own thread and hands the pages to the summary as soon
+    as the last one is extracted, so the summary never waits on embedding.
+    Content already ingested by another session (or persisted earlier) is
+    not loaded, embedded or summarized again; the session shares its index.
+    """
+    docs = []
+    summary_future = None
+    
+    def load_documents(pages, cancelled):
+        try:
+            with job.stage('load') as stage:
+                for doc in iter_from_type(input_type, value, stats=stage):
+                    if cancelled.is_set():
+                        return None
+                    docs.append(doc)
+                    pages.put(doc)
+        finally:
+            pages.put(None)
+        # The summary only needs the loaded text, not the index
+        return ingestion_queue.submit_summary(summarize, job, docs, input_type)
+    
+    def stream_documents(pages, stage):
+        # Time spent waiting for the next page is load time, not index time
+        while True:
+            started = time.perf_counter()
+            doc = pages.get()
+            stage['waiting'] = stage.get('waiting', 0.0) + time.perf_counter() - started
+            if doc is None:
+                return
+            yield doc
+    
+    def build_source(stage):
+        nonlocal summary_future
+        source = sources.load(key)
+        if source is not None:
+            return source
+        if input_type == 'url':
+            # Already fetched to compute the key
+            summary_future = ingestion_queue.submit_summary(summarize, job, docs, input_type)
+            index = build_index(docs)
+        else:
+            pages, cancelled = queue.Queue(), threading.Event()
+            loading = ingestion_queue.submit_load(load_documents, pages, cancelled)
+            try:
+                index = build_index(stream_documents(pages, stage))
+            except Exception:
+                # Stop the loader before the caller cleans up the uploaded file
+                cancelled.set()
+                loading.exception()
+                raise
+            # Raises if loading failed; otherwise the summary is already running
+            summary_future = loading.result()
+        source = SharedSource(key, index, docs)
+        summary_future.add_done_callback(
+            lambda future: source.set_summary(None if future.exception() else future.result())
+        )
+        return source
+    
+    try:
+        if input_type == 'url':
+            # Pages change behind a URL, so it is fetched first (the web cache
+            # revalidates it cheaply) and keyed by its text: a changed page
+            # gets its own source instead of the one persisted for the old text
+            with job.stage('load'):
+                docs.extend(load_from_type(input_type, value))
+            key = source_key(input_type, [doc.text for doc in docs])
+        else:
+            key = source_key(input_type, value)
+        with job.stage('index') as stage, metrics.collect_timings() as timings:
+            source, shared = sources.acquire(key, lambda: build_source(stage))
+            sessions.put(session_id, source, None)
+            stage['breakdown'] = metrics.round_timings(timings)
+            stage['shared'] = shared
+    finally:
+        if cleanup is not None:
+            cleanup()
+    
+    if summary_future is not None:
+        summary = summary_future.result()
+    else:
+        if job.stages['load']['status'] == 'pending':
+            with job.stage('load') as stage:
+                stage['shared'] = True
+        with job.stage('summary'):
+            # Waits for the session that is still summarizing this content
+            job.summary = source.wait_summary() or generate_summary(source.documents, input_type)
+        summary = job.summary
+    sessions.set_summary(session_id, summary)
+
+def start_ingestion(session_id, input_type, value, cleanup=None):
+    job = ingestion_queue.submit(
+        lambda job: ingest(job, session_id, input_type, value, cleanup),
+        input_type,
+        job_id=session_id
+    )
+    return jsonify({
+        'success': True,
+        'session_id': session_id,
+        'job_id': job.job_id,
+        'status': job.status,
+        'content_type': input_type
+    })
+
+def job_status(job_id):
+    """A job's progress, whichever worker is running it."""
+    job = ingestion_queue.get(job_id)
+    if job is not None:
+        return job.to_dict()
+    return catalog.get_job(job_id) if catalog else None
+
+def missing_session_error(session_id):
+    job = job_status(session_id)
+    if job is not None and job['status'] == 'processing':
+        return jsonify({'success': False, 'error': 'Content is still processing'})
+    return jsonify({'success': False, 'error': 'Invalid session_id'})
+
+def extend_session(session_id, new_docs, input_type):
+    # Only the new documents are chunked and embedded. They go into the
+    # session's own overlay index, never into the source shared with others.
+    # The lock keeps concurrent additions, from any worker, applied in order
+    with sessions.lock(session_id):
+        session = sessions.get(session_id)
+        if session.overlay is None:
+            session.add_overlay(build_index([]))
+        insert_documents(session.overlay, new_docs)
+        session.documents.extend(new_docs)
+        session.answer_cache.clear()
+        
+        # Summarize just the new content and fold it into the existing summary
+        summary = merge_summaries(session.summary, generate_summary(new_docs, input_type))
+        session.summary = summary
+        sessions.touch(session_id)
+    return summary
+
 @app.route('/')
 def index():
     return render_template('index.html')
@@ -34,72 +290,26 @@ def upload_content():
         session_id = str(uuid.uuid4())
         
         if 'file' in request.files:
-            file = request.files['file']
-            if file and file.filename != '' and allowed_file(file.filename):
-                filename = secure_filename(file.filename)
-                filepath = os.path.join(UPLOAD_FOLDER, f"{session_id}_{filename}")
-                file.save(filepath)
-                
-                # Determine file type
-                file_ext = filename.rsplit('.', 1)[1].lower()
-                input_type = 'pdf' if file_ext == 'pdf' else 'image'
+            upload = read_uploaded_files()
+            if upload:
+                input_type, value, _ = upload
                 
-                # Process the file
-                docs = load_from_type(input_type, filepath)
-                query_engine = build_query_engine(docs)
-                summary = generate_summary(docs, input_type)
-                
-                # Store in memory
-                query_engines[session_id] = query_engine
-                document_summaries[session_id] = summary
-                session_documents[session_id] = docs
-                
-                # Clean up uploaded file
-                os.remove(filepath)
-                
-                return jsonify({
-                    'success': True,
-                    'session_id': session_id,
-                    'summary': summary,
-                    'content_type': input_type
-                })
+                # Process the files in the background, straight from memory
+                return start_ingestion(session_id, input_type, value)
                 
         elif request.json:
             data = request.json
             if 'url' in data:
-                docs = load_from_type('url', data['url'])
-                query_engine = build_query_engine(docs)
-                summary = generate_summary(docs, 'url')
-                
-                query_engines[session_id] = query_engine
-                document_summaries[session_id] = summary
-                session_documents[session_id] = docs
-                
-                return jsonify({
-                    'success': True,
-                    'session_id': session_id,
-                    'summary': summary,
-                    'content_type': 'url'
-                })
+                # A single URL or a list of URLs, fetched concurrently
+                return start_ingestion(session_id, 'url', data['url'])
                 
             elif 'text' in data:
-                docs = load_from_type('text', data['text'])
-                query_engine = build_query_engine(docs)
-                summary = generate_summary(docs, 'text')
-                
-                query_engines[session_id] = query_engine
-                document_summaries[session_id] = summary
-                session_documents[session_id] = docs
-                
-                return jsonify({
-                    'success': True,
-                    'session_id': session_id,
-                    'summary': summary,
-                    'content_type': 'text'
-                })
+                return start_ingestion(session_id, 'text', data['text'])
         
         return jsonify({'success': False, 'error': 'No valid content provided'})
     
+    except RequestEntityTooLarge:
+        raise
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)})
 
@@ -113,29 +323,257 @@ def query_document():
         if not session_id or not question:
             return jsonify({'success': False, 'error': 'Missing session_id or question'})
         
-        if session_id not in query_engines:
-            return jsonify({'success': False, 'error': 'Invalid session_id'})
+        session = sessions.get(session_id)
+        if session is None:
+            return missing_session_error(session_id)
+        
+        cached, match, query_embedding = lookup_cached_answer(session, question)
+        if cached is not None:
+            return jsonify(answer_result(cached['answer'], cached['not_found'], match))
+        
+        generation = session.answer_cache.generation
+        query_bundle = QueryBundle(question, embedding=query_embedding)
+        web_future = None
+        
+        with compression.collect() as context:
+            if data.get('speculative', SPECULATIVE_FALLBACK):
+                nodes, top_score, plan = plan_fallback(session, query_bundle)
+                if plan == 'web':
+                    return jsonify(web_result(answer_from_web(question), top_score))
+                if plan == 'race':
+                    web_future = fallback_executor.submit(metrics.propagate(answer_from_web), question)
+                response = session.query_engine.synthesize(query_bundle, nodes)
+            else:
+                response = session.query_engine.query(query_bundle)
         
-        query_engine = query_engines[session_id]
-        response = query_engine.query(question)
         response_text = str(response)
+        not_found = is_answer_not_found(response_text)
+        session.answer_cache.put(
+            question, query_embedding, {'answer': response_text, 'not_found': not_found}, generation
+        )
         
-        result = {
-            'success': True,
-            'answer': response_text,
-            'source': 'document'
-        }
+        if web_future is not None:
+            if not not_found:
+                web_future.cancel()
+            else:
+                return jsonify(web_result(web_future.result(), top_score, document_answer=response_text))
+        
+        return jsonify(answer_result(response_text, not_found, context=context))
+    
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)})
+
+@app.route('/api/query-batch', methods=['POST'])
+def query_batch():
+    """Answer a list of questions: batched embedding, vectorized retrieval, concurrent synthesis."""
+    try:
+        started = time.perf_counter()
+        data = request.json or {}
+        session_id = data.get('session_id')
+        questions = data.get('questions')
+        
+        if not session_id or not isinstance(questions, list) or not questions:
+            return jsonify({'success': False, 'error': 'Missing session_id or questions'})
+        if len(questions) > QUERY_BATCH_MAX_QUESTIONS:
+            return jsonify({'success': False, 'error': f'At most {QUERY_BATCH_MAX_QUESTIONS} questions per batch'})
+        
+        session = sessions.get(session_id)
+        if session is None:
+            return missing_session_error(session_id)
+        
+        results = [None] * len(questions)
+        generation = session.answer_cache.generation
+        
+        # Exact repeats are answered before anything is embedded; the rest are
+        # embedded together and checked against the semantic cache
+        pending = []
+        for i, question in enumerate(questions):
+            cached = session.answer_cache.get_exact(question)
+            if cached is not None:
+                results[i] = answer_result(cached['answer'], cached['not_found'], 'exact')
+            else:
+                pending.append(i)
+        
+        to_answer = []
+        for i, embedding in zip(pending, embed_queries([questions[i] for i in pending]) if pending else []):
+            cached = session.answer_cache.get_similar(questions[i], embedding)
+            if cached is not None:
+                results[i] = answer_result(cached['answer'], cached['not_found'], 'semantic')
+            else:
+                to_answer.append((i, embedding))
         
-        # Check if answer was not found
-        if is_answer_not_found(response_text):
-            result['not_found'] = True
-            result['can_search_web'] = True
+        stats = {}
+        if to_answer:
+            answered, stats = answer_questions(
+                session.indexes,
+                [questions[i] for i, _ in to_answer],
+                query_engine=session.query_engine,
+                embeddings=[embedding for _, embedding in to_answer]
+            )
+            for (i, embedding), result in zip(to_answer, answered):
+                session.answer_cache.put(
+                    questions[i], embedding,
+                    {'answer': result['answer'], 'not_found': result['not_found']}, generation
+                )
+                results[i] = {
+                    **answer_result(result['answer'], result['not_found'], context=result.get('context_tokens')),
+                    'retrieval_score': result['retrieval_score']
+                }
         
-        return jsonify(result)
+        elapsed = time.perf_counter() - started
+        stats.update({
+            'questions': len(questions),
+            'cached': len(questions) - len(to_answer),
+            'seconds': round(elapsed, 3),
+            'questions_per_second': round(len(questions) / elapsed, 2)
+        })
+        return jsonify({
+            'success': True,
+            'results': [{'question': q, **r} for q, r in zip(questions, results)],
+            'stats': stats
+        })
     
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)})
 
+def lookup_cached_answer(session, question):
+    """Return (cached, match, query_embedding); cached is None on a miss.
+
+    The question is only embedded when the exact match misses, and that
+    embedding is reused for retrieval. Questions the keyword index can
+    answer alone are not embedded at all, so they skip the semantic match.
+    """
+    cached = session.answer_cache.get_exact(question)
+    if cached is not None:
+        return cached, 'exact', None
+    if session.retriever.keyword_confident(question):
+        # Without an embedding the semantic lookup can only record a miss
+        return session.answer_cache.get_similar(question, None), None, None
+    query_embedding = embed_query(question)
+    cached = session.answer_cache.get_similar(question, query_embedding)
+    if cached is not None:
+        return cached, 'semantic', query_embedding
+    return None, None, query_embedding
+
+def answer_result(answer, not_found, cache_match=None, context=None):
+    result = {
+        'success': True,
+        'answer': answer,
+        'source': 'document',
+        'cached': cache_match is not None
+    }
+    if cache_match:
+        result['cache_match'] = cache_match
+    if context:
+        # Token counts from context compression, when it is enabled
+        result['context_tokens'] = context
+    
+    # Check if answer was not found
+    if not_found:
+        result['not_found'] = True
+        result['can_search_web'] = True
+    return result
+
+def plan_fallback(session, query_bundle):
+    """Retrieve once and decide from the top similarity: 'web', 'race' or 'document'."""
+    nodes = session.query_engine.retrieve(query_bundle)
+    top_score = max((node.score or 0.0 for node in nodes), default=0.0)
+    if top_score < FALLBACK_SKIP_SCORE:
+        return nodes, top_score, 'web'
+    if top_score < FALLBACK_RACE_SCORE:
+        return nodes, top_score, 'race'
+    return nodes, top_score, 'document'
+
+def web_result(web_answer, retrieval_score, document_answer=None):
+    result = {
+        'success': True,
+        **web_answer,
+        'speculative': True,
+        'retrieval_score': round(retrieval_score, 4)
+    }
+    if document_answer is not None:
+        result['document_answer'] = document_answer
+    return result
+
+def sse_event(payload):
+    return f"data: {json.dumps(payload)}\n\n"
+
+@app.route('/api/query-stream', methods=['POST'])
+def query_document_stream():
+    """Stream the answer as Server-Sent Events: token events, then one done event."""
+    data = request.json or {}
+    session_id = data.get('session_id')
+    question = data.get('question')
+    
+    if not session_id or not question:
+        return jsonify({'success': False, 'error': 'Missing session_id or question'})
+    
+    session = sessions.get(session_id)
+    if session is None:
+        return missing_session_error(session_id)
+    speculative = data.get('speculative', SPECULATIVE_FALLBACK)
+    
+    def generate():
+        try:
+            cached, match, query_embedding = lookup_cached_answer(session, question)
+            if cached is not None:
+                yield sse_event({'type': 'token', 'token': cached['answer']})
+                result = answer_result(cached['answer'], cached['not_found'], match)
+                del result['answer']
+                yield sse_event({'type': 'done', **result})
+                return
+            
+            generation = session.answer_cache.generation
+            query_bundle = QueryBundle(question, embedding=query_embedding)
+            web_future = None
+            
+            # Retrieval (and compression) happens here; only synthesis is streamed
+            with compression.collect() as context:
+                if speculative:
+                    nodes, top_score, plan = plan_fallback(session, query_bundle)
+                else:
+                    response = session.streaming_engine.query(query_bundle)
+            
+            if speculative:
+                if plan == 'web':
+                    result = web_result(answer_from_web(question), top_score)
+                    yield sse_event({'type': 'token', 'token': result.pop('answer')})
+                    yield sse_event({'type': 'done', **result})
+                    return
+                if plan == 'race':
+                    web_future = fallback_executor.submit(metrics.propagate(answer_from_web), question)
+                response = session.streaming_engine.synthesize(query_bundle, nodes)
+            
+            response_text = ""
+            for token in response.response_gen:
+                response_text += token
+                yield sse_event({'type': 'token', 'token': token})
+            
+            # The not-found check needs the completed answer
+            not_found = is_answer_not_found(response_text)
+            session.answer_cache.put(
+                question, query_embedding, {'answer': response_text, 'not_found': not_found}, generation
+            )
+            result = answer_result(response_text, not_found, context=context)
+            del result['answer']
+            
+            if web_future is not None:
+                if not not_found:
+                    web_future.cancel()
+                else:
+                    # The raced web answer arrives as its own message
+                    yield sse_event({'type': 'fallback', **web_result(web_future.result(), top_score)})
+                    result['can_search_web'] = False
+            yield sse_event({'type': 'done', **result})
+        except Exception as e:
+            yield sse_event({'type': 'error', 'success': False, 'error': str(e)})
+    
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
 @app.route('/api/search-web', methods=['POST'])
 def search_web():
     try:
@@ -145,33 +583,8 @@ def search_web():
         if not question:
             return jsonify({'success': False, 'error': 'Missing question'})
         
-        # Try Google Search first
-        google_result = search_web_with_google(question)
-        
-        if google_result == "quota_exceeded":
-            # Fallback to Gemini
-            gemini_result = answer_with_gemini(question)
-            return jsonify({
-                'success': True,
-                'answer': gemini_result,
-                'source': 'gemini_fallback',
-                'message': 'Google Search quota exceeded. Used Gemini\'s general knowledge.'
-            })
-        elif google_result.startswith("search_error:"):
-            # Fallback to Gemini
-            gemini_result = answer_with_gemini(question)
-            return jsonify({
-                'success': True,
-                'answer': gemini_result,
-                'source': 'gemini_fallback',
-                'message': 'Google search error. Used Gemini\'s general knowledge.'
-            })
-        else:
-            return jsonify({
-                'success': True,
-                'answer': google_result,
-                'source': 'google_search'
-            })
+        # Google Search first, falling back to Gemini's general knowledge
+        return jsonify({'success': True, **answer_from_web(question)})
     
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)})
@@ -183,38 +596,22 @@ def add_context():
         
         if 'file' in request.files:
             session_id = request.form.get('session_id')
-            if not session_id or session_id not in session_documents:
+            if not session_id or session_id not in sessions:
                 return jsonify({'success': False, 'error': 'Invalid session_id'})
                 
-            file = request.files['file']
-            if file and file.filename != '' and allowed_file(file.filename):
-                filename = secure_filename(file.filename)
-                filepath = os.path.join(UPLOAD_FOLDER, f"{session_id}_{filename}")
-                file.save(filepath)
-                
-                # Determine file type
-                file_ext = filename.rsplit('.', 1)[1].lower()
-                input_type = 'pdf' if file_ext == 'pdf' else 'image'
+            upload = read_uploaded_files()
+            if upload:
+                input_type, value, filenames = upload
+                filename = ', '.join(filenames)
                 
                 # Load new documents
-                new_docs = load_from_type(input_type, filepath)
+                new_docs = load_from_type(input_type, value)
                 
                 # Generate preview of new content
                 new_content_preview = generate_preview(new_docs, f"{input_type} file: {filename}")
                 
-                # Add to existing documents
-                session_documents[session_id].extend(new_docs)
-                
-                # Rebuild query engine with all documents
-                query_engine = build_query_engine(session_documents[session_id])
-                summary = generate_summary(session_documents[session_id], 'mixed')
-                
-                # Update stored data
-                query_engines[session_id] = query_engine
-                document_summaries[session_id] = summary
-                
-                # Clean up uploaded file
-                os.remove(filepath)
+                # Insert into the existing index
+                summary = extend_session(session_id, new_docs, input_type)
                 
                 return jsonify({
                     'success': True,
@@ -230,27 +627,23 @@ def add_context():
             data = request.json
             session_id = data.get('session_id')
             
-            if not session_id or session_id not in session_documents:
+            if not session_id or session_id not in sessions:
                 return jsonify({'success': False, 'error': 'Invalid session_id'})
             
             if 'url' in data:
+                # A single URL or a list of URLs, fetched concurrently
                 new_docs = load_from_type('url', data['url'])
-                new_content_preview = generate_preview(new_docs, f"URL: {data['url']}")
+                name = ', '.join(data['url']) if isinstance(data['url'], list) else data['url']
+                new_content_preview = generate_preview(new_docs, f"URL: {name}")
                 
-                session_documents[session_id].extend(new_docs)
-                
-                query_engine = build_query_engine(session_documents[session_id])
-                summary = generate_summary(session_documents[session_id], 'mixed')
-                
-                query_engines[session_id] = query_engine
-                document_summaries[session_id] = summary
+                summary = extend_session(session_id, new_docs, 'url')
                 
                 return jsonify({
                     'success': True,
                     'summary': summary,
                     'added_content': {
                         'type': 'url',
-                        'name': data['url'],
+                        'name': name,
                         'preview': new_content_preview
                     }
                 })
@@ -259,13 +652,7 @@ def add_context():
                 new_docs = load_from_type('text', data['text'])
                 new_content_preview = generate_preview(new_docs, "Text content")
                 
-                session_documents[session_id].extend(new_docs)
-                
-                query_engine = build_query_engine(session_documents[session_id])
-                summary = generate_summary(session_documents[session_id], 'mixed')
-                
-                query_engines[session_id] = query_engine
-                document_summaries[session_id] = summary
+                summary = extend_session(session_id, new_docs, 'text')
                 
                 return jsonify({
                     'success': True,
@@ -279,17 +666,122 @@ def add_context():
         
         return jsonify({'success': False, 'error': 'No valid content provided'})
     
+    except RequestEntityTooLarge:
+        raise
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)})
+
+@app.errorhandler(RequestEntityTooLarge)
+def upload_too_large(e):
+    return jsonify({
+        'success': False,
+        'error': f'Request exceeds {UPLOAD_MAX_MB} MB; send larger files in chunks through /api/uploads'
+    }), 413
+
+# Resumable uploads for large files: create the upload with its size, PUT
+# chunks at ?offset=, check progress with GET after a dropped connection,
+# then complete it into a new session or, with a session_id, add it as context
+@app.route('/api/uploads', methods=['POST'])
+def create_upload():
+    try:
+        data = request.json or {}
+        filename = secure_filename(data.get('filename') or '')
+        if not filename or not allowed_file(filename):
+            return jsonify({'success': False, 'error': 'Unsupported file type'})
+        upload_id = chunked_uploads.create(filename, data.get('size'))
+        return jsonify({'success': True, **chunked_uploads.status(upload_id)})
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)})
+
+@app.route('/api/uploads/<upload_id>', methods=['GET'])
+def get_upload(upload_id):
+    try:
+        return jsonify({'success': True, **chunked_uploads.status(upload_id)})
+    except KeyError:
+        return jsonify({'success': False, 'error': 'Upload not found'})
+
+@app.route('/api/uploads/<upload_id>', methods=['PUT'])
+def put_upload_chunk(upload_id):
+    try:
+        offset = int(request.args.get('offset', '0'))
+        received = chunked_uploads.write(upload_id, offset, request.stream)
+        return jsonify({'success': True, 'upload_id': upload_id, 'received': received})
+    except RequestEntityTooLarge:
+        raise
+    except KeyError:
+        return jsonify({'success': False, 'error': 'Upload not found'})
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)})
+
+@app.route('/api/uploads/<upload_id>/complete', methods=['POST'])
+def complete_upload(upload_id):
+    try:
+        try:
+            path, filename = chunked_uploads.complete(upload_id)
+        except KeyError:
+            return jsonify({'success': False, 'error': 'Upload not found'})
+        input_type = file_type(filename)
+        session_id = (request.get_json(silent=True) or {}).get('session_id')
+        
+        if session_id is None:
+            # The assembled file is read from disk by ingestion and removed afterwards
+            return start_ingestion(
+                str(uuid.uuid4()), input_type, path, cleanup=lambda: chunked_uploads.discard(upload_id)
+            )
+        
+        if session_id not in sessions:
+            return jsonify({'success': False, 'error': 'Invalid session_id'})
+        try:
+            new_docs = load_from_type(input_type, path)
+        finally:
+            chunked_uploads.discard(upload_id)
+        new_content_preview = generate_preview(new_docs, f"{input_type} file: {filename}")
+        summary = extend_session(session_id, new_docs, input_type)
+        return jsonify({
+            'success': True,
+            'summary': summary,
+            'added_content': {
+                'type': input_type,
+                'name': filename,
+                'preview': new_content_preview
+            }
+        })
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)})
 
 @app.route('/api/sessions/<session_id>/summary')
 def get_summary(session_id):
-    if session_id in document_summaries:
+    session = sessions.get(session_id)
+    if session is not None:
         return jsonify({
             'success': True,
-            'summary': document_summaries[session_id]
+            'summary': session.summary
         })
     return jsonify({'success': False, 'error': 'Session not found'})
 
+@app.route('/api/jobs/<job_id>')
+def get_job(job_id):
+    job = job_status(job_id)
+    if job is None:
+        return jsonify({'success': False, 'error': 'Job not found'})
+    return jsonify({'success': True, **job})
+
+@app.route('/api/stats')
+def get_stats():
+    return jsonify({
+        'success': True,
+        'embedding_cache': embedding_cache.stats(),
+        'ocr_cache': ocr_cache.stats(),
+        'summary_cache': summary_cache.stats(),
+        'answer_cache': answer_cache.stats(),
+        'sessions': sessions.stats(),
+        'rate_limiter': gemini_limiter.stats(),
+        'web_cache': get_web_fetcher().stats()
+    })
+
+@app.route('/api/metrics')
+def get_metrics():
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
 if __name__ == '__main__':
     app.run(debug=True, host='0.0.0.0', port=8000)
\ No newline at end of file
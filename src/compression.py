@@ -0,0 +1,191 @@
+import math
+import os
+import re
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from llama_index.core.postprocessor.types import BaseNodePostprocessor
+from llama_index.core.schema import NodeWithScore
+from pydantic import PrivateAttr
+
+from metrics import increment, timed
+from rate_limit import estimate_tokens
+
+# Off by default; when on, retrieved chunks are deduplicated, stripped of
+# repeated boilerplate lines and cut to CONTEXT_TOKEN_BUDGET before synthesis
+CONTEXT_COMPRESSION = os.environ.get("CONTEXT_COMPRESSION", "0") == "1"
+CONTEXT_TOKEN_BUDGET = int(os.environ.get("CONTEXT_TOKEN_BUDGET", "800"))
+# Share of a chunk's word trigrams found in a better-ranked chunk that makes it a duplicate
+DUPLICATE_CONTAINMENT = float(os.environ.get("DUPLICATE_CONTAINMENT", "0.8"))
+# A short line repeated in at least this many chunks of an index is boilerplate
+BOILERPLATE_MIN_CHUNKS = int(os.environ.get("BOILERPLATE_MIN_CHUNKS", "3"))
+BOILERPLATE_MAX_LINE_CHARS = 160
+
+STOPWORDS = frozenset(
+    "a an and are as at be by did do does for from has have how in is it its of on or that the "
+    "this to was were what when where which who why will with".split()
+)
+
+# Compression stats for the queries answered in the current context, if collected
+_stats = ContextVar("compression_stats", default=None)
+
+
+def _words(text):
+    return re.findall(r"\w+", text.lower())
+
+
+def _normalize_line(line):
+    # Page numbers and dates should not make otherwise identical headers differ
+    return re.sub(r"\d+", "#", " ".join(line.lower().split()))
+
+
+def _shingles(text):
+    words = _words(text)
+    return {tuple(words[i:i + 3]) for i in range(max(len(words) - 2, 1))}
+
+
+def split_sentences(text):
+    return [s.strip() for s in re.split(r"(?<=[.!?])\s+|\n+", text) if s.strip()]
+
+
+@contextmanager
+def collect():
+    """Sum compression stats for every query compressed in this context (same thread only)."""
+    stats = {}
+    token = _stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _stats.reset(token)
+
+
+class ContextCompressor(BaseNodePostprocessor):
+    """Shrinks retrieved context before synthesis.
+
+    In order: drops chunks mostly contained in a better-ranked one (chunk
+    overlap, repeated pages), strips lines that repeat across many chunks of
+    the index (page headers, navigation text), and, if the rest is still over
+    ``token_budget``, keeps the sentences that best match the question.
+    """
+
+    token_budget: int = CONTEXT_TOKEN_BUDGET
+    duplicate_containment: float = DUPLICATE_CONTAINMENT
+    boilerplate_min_chunks: int = BOILERPLATE_MIN_CHUNKS
+
+    _indexes: list = PrivateAttr(default_factory=list)
+    _boilerplate: frozenset = PrivateAttr(default=frozenset())
+    _boilerplate_size: int = PrivateAttr(default=-1)
+
+    def __init__(self, indexes=(), **kwargs):
+        super().__init__(**kwargs)
+        self._indexes = list(indexes)
+
+    @classmethod
+    def class_name(cls):
+        return "ContextCompressor"
+
+    def _boilerplate_lines(self):
+        # Recounted only when the indexes gained or lost chunks
+        size = sum(len(index.index_struct.nodes_dict) for index in self._indexes)
+        if size != self._boilerplate_size:
+            counts = Counter()
+            for doc in (doc for index in self._indexes for doc in index.docstore.docs.values()):
+                counts.update({
+                    _normalize_line(line) for line in doc.get_content().splitlines()
+                    if line.strip() and len(line) <= BOILERPLATE_MAX_LINE_CHARS
+                })
+            self._boilerplate = frozenset(line for line, n in counts.items() if n >= self.boilerplate_min_chunks)
+            self._boilerplate_size = size
+        return self._boilerplate
+
+    def _dedupe(self, nodes):
+        kept, kept_shingles = [], []
+        for node in nodes:
+            shingles = _shingles(node.node.get_content())
+            if any(len(shingles & other) >= self.duplicate_containment * len(shingles) for other in kept_shingles):
+                continue
+            kept.append(node)
+            kept_shingles.append(shingles)
+        return kept
+
+    def _strip_boilerplate(self, text, boilerplate):
+        lines = text.splitlines()
+        kept = [line for line in lines if _normalize_line(line) not in boilerplate]
+        # A chunk made only of repeated lines is repeated content, not boilerplate
+        if not any(line.strip() for line in kept):
+            return text, 0
+        return "\n".join(kept), len(lines) - len(kept)
+
+    def _extract(self, texts, query):
+        """Keep the sentences that best cover the query until the budget is reached."""
+        sentences = [(i, j, s) for i, text in enumerate(texts) for j, s in enumerate(split_sentences(text))]
+        terms = {w for w in _words(query) if w not in STOPWORDS}
+        sentence_words = [set(_words(s)) for _, _, s in sentences]
+        df = Counter(w for words in sentence_words for w in words & terms)
+        idf = {w: math.log(1 + len(sentences) / df[w]) for w in df}
+
+        # Ties go to better-ranked chunks and earlier sentences
+        ranked = sorted(
+            range(len(sentences)),
+            key=lambda k: (-sum(idf.get(w, 0.0) for w in sentence_words[k] & terms), sentences[k][0], sentences[k][1])
+        )
+        chosen, used = set(), 0
+        for k in ranked:
+            tokens = estimate_tokens(sentences[k][2])
+            if chosen and used + tokens > self.token_budget:
+                continue
+            chosen.add(k)
+            used += tokens
+
+        compressed = [[] for _ in texts]
+        for k in sorted(chosen):
+            compressed[sentences[k][0]].append(sentences[k][2])
+        return [" ".join(parts) for parts in compressed]
+
+    def compress(self, nodes, query):
+        """Return ``(nodes, stats)``; nodes are copies, the index's own nodes are never modified."""
+        retrieved = sum(estimate_tokens(n.node.get_content()) for n in nodes)
+        unique = self._dedupe(nodes)
+        boilerplate = self._boilerplate_lines()
+
+        texts, lines_removed = [], 0
+        for node in unique:
+            text, removed = self._strip_boilerplate(node.node.get_content(), boilerplate)
+            texts.append(text)
+            lines_removed += removed
+        if sum(estimate_tokens(text) for text in texts) > self.token_budget and query:
+            texts = self._extract(texts, query)
+
+        compressed = []
+        for node, text in zip(unique, texts):
+            if not text:
+                continue
+            copy = node.node.model_copy()
+            copy.set_content(text)
+            compressed.append(NodeWithScore(node=copy, score=node.score))
+        kept = sum(estimate_tokens(text) for text in texts if text)
+        stats = {
+            "retrieved_tokens": retrieved,
+            "context_tokens": kept,
+            "saved_tokens": retrieved - kept,
+            "duplicates_removed": len(nodes) - len(unique),
+            "boilerplate_lines_removed": lines_removed,
+        }
+        return compressed, stats
+
+    def _postprocess_nodes(self, nodes, query_bundle=None):
+        with timed("compression"):
+            nodes, stats = self.compress(nodes, query_bundle.query_str if query_bundle else "")
+        increment("rag_context_tokens_retrieved_total", stats["retrieved_tokens"])
+        increment("rag_context_tokens_kept_total", stats["context_tokens"])
+        collected = _stats.get()
+        if collected is not None:
+            for name, value in stats.items():
+                collected[name] = collected.get(name, 0) + value
+        return nodes
+
+
+def node_postprocessors(indexes):
+    """Postprocessors for query engines over ``indexes``: the compressor when enabled."""
+    return [ContextCompressor(indexes)] if CONTEXT_COMPRESSION else []
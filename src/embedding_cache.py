@@ -0,0 +1,221 @@
+import atexit
+import fcntl
+import hashlib
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import numpy as np
+from llama_index.core.base.embeddings.base import BaseEmbedding
+from pydantic import PrivateAttr
+
+# Per slot: hex sha256 of the cache key (empty when unused) and when it was last used
+SLOT_DTYPE = np.dtype([("key", "S64"), ("used", "<i8")])
+
+
+class EmbeddingCache:
+    """Content-addressed embedding store backed by memory-mapped files.
+
+    Vectors live in ``<model>.f32`` (one row per slot) and each slot's key
+    digest and last-use time in ``<model>.slots``; ``<model>.json`` only
+    records the layout. Several processes can share one directory: slots
+    are allocated under an exclusive lock on ``<model>.lock``, least
+    recently used first, and a slot's key is checked on every read, so a
+    slot another process reused is a miss rather than a wrong vector.
+    """
+
+    def __init__(self, cache_dir, model_name, max_entries=20000):
+        self.model_name = model_name
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        safe_name = "".join(c if c.isalnum() or c in "-_." else "_" for c in model_name)
+        self.cache_dir = cache_dir
+        self._vectors_path = os.path.join(cache_dir, f"{safe_name}.f32")
+        self._slots_path = os.path.join(cache_dir, f"{safe_name}.slots")
+        self._meta_path = os.path.join(cache_dir, f"{safe_name}.json")
+        self._lock_path = os.path.join(cache_dir, f"{safe_name}.lock")
+        self._lock = threading.Lock()
+        self._slot_by_key = {}
+        self._dim = None
+        self._vectors = None
+        self._slots = None
+
+        self._open()
+        atexit.register(self.flush)
+
+    @contextmanager
+    def _file_lock(self):
+        # Taken before the first write, so the directory is only created once there is something to store
+        os.makedirs(self.cache_dir, exist_ok=True)
+        with open(self._lock_path, "a") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            yield
+
+    def _open(self):
+        """Map the files another process (or an earlier run) created, if their layout matches."""
+        try:
+            with open(self._meta_path) as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return False
+        if (meta.get("max_entries") != self.max_entries or "dim" not in meta
+                or not os.path.exists(self._slots_path) or not os.path.exists(self._vectors_path)):
+            return False
+        self._dim = meta["dim"]
+        self._vectors = np.memmap(self._vectors_path, dtype=np.float32, mode="r+", shape=(self.max_entries, self._dim))
+        self._slots = np.memmap(self._slots_path, dtype=SLOT_DTYPE, mode="r+", shape=(self.max_entries,))
+        self._refresh()
+        return True
+
+    def _create(self, dim):
+        # Called under the file lock; a different capacity or dimension starts over
+        self._dim = dim
+        self._vectors = np.memmap(self._vectors_path, dtype=np.float32, mode="w+", shape=(self.max_entries, dim))
+        self._slots = np.memmap(self._slots_path, dtype=SLOT_DTYPE, mode="w+", shape=(self.max_entries,))
+        tmp_path = f"{self._meta_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"model_name": self.model_name, "dim": dim, "max_entries": self.max_entries}, f)
+        os.replace(tmp_path, self._meta_path)
+        self._slot_by_key = {}
+
+    def _refresh(self):
+        """Rebuild the key -> slot map from the shared slot file, picking up other processes' writes."""
+        self._slot_by_key = {key: slot for slot, key in enumerate(self._slots["key"].tolist()) if key}
+
+    def key(self, text):
+        return hashlib.sha256(f"{self.model_name}\0{text}".encode("utf-8")).hexdigest().encode()
+
+    def _read(self, key):
+        slot = self._slot_by_key.get(key)
+        if slot is None:
+            return None
+        vector = self._vectors[slot].tolist()
+        # Checked after copying: a writer clears the key before replacing the vector
+        if self._slots["key"][slot] != key:
+            del self._slot_by_key[key]
+            return None
+        self._slots["used"][slot] = time.time_ns()
+        return vector
+
+    def get_many(self, texts):
+        """Return cached vectors for ``texts``, with ``None`` for every miss."""
+        keys = [self.key(text) for text in texts]
+        with self._lock:
+            if self._vectors is None and not self._open():
+                self.misses += len(texts)
+                return [None] * len(texts)
+            results = [self._read(key) for key in keys]
+            if None in results:
+                # Other processes may have cached them since the map was built
+                self._refresh()
+                results = [r if r is not None else self._read(k) for r, k in zip(results, keys)]
+            found = sum(r is not None for r in results)
+            self.hits += found
+            self.misses += len(results) - found
+        return results
+
+    def put_many(self, texts, embeddings):
+        if not texts:
+            return
+        dim = len(embeddings[0])
+        with self._lock, self._file_lock():
+            if (self._vectors is None and not self._open()) or dim != self._dim:
+                self._create(dim)
+            self._refresh()
+            new = {}
+            for text, embedding in zip(texts, embeddings):
+                key = self.key(text)
+                if key not in self._slot_by_key:
+                    new[key] = embedding
+            items = list(new.items())[-self.max_entries:]
+            if not items:
+                return
+            # Empty slots have never been used, so they go before any eviction
+            used = self._slots["used"]
+            victims = np.argpartition(used, len(items) - 1)[:len(items)] if len(items) < len(used) else np.arange(len(used))
+            now = time.time_ns()
+            for slot, (key, embedding) in zip(victims.tolist(), items):
+                old_key = self._slots["key"][slot]
+                if old_key:
+                    self.evictions += 1
+                    self._slot_by_key.pop(old_key, None)
+                self._slots["key"][slot] = b""
+                self._vectors[slot] = np.asarray(embedding, dtype=np.float32)
+                self._slots["used"][slot] = now
+                self._slots["key"][slot] = key
+                self._slot_by_key[key] = slot
+
+    def flush(self):
+        # Writes are already visible to other processes through the shared mapping; this makes them durable
+        with self._lock:
+            if self._vectors is not None:
+                self._vectors.flush()
+                self._slots.flush()
+
+    def stats(self):
+        return {
+            "model_name": self.model_name,
+            "entries": len(self._slot_by_key),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+class CachedEmbedding(BaseEmbedding):
+    """Embedding model wrapper that only sends cache misses to the wrapped model."""
+
+    _embed_model: BaseEmbedding = PrivateAttr()
+    _cache: EmbeddingCache = PrivateAttr()
+
+    def __init__(self, embed_model, cache, **kwargs):
+        super().__init__(
+            model_name=embed_model.model_name,
+            embed_batch_size=embed_model.embed_batch_size,
+            **kwargs
+        )
+        self._embed_model = embed_model
+        self._cache = cache
+
+    @classmethod
+    def class_name(cls):
+        return "CachedEmbedding"
+
+    @property
+    def cache(self):
+        return self._cache
+
+    @property
+    def wrapped_model(self):
+        return self._embed_model
+
+    def _get_query_embedding(self, query):
+        return self._embed_model.get_query_embedding(query)
+
+    async def _aget_query_embedding(self, query):
+        return await self._embed_model.aget_query_embedding(query)
+
+    def _get_text_embedding(self, text):
+        return self._get_text_embeddings([text])[0]
+
+    def _get_text_embeddings(self, texts):
+        embeddings = self._cache.get_many(texts)
+        missing = list(dict.fromkeys(t for t, e in zip(texts, embeddings) if e is None))
+        if missing:
+            computed = self._embed_model.get_text_embedding_batch(missing)
+            self._cache.put_many(missing, computed)
+            by_text = dict(zip(missing, computed))
+            embeddings = [e if e is not None else by_text[t] for t, e in zip(texts, embeddings)]
+        return embeddings
+
+    async def _aget_text_embedding(self, text):
+        return self._get_text_embedding(text)
+
+    async def _aget_text_embeddings(self, texts):
+        return self._get_text_embeddings(texts)
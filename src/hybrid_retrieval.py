@@ -0,0 +1,79 @@
+import os
+
+from llama_index.core.constants import DEFAULT_SIMILARITY_TOP_K
+from llama_index.core.query_engine import RetrieverQueryEngine
+from llama_index.core.retrievers import BaseRetriever
+from llama_index.core.vector_stores.types import VectorStoreQueryMode
+
+import compression
+from keyword_index import tokenize
+from metrics import increment
+from vector_store import NumpyVectorStore
+
+# Weight of the vector score against BM25; 1 disables keyword scoring
+HYBRID_ALPHA = float(os.environ.get("HYBRID_ALPHA", "0.7"))
+# Questions of at most this many terms, whose exact matches all fit in the
+# top k, are answered from the keyword index without embedding the question
+KEYWORD_FAST_PATH = os.environ.get("KEYWORD_FAST_PATH", "1") == "1"
+KEYWORD_FAST_PATH_MAX_TERMS = int(os.environ.get("KEYWORD_FAST_PATH_MAX_TERMS", "4"))
+
+
+def supports_keywords(index):
+    return isinstance(index.vector_store, NumpyVectorStore)
+
+
+class HybridRetriever(BaseRetriever):
+    """Retrieves from several indexes, fusing vector and BM25 scores, and keeps the best overall.
+
+    Part numbers, names and section titles are matched exactly by the
+    keyword index. When a short question's exact matches all fit in
+    ``similarity_top_k``, they are returned without embedding the question
+    at all; otherwise the question is embedded once and each index scores
+    its chunks in ``hybrid`` mode.
+    """
+
+    def __init__(self, indexes, similarity_top_k=DEFAULT_SIMILARITY_TOP_K):
+        super().__init__()
+        self._indexes = indexes
+        self._similarity_top_k = similarity_top_k
+        hybrid = HYBRID_ALPHA < 1
+        self._retrievers = [
+            index.as_retriever(
+                similarity_top_k=similarity_top_k, vector_store_query_mode=VectorStoreQueryMode.HYBRID, alpha=HYBRID_ALPHA
+            ) if hybrid and supports_keywords(index) else index.as_retriever(similarity_top_k=similarity_top_k)
+            for index in indexes
+        ]
+
+    def keyword_confident(self, query_str):
+        """Whether ``query_str`` can be answered by keyword retrieval alone."""
+        if not KEYWORD_FAST_PATH or not all(supports_keywords(index) for index in self._indexes):
+            return False
+        terms = set(tokenize(query_str))
+        if not terms or len(terms) > KEYWORD_FAST_PATH_MAX_TERMS:
+            return False
+        matches = sum(len(index.vector_store.keyword_index.exact_matches(query_str)) for index in self._indexes)
+        return 0 < matches <= self._similarity_top_k
+
+    def _merge(self, retrievers, query_bundle):
+        nodes = [node for retriever in retrievers for node in retriever.retrieve(query_bundle)]
+        nodes.sort(key=lambda node: node.score or 0.0, reverse=True)
+        return nodes[:self._similarity_top_k]
+
+    def _retrieve(self, query_bundle):
+        if query_bundle.embedding is None and self.keyword_confident(query_bundle.query_str):
+            increment("rag_keyword_fast_path_total")
+            return self._merge([
+                index.as_retriever(
+                    similarity_top_k=self._similarity_top_k, vector_store_query_mode=VectorStoreQueryMode.TEXT_SEARCH
+                )
+                for index in self._indexes
+            ], query_bundle)
+        # The first retriever embeds the question and stores it on query_bundle for the rest
+        return self._merge(self._retrievers, query_bundle)
+
+
+def build_retriever_engine(indexes, streaming=False):
+    """Query engine over ``indexes`` with hybrid retrieval and, when enabled, context compression."""
+    return RetrieverQueryEngine.from_args(
+        HybridRetriever(indexes), streaming=streaming, node_postprocessors=compression.node_postprocessors(indexes)
+    )
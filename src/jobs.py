@@ -0,0 +1,125 @@
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+
+class IngestionJob:
+    """Progress of one background ingestion, reported stage by stage."""
+
+    STAGES = ('load', 'index', 'summary')
+
+    def __init__(self, job_id, content_type, on_change=None):
+        self.job_id = job_id
+        self.content_type = content_type
+        self.created_at = time.time()
+        self.finished_at = None
+        self.error = None
+        self.summary = None
+        self.stages = {name: {'status': 'pending'} for name in self.STAGES}
+        self._on_change = on_change
+        self._lock = threading.Lock()
+
+    def changed(self):
+        if self._on_change is not None:
+            self._on_change(self)
+
+    @contextmanager
+    def stage(self, name):
+        """Time a stage. Seconds the stage records under ``waiting`` (blocked on another stage) are not counted."""
+        started = time.perf_counter()
+        with self._lock:
+            self.stages[name]['status'] = 'running'
+        self.changed()
+        try:
+            yield self.stages[name]
+        except Exception:
+            self._finish(name, 'failed', started)
+            raise
+        self._finish(name, 'done', started)
+
+    def _finish(self, name, status, started):
+        with self._lock:
+            stage = self.stages[name]
+            waiting = stage.get('waiting', 0.0)
+            stage.update(status=status, seconds=round(time.perf_counter() - started - waiting, 3))
+            if 'waiting' in stage:
+                stage['waiting'] = round(waiting, 3)
+        self.changed()
+
+    @property
+    def status(self):
+        if self.error is not None:
+            return 'failed'
+        if self.stages['index']['status'] != 'done':
+            return 'processing'
+        # Questions are accepted as soon as the index exists
+        if self.stages['summary']['status'] != 'done':
+            return 'ready'
+        return 'done'
+
+    def to_dict(self):
+        with self._lock:
+            return {
+                'job_id': self.job_id,
+                'session_id': self.job_id,
+                'status': self.status,
+                'content_type': self.content_type,
+                'stages': {name: dict(stage) for name, stage in self.stages.items()},
+                'summary': self.summary,
+                'error': self.error,
+            }
+
+
+class IngestionQueue:
+    """Bounded worker pool for ingestion jobs.
+
+    Loading and summaries run on their own pools, so a job can extract pages
+    and summarize them while it builds the index, without waiting for a free
+    ingestion worker. ``on_change`` is called with the job whenever its
+    progress changes.
+    """
+
+    def __init__(self, max_workers=4, retention_seconds=3600, on_change=None):
+        self.retention_seconds = retention_seconds
+        self._on_change = on_change
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='ingest')
+        self._load_executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='load')
+        self._summary_executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='summary')
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def submit(self, fn, content_type, job_id=None):
+        """Queue ``fn(job)`` and return the job immediately."""
+        job = IngestionJob(job_id or str(uuid.uuid4()), content_type, self._on_change)
+        with self._lock:
+            self._prune()
+            self._jobs[job.job_id] = job
+        self._executor.submit(self._run, fn, job)
+        return job
+
+    def submit_load(self, fn, *args):
+        return self._load_executor.submit(fn, *args)
+
+    def submit_summary(self, fn, *args):
+        return self._summary_executor.submit(fn, *args)
+
+    def _run(self, fn, job):
+        try:
+            fn(job)
+        except Exception as e:
+            job.error = str(e)
+        finally:
+            job.finished_at = time.time()
+            job.changed()
+
+    def _prune(self):
+        cutoff = time.time() - self.retention_seconds
+        for job_id, job in list(self._jobs.items()):
+            if job.finished_at is not None and job.finished_at < cutoff:
+                del self._jobs[job_id]
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
@@ -0,0 +1,107 @@
+import heapq
+import math
+import re
+import threading
+from collections import Counter, defaultdict
+
+from compression import STOPWORDS
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+
+def tokenize(text):
+    return [word for word in re.findall(r"\w+", text.lower()) if word not in STOPWORDS]
+
+
+class KeywordIndex:
+    """BM25 inverted index over node text.
+
+    Postings map each term to the nodes containing it and how often, so
+    added nodes are indexed incrementally and a query only touches the
+    postings of its own terms.
+    """
+
+    def __init__(self):
+        self._postings = defaultdict(dict)
+        self._lengths = {}
+        self._total_length = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._lengths)
+
+    @property
+    def memory_bytes(self):
+        # Roughly 100 bytes per dict entry, counting keys and values
+        with self._lock:
+            return 100 * (sum(len(postings) for postings in self._postings.values()) + len(self._lengths))
+
+    def add(self, node_id, text):
+        counts = Counter(tokenize(text))
+        with self._lock:
+            if node_id in self._lengths:
+                self._remove(node_id)
+            for term, count in counts.items():
+                self._postings[term][node_id] = count
+            self._lengths[node_id] = sum(counts.values())
+            self._total_length += self._lengths[node_id]
+
+    def _remove(self, node_id):
+        # Scans the vocabulary; nodes are only removed when a whole store is cleared or deleted from
+        self._total_length -= self._lengths.pop(node_id)
+        for term in list(self._postings):
+            postings = self._postings[term]
+            if postings.pop(node_id, None) is not None and not postings:
+                del self._postings[term]
+
+    def remove(self, node_ids):
+        with self._lock:
+            for node_id in node_ids:
+                if node_id in self._lengths:
+                    self._remove(node_id)
+
+    def search(self, query, top_k=None):
+        """Return ``(node_id, score)`` pairs for nodes sharing a term with ``query``, best first."""
+        terms = set(tokenize(query))
+        scores = defaultdict(float)
+        with self._lock:
+            if not self._lengths:
+                return []
+            count = len(self._lengths)
+            average_length = self._total_length / count or 1.0
+            for term in terms:
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+                for node_id, frequency in postings.items():
+                    norm = frequency + BM25_K1 * (1 - BM25_B + BM25_B * self._lengths[node_id] / average_length)
+                    scores[node_id] += idf * frequency * (BM25_K1 + 1) / norm
+        if top_k is None:
+            return sorted(scores.items(), key=lambda item: item[1], reverse=True)
+        return heapq.nlargest(top_k, scores.items(), key=lambda item: item[1])
+
+    def exact_matches(self, query):
+        """Ids of the nodes containing every term of ``query``."""
+        terms = set(tokenize(query))
+        if not terms:
+            return set()
+        with self._lock:
+            postings = sorted((self._postings.get(term, {}) for term in terms), key=len)
+            matches = set(postings[0])
+            for other in postings[1:]:
+                matches.intersection_update(other)
+        return matches
+
+    def to_dict(self):
+        with self._lock:
+            return {"lengths": dict(self._lengths), "postings": {t: dict(p) for t, p in self._postings.items()}}
+
+    @classmethod
+    def from_dict(cls, data):
+        index = cls()
+        index._lengths = data["lengths"]
+        index._total_length = sum(index._lengths.values())
+        index._postings.update(data["postings"])
+        return index
@@ -1,96 +1,557 @@
 import sys
 import os
-import google.generativeai as genai
-from google.genai import types
+import argparse
+import hashlib
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
-from llama_index.readers.file import PyMuPDFReader
-from llama_index.core.schema import Document
-from llama_index.readers.web import SimpleWebPageReader
-from llama_index.core import VectorStoreIndex, Settings
-from llama_index.llms.google_genai import GoogleGenAI
-from llama_index.embeddings.google_genai import GoogleGenAIEmbedding
-from PIL import Image
-
+from llama_index.core.schema import Document, NodeWithScore
+from llama_index.core import VectorStoreIndex, StorageContext, Settings, QueryBundle
+from llama_index.core.constants import DEFAULT_SIMILARITY_TOP_K
+from llama_index.core.ingestion import run_transformations
+from llama_index.core.instrumentation import get_dispatcher
+from llama_index.core.callbacks import CallbackManager
+from embedding_cache import EmbeddingCache, CachedEmbedding
+from text_cache import TextCache
+import compression
+from hybrid_retrieval import HYBRID_ALPHA, build_retriever_engine
+from metrics import MetricsCallbackHandler, observe_stage, propagate, timed
+from vector_store import NumpyVectorStore
+from rate_limit import gemini_limiter, call_with_retry, estimate_tokens, LimiterEventHandler, IMAGE_TOKENS
+
+# The Gemini SDKs, the web fetcher, PyMuPDF and PIL are imported on first use,
+# so importing this module (and a text-only CLI run) stays fast and needs no key.
+# Global LlamaIndex hooks are installed by configure_models, and cache
+# directories are created on first write, so importing has no side effects
 load_dotenv()
-genai.configure(api_key=os.environ["GEMINI_API_KEY"])
 
-Settings.llm = GoogleGenAI(model="gemini-1.5-flash", api_key=os.environ["GEMINI_API_KEY"])
-Settings.embed_model = GoogleGenAIEmbedding(
-    model_name="text-embedding-004",
-    api_key=os.environ["GEMINI_API_KEY"]
+GEMINI_MODEL_NAME = "gemini-1.5-flash"
+EMBED_MODEL_NAME = "text-embedding-004"
+CACHE_DIR = os.environ.get(
+    "CACHE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".cache")
 )
 
+# "single" for one server process, or "multiprocess" when several workers
+# (e.g. gunicorn -w 4) share CACHE_DIR and must serve each other's sessions
+SERVING_MODE = os.environ.get("SERVING_MODE", "single")
+
+# Shared by every session, server worker and CLI run, so identical chunks are only embedded once
+embedding_cache = EmbeddingCache(
+    os.path.join(CACHE_DIR, "embeddings"),
+    EMBED_MODEL_NAME,
+    max_entries=int(os.environ.get("EMBEDDING_CACHE_MAX_ENTRIES", "20000"))
+)
+
+
+# Documents handed to the chunk + embed stage at a time when building an index
+INDEX_BATCH_SIZE = int(os.environ.get("INDEX_BATCH_SIZE", "32"))
+# Questions synthesized at once by answer_questions (/api/query-batch and --batch)
+QUERY_BATCH_CONCURRENCY = int(os.environ.get("QUERY_BATCH_CONCURRENCY", "4"))
+# "float32", or "int8" for a quarter of the embedding memory at a small recall cost
+VECTOR_STORE_QUANTIZATION = os.environ.get("VECTOR_STORE_QUANTIZATION", "float32")
+
+OCR_MODEL_NAME = GEMINI_MODEL_NAME
+OCR_PROMPT = "Extract all readable text from this image."
+OCR_MAX_DIMENSION = int(os.environ.get("OCR_MAX_DIMENSION", "2048"))
+OCR_CONCURRENCY = int(os.environ.get("OCR_CONCURRENCY", "4"))
+ocr_cache = TextCache(os.path.join(CACHE_DIR, "ocr"))
+
+# URLs are fetched concurrently, at most URL_FETCH_PER_HOST at a time from one host,
+# and cached in .cache/web until the server reports a change
+URL_FETCH_WORKERS = int(os.environ.get("URL_FETCH_WORKERS", "8"))
+URL_FETCH_PER_HOST = int(os.environ.get("URL_FETCH_PER_HOST", "4"))
+URL_FETCH_TIMEOUT = float(os.environ.get("URL_FETCH_TIMEOUT", "20"))
+_web_fetcher = None
+
+# Long inputs are summarized section by section, then the section summaries are combined
+SUMMARY_CHUNK_CHARS = int(os.environ.get("SUMMARY_CHUNK_CHARS", "8000"))
+SUMMARY_CONCURRENCY = int(os.environ.get("SUMMARY_CONCURRENCY", "4"))
+summary_cache = TextCache(os.path.join(CACHE_DIR, "summaries"))
+
+# Indexes and summaries built by the CLI, reused by later runs on unchanged
+# content with the same settings; --prune-cache drops entries unused this long
+INDEX_CACHE_MAX_AGE_DAYS = float(os.environ.get("INDEX_CACHE_MAX_AGE_DAYS", "30"))
+_index_cache = None
+
+
+_gemini_models = {}
+_search_llm = None
+_models_configured = False
+_instrumented = False
+_models_lock = threading.Lock()
+
+
+def _instrument():
+    # Called under _models_lock, before any model is installed: the embedding
+    # model picks up Settings.callback_manager when it is assigned
+    global _instrumented
+    if _instrumented:
+        return
+    # Every LlamaIndex LLM and embedding call shares one requests/tokens-per-minute budget
+    get_dispatcher().add_event_handler(LimiterEventHandler(limiter=gemini_limiter))
+    # Stage timings and LLM/embedding call and token counts, served at /api/metrics
+    Settings.callback_manager = CallbackManager([MetricsCallbackHandler()])
+    _instrumented = True
+
+
+def with_embedding_cache(embed_model):
+    return CachedEmbedding(embed_model, embedding_cache)
+
+
+def configure_models(llm=None, embed_model=None, gemini_model=None):
+    """Configure the Gemini SDK and LlamaIndex's LLM and embedding model, once per process.
+
+    Passing stand-ins (as the offline benchmarks do) installs them instead and
+    skips the Gemini clients; ``gemini_model`` replaces the GenerativeModel
+    used for OCR, summaries and the Gemini fallback.
+    """
+    global _models_configured
+    if llm is not None or embed_model is not None or gemini_model is not None:
+        with _models_lock:
+            _instrument()
+            if llm is not None:
+                Settings.llm = llm
+            if embed_model is not None:
+                Settings.embed_model = with_embedding_cache(embed_model)
+            if gemini_model is not None:
+                _gemini_models[GEMINI_MODEL_NAME] = gemini_model
+            _models_configured = True
+        return
+    if _models_configured:
+        return
+    with _models_lock:
+        if _models_configured:
+            return
+        import google.generativeai as genai
+        from llama_index.llms.google_genai import GoogleGenAI
+        from llama_index.embeddings.google_genai import GoogleGenAIEmbedding
+
+        _instrument()
+        genai.configure(api_key=os.environ["GEMINI_API_KEY"])
+        Settings.llm = GoogleGenAI(model=GEMINI_MODEL_NAME, api_key=os.environ["GEMINI_API_KEY"])
+        Settings.embed_model = with_embedding_cache(
+            GoogleGenAIEmbedding(
+                model_name=EMBED_MODEL_NAME,
+                api_key=os.environ["GEMINI_API_KEY"]
+            )
+        )
+        _models_configured = True
+
 
 def get_gemini_llm(multimodal=False):
-    model = "gemini-1.5-flash" if multimodal else "gemini-1.5-flash"
-    return genai.GenerativeModel(model)
+    # Long-lived so every call reuses the same client and its connections
+    configure_models()
+    # gemini-1.5-flash handles both text and images
+    model = GEMINI_MODEL_NAME
+    with _models_lock:
+        if model not in _gemini_models:
+            import google.generativeai as genai
+
+            _gemini_models[model] = genai.GenerativeModel(model)
+        return _gemini_models[model]
+
+
+def generate_content(contents, multimodal=False):
+    """Call Gemini through the shared rate limiter, retrying 429s with backoff."""
+    parts = contents if isinstance(contents, list) else [contents]
+    tokens = sum(estimate_tokens(p) if isinstance(p, str) else IMAGE_TOKENS for p in parts)
+    gemini = get_gemini_llm(multimodal=multimodal)
+    return call_with_retry(gemini.generate_content, contents, tokens=tokens)
+
+
+def iter_pdf(pdf, stats=None):
+    """Yield one Document per page of ``pdf``, a file path or the PDF's bytes."""
+    from pdf_extract import iter_pdf_pages
+
+    # Only time spent extracting counts as load time, not the caller's work between pages
+    pages = iter_pdf_pages(pdf, stats=stats)
+    load_seconds = 0.0
+    while True:
+        started = time.perf_counter()
+        page = next(pages, None)
+        load_seconds += time.perf_counter() - started
+        if page is None:
+            break
+        page_number, text, total_pages = page
+        metadata = {"total_pages": total_pages, "source": str(page_number)}
+        if isinstance(pdf, str):
+            metadata["file_path"] = pdf
+        yield Document(text=text, metadata=metadata)
+    observe_stage("load", load_seconds)
+
+
+def load_pdf(pdf, stats=None):
+    return list(iter_pdf(pdf, stats=stats))
 
 
-def load_pdf(file_path: str):
-    reader = PyMuPDFReader()
-    return reader.load(file_path=file_path)
+def ocr_image(image):
+    """OCR an image given as a file path or as its bytes."""
+    if isinstance(image, bytes):
+        image_bytes = image
+    else:
+        with open(image, "rb") as f:
+            image_bytes = f.read()
+
+    # The same screenshot uploaded twice is only sent to Gemini once
+    key = ocr_cache.key(OCR_MODEL_NAME, OCR_PROMPT, OCR_MAX_DIMENSION, image_bytes)
+    text = ocr_cache.get(key)
+    if text is None:
+        from ocr import prepare_image
+
+        mime_type, data = prepare_image(image_bytes, max_dimension=OCR_MAX_DIMENSION)
+        response = generate_content([OCR_PROMPT, {"mime_type": mime_type, "data": data}], multimodal=True)
+        text = response.text
+        ocr_cache.put(key, text)
+    return text
+
+
+def load_image(image):
+    return [Document(text=ocr_image(image))]
 
 
-def load_image(image_path: str):
-    image = Image.open(image_path)
-    prompt = "Extract all readable text from this image."
-    gemini = get_gemini_llm(multimodal=True)
-    response = gemini.generate_content([prompt, image])
-    return [Document(text=response.text)]
+def load_images(images):
+    """OCR several images concurrently, at most OCR_CONCURRENCY at a time."""
+    with ThreadPoolExecutor(max_workers=OCR_CONCURRENCY) as executor:
+        texts = list(executor.map(propagate(ocr_image), images))
+    return [Document(text=text) for text in texts]
 
 
 def load_text(text: str):
     return [Document(text=text)]
 
 
-def load_url(url: str):
-    reader = SimpleWebPageReader(html_to_text=True)
-    return reader.load_data([url])
+def get_web_fetcher():
+    global _web_fetcher
+    if _web_fetcher is None:
+        from web_fetch import WebFetcher
+
+        _web_fetcher = WebFetcher(
+            os.path.join(CACHE_DIR, "web"),
+            max_workers=URL_FETCH_WORKERS,
+            per_host=URL_FETCH_PER_HOST,
+            timeout=URL_FETCH_TIMEOUT
+        )
+    return _web_fetcher
+
+
+def load_url(url):
+    """Load one URL or a list of URLs, fetched concurrently."""
+    urls = url if isinstance(url, list) else [url]
+    texts = get_web_fetcher().fetch_many(urls)
+    return [Document(text=text, id_=u, metadata={"url": u}) for u, text in zip(urls, texts)]
 
 
 def load_from_type(input_type: str, value: str):
     if input_type == "pdf":
+        # iter_pdf records its own load time
         return load_pdf(value)
-    elif input_type == "image":
-        return load_image(value)
-    elif input_type == "url":
-        return load_url(value)
-    elif input_type == "text":
-        return load_text(value)
-    else:
-        raise ValueError(f"Unsupported input type: {input_type}")
+    with timed("load"):
+        if input_type == "image":
+            if isinstance(value, list):
+                return load_images(value)
+            return load_image(value)
+        elif input_type == "url":
+            return load_url(value)
+        elif input_type == "text":
+            return load_text(value)
+        else:
+            raise ValueError(f"Unsupported input type: {input_type}")
+
+
+def iter_from_type(input_type: str, value: str, stats=None):
+    """Like load_from_type, but PDFs are streamed page by page as they are extracted."""
+    if input_type == "pdf":
+        return iter_pdf(value, stats=stats)
+    return load_from_type(input_type, value)
+
+
+def collect_documents(documents, collected):
+    for doc in documents:
+        collected.append(doc)
+        yield doc
+
+
+def build_index(documents):
+    """Build an index from a list or stream of documents, chunking and embedding in batches."""
+    configure_models()
+    vector_store = NumpyVectorStore(quantization=VECTOR_STORE_QUANTIZATION)
+    index = VectorStoreIndex(nodes=[], storage_context=StorageContext.from_defaults(vector_store=vector_store))
+    batch = []
+    for doc in documents:
+        batch.append(doc)
+        if len(batch) == INDEX_BATCH_SIZE:
+            insert_documents(index, batch)
+            batch = []
+    if batch:
+        insert_documents(index, batch)
+    return index
+
+
+def source_key(input_type, value):
+    """Content hash identifying an ingested source, so identical uploads can share one index.
+
+    Covers the content itself (file contents, text, or URLs) plus everything that
+    changes the resulting nodes and vectors: embedding model, chunking and
+    quantization.
+    """
+    configure_models()
+    digest = hashlib.sha256()
+    for part in (input_type, EMBED_MODEL_NAME, Settings.chunk_size, Settings.chunk_overlap, VECTOR_STORE_QUANTIZATION):
+        digest.update(f"{part}\0".encode())
+    for item in value if isinstance(value, list) else [value]:
+        if isinstance(item, bytes):
+            digest.update(item)
+        elif input_type in ("pdf", "image"):
+            with open(item, "rb") as f:
+                for block in iter(lambda: f.read(1 << 20), b""):
+                    digest.update(block)
+        else:
+            digest.update(item.encode())
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def get_index_cache():
+    global _index_cache
+    if _index_cache is None:
+        from shared_sources import SharedSourceRegistry
+
+        # Memory-mapped, so a large manual's vectors are not read in before the first question
+        _index_cache = SharedSourceRegistry(os.path.join(CACHE_DIR, "indexes"), mmap=True)
+    return _index_cache
 
 
-def build_query_engine(documents):
-    index = VectorStoreIndex.from_documents(documents)
-    return index.as_query_engine()
+def load_or_build_source(input_type, value, summarize=True, rebuild=False, stats=None):
+    """Return ``(source, cached)`` with the input's index and summary, reusing the CLI's index cache.
+
+    Entries are keyed like shared sources, by content hash plus embedding and
+    chunking settings. URLs are fetched first (the web cache revalidates
+    them cheaply) and keyed by their text, so a changed page is rebuilt.
+    """
+    from shared_sources import SharedSource
+
+    cache = get_index_cache()
+    documents = None
+    if input_type == "url":
+        documents = load_from_type(input_type, value)
+        key = source_key(input_type, [doc.text for doc in documents])
+    else:
+        key = source_key(input_type, value)
+    if rebuild:
+        cache.discard(key)
+    else:
+        source = cache.load(key)
+        if source is not None:
+            return source, True
+
+    if documents is None:
+        documents = []
+        index = build_index(collect_documents(iter_from_type(input_type, value, stats), documents))
+    else:
+        index = build_index(documents)
+    summary = generate_summary(documents, input_type) if summarize else None
+    # A failed summary is shown this once and generated again next run instead of being cached
+    failed = summary is not None and summary.startswith("Could not generate summary")
+    source = SharedSource(key, index, documents, None if failed else summary, summary_ready=True)
+    cache.persist(source)
+    source.summary = summary
+    return source, False
+
+
+def build_query_engine(documents, streaming=False):
+    return build_retriever_engine([build_index(documents)], streaming=streaming)
+
+
+def embed_query(question):
+    configure_models()
+    return Settings.embed_model.get_query_embedding(question)
+
+
+def insert_documents(index, documents):
+    """Chunk and embed only the new documents into an existing index."""
+    configure_models()
+    nodes = run_transformations(documents, Settings.transformations)
+    index.insert_nodes(nodes)
+
+
+def embed_queries(questions):
+    """Embed many questions as retrieval queries, one request per embedding batch."""
+    configure_models()
+    embed_model = Settings.embed_model
+    model = getattr(embed_model, "wrapped_model", embed_model)
+    if not hasattr(model, "_embed_texts"):
+        # Only GoogleGenAIEmbedding exposes a batched call with the query task type
+        return [embed_model.get_query_embedding(question) for question in questions]
+    embeddings = []
+    for start in range(0, len(questions), model.embed_batch_size):
+        batch = questions[start:start + model.embed_batch_size]
+        tokens = sum(estimate_tokens(question) for question in batch)
+        with timed("embedding"):
+            embeddings.extend(call_with_retry(model._embed_texts, batch, task_type="RETRIEVAL_QUERY", tokens=tokens))
+    return embeddings
+
+
+def retrieve_batch(index, query_embeddings, similarity_top_k=DEFAULT_SIMILARITY_TOP_K, questions=None):
+    """Retrieve nodes for many query embeddings, in one vectorized pass when the store allows.
+
+    ``index`` may also be a list of indexes (a shared source plus a session's
+    overlay); each query then keeps its best ``similarity_top_k`` nodes overall.
+    With ``questions``, scores are fused with BM25 as in HybridRetriever.
+    """
+    if isinstance(index, list):
+        per_index = [retrieve_batch(i, query_embeddings, similarity_top_k, questions) for i in index]
+        return [
+            sorted((n for nodes in lists for n in nodes), key=lambda n: n.score or 0.0, reverse=True)[:similarity_top_k]
+            for lists in zip(*per_index)
+        ]
+    vector_store = index.vector_store
+    if not isinstance(vector_store, NumpyVectorStore):
+        retriever = index.as_retriever(similarity_top_k=similarity_top_k)
+        return [retriever.retrieve(QueryBundle("", embedding=e)) for e in query_embeddings]
+    with timed("retrieval"):
+        results = vector_store.query_batch(
+            query_embeddings, similarity_top_k, query_strs=questions, alpha=HYBRID_ALPHA if questions else None
+        )
+        return [
+            [
+                NodeWithScore(node=node, score=score)
+                for node, score in zip(index.docstore.get_nodes(result.ids), result.similarities)
+            ]
+            for result in results
+        ]
+
+
+def answer_questions(index, questions, query_engine=None, embeddings=None, concurrency=QUERY_BATCH_CONCURRENCY):
+    """Answer many questions against one index (or a list of them) and return ``(results, stats)``.
+
+    Questions are embedded in batched calls (skipped when ``embeddings`` is
+    given), retrieved in one vectorized pass, and synthesized concurrently,
+    at most ``concurrency`` at a time.
+    """
+    started = time.perf_counter()
+    if embeddings is None:
+        embeddings = embed_queries(questions)
+    embedded = time.perf_counter()
+    indexes = index if isinstance(index, list) else [index]
+    node_lists = retrieve_batch(index, embeddings, questions=questions)
+    # Applied here because synthesize() skips the engine's postprocessors
+    postprocessors = compression.node_postprocessors(indexes)
+    contexts = []
+    for i, question in enumerate(questions):
+        with compression.collect() as context:
+            for postprocessor in postprocessors:
+                node_lists[i] = postprocessor.postprocess_nodes(node_lists[i], query_str=question)
+        contexts.append(context)
+    retrieved = time.perf_counter()
+
+    engine = query_engine or build_retriever_engine(indexes)
+
+    def synthesize(args):
+        question, embedding, nodes = args
+        return str(engine.synthesize(QueryBundle(question, embedding=embedding), nodes))
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        answers = list(executor.map(propagate(synthesize), zip(questions, embeddings, node_lists)))
+    finished = time.perf_counter()
+
+    results = [
+        {
+            "question": question,
+            "answer": answer,
+            "not_found": is_answer_not_found(answer),
+            "retrieval_score": round(max((n.score or 0.0 for n in nodes), default=0.0), 4),
+            **({"context_tokens": context} if context else {}),
+        }
+        for question, answer, nodes, context in zip(questions, answers, node_lists, contexts)
+    ]
+    elapsed = finished - started
+    stats = {
+        "questions": len(questions),
+        "seconds": round(elapsed, 3),
+        "questions_per_second": round(len(questions) / elapsed, 2) if elapsed > 0 else None,
+        "embed_seconds": round(embedded - started, 3),
+        "retrieve_seconds": round(retrieved - embedded, 3),
+        "synthesis_seconds": round(finished - retrieved, 3),
+        "concurrency": concurrency,
+    }
+    return results, stats
+
+
+SUMMARY_PROMPTS = {
+    "image": "Provide a brief 2-3 sentence summary of the text extracted from this image:",
+    "pdf": "Provide a brief 2-3 sentence summary of this PDF document:",
+    "url": "Provide a brief 2-3 sentence summary of this webpage content:",
+    "mixed": "Provide a brief 2-3 sentence summary of this combined content from multiple sources:",
+}
+DEFAULT_SUMMARY_PROMPT = "Provide a brief 2-3 sentence summary of this text:"
+SECTION_SUMMARY_PROMPT = "Summarize this section of a longer document in 2-3 sentences:"
+
+
+def split_text(text, max_chars):
+    """Split on paragraph or whitespace boundaries into pieces of at most max_chars."""
+    chunks = []
+    while len(text) > max_chars:
+        cut = text.rfind("\n\n", 0, max_chars)
+        if cut <= 0:
+            cut = text.rfind(" ", 0, max_chars)
+        if cut <= 0:
+            cut = max_chars
+        chunks.append(text[:cut])
+        text = text[cut:].lstrip()
+    if text:
+        chunks.append(text)
+    return chunks
+
+
+def summarize_text(prompt, text):
+    key = summary_cache.key(prompt, text)
+    summary = summary_cache.get(key)
+    if summary is None:
+        summary = generate_content(f"{prompt}\n\n{text}").text
+        summary_cache.put(key, summary)
+    return summary
+
+
+def reduce_summaries(text, prompt):
+    """Map-reduce: summarize sections in parallel until the text fits one call."""
+    while len(text) > SUMMARY_CHUNK_CHARS:
+        chunks = split_text(text, SUMMARY_CHUNK_CHARS)
+        with ThreadPoolExecutor(max_workers=SUMMARY_CONCURRENCY) as executor:
+            section_summaries = list(executor.map(
+                propagate(lambda chunk: summarize_text(SECTION_SUMMARY_PROMPT, chunk)), chunks
+            ))
+        text = "\n\n".join(section_summaries)
+        prompt = f"{prompt}\n(The content is given as summaries of its consecutive sections.)"
+    return summarize_text(prompt, text)
 
 
 def generate_summary(documents, input_type):
     try:
-        combined_text = ""
-        for doc in documents:
-            combined_text += doc.text + "\n\n"
+        combined_text = "\n\n".join(doc.text for doc in documents)
         
         if len(combined_text.strip()) < 100:
             return combined_text.strip()
         
-        gemini = get_gemini_llm()
-        
-        if input_type == "image":
-            prompt = "Provide a brief 2-3 sentence summary of the text extracted from this image:"
-        elif input_type == "pdf":
-            prompt = "Provide a brief 2-3 sentence summary of this PDF document:"
-        elif input_type == "url":
-            prompt = "Provide a brief 2-3 sentence summary of this webpage content:"
-        elif input_type == "mixed":
-            prompt = "Provide a brief 2-3 sentence summary of this combined content from multiple sources:"
-        else:
-            prompt = "Provide a brief 2-3 sentence summary of this text:"
-        
-        full_prompt = f"{prompt}\n\n{combined_text[:2000]}..."
-        response = gemini.generate_content(full_prompt)
-        return response.text
+        prompt = SUMMARY_PROMPTS.get(input_type, DEFAULT_SUMMARY_PROMPT)
+        with timed("summary"):
+            return reduce_summaries(combined_text, prompt)
+    except Exception as e:
+        return f"Could not generate summary: {str(e)}"
+
+
+def merge_summaries(existing_summary, new_summary):
+    """Fold a newly added source's summary into the session summary with one small call."""
+    if not existing_summary:
+        return new_summary
+    try:
+        prompt = (
+            "Combine these two summaries into a brief 2-3 sentence summary of the "
+            "combined content from multiple sources:"
+        )
+        with timed("summary"):
+            return summarize_text(prompt, f"{existing_summary}\n\n{new_summary}")
     except Exception as e:
         return f"Could not generate summary: {str(e)}"
 
@@ -98,9 +559,7 @@ def generate_summary(documents, input_type):
 def generate_preview(documents, source_description):
     """Generate a brief preview of document content for display."""
     try:
-        combined_text = ""
-        for doc in documents:
-            combined_text += doc.text + "\n\n"
+        combined_text = "\n\n".join(doc.text for doc in documents)
         
         # Truncate to first 300 characters for preview
         preview_text = combined_text.strip()[:300]
@@ -122,20 +581,28 @@ def generate_preview(documents, source_description):
         }
 
 
-def search_web_with_google(query):
-    try:
+def get_search_llm():
+    global _search_llm
+    if _search_llm is None:
+        from google.genai import types
+        from llama_index.llms.google_genai import GoogleGenAI
+
         google_search_tool = types.Tool(
             google_search=types.GoogleSearch()
         )
-        
-        llm_with_search = GoogleGenAI(
-            model="gemini-1.5-flash",
+        _search_llm = GoogleGenAI(
+            model=GEMINI_MODEL_NAME,
             api_key=os.environ["GEMINI_API_KEY"],
             generation_config=types.GenerateContentConfig(tools=[google_search_tool])
         )
-        
+    return _search_llm
+
+
+def search_web_with_google(query):
+    try:
         search_prompt = f"Search the web for: {query}. Provide a concise answer based on the search results."
-        response = llm_with_search.complete(search_prompt)
+        # Throttled by the shared limiter; transient 429s are retried before giving up on search
+        response = call_with_retry(get_search_llm().complete, search_prompt)
         return str(response)
     except Exception as e:
         error_str = str(e)
@@ -149,13 +616,29 @@ def search_web_with_google(query):
 
 def answer_with_gemini(query):
     try:
-        gemini = get_gemini_llm()
-        response = gemini.generate_content(query)
-        return response.text
+        return generate_content(query).text
     except Exception as e:
         return f"Gemini search failed: {str(e)}"
 
 
+def answer_from_web(query):
+    """Google Search first, then Gemini's general knowledge when search is unavailable."""
+    google_result = search_web_with_google(query)
+    if google_result == "quota_exceeded":
+        return {
+            "answer": answer_with_gemini(query),
+            "source": "gemini_fallback",
+            "message": "Google Search quota exceeded. Used Gemini's general knowledge."
+        }
+    elif google_result.startswith("search_error:"):
+        return {
+            "answer": answer_with_gemini(query),
+            "source": "gemini_fallback",
+            "message": "Google search error. Used Gemini's general knowledge."
+        }
+    return {"answer": google_result, "source": "google_search"}
+
+
 def is_answer_not_found(response_text):
     not_found_phrases = [
         "does not provide",
@@ -183,20 +666,87 @@ def is_answer_not_found(response_text):
     return any(phrase in response_lower for phrase in not_found_phrases)
 
 
+def read_questions(path):
+    """Read a JSONL file of questions: strings, or objects with a question/query/body field."""
+    questions = []
+    with open(path) as f:
+        for line in f:
+            if not line.strip():
+                continue
+            item = json.loads(line)
+            if isinstance(item, str):
+                item = {"question": item}
+            item["question"] = item.get("question") or item.get("query") or item.get("body")
+            questions.append(item)
+    return questions
+
+
+def run_batch(index, questions_path, output_path=None):
+    """Answer every question in a JSONL file and write one JSON answer per line."""
+    items = read_questions(questions_path)
+    results, stats = answer_questions(index, [item["question"] for item in items])
+    output = open(output_path, "w") if output_path else sys.stdout
+    try:
+        for item, result in zip(items, results):
+            record = {k: item[k] for k in ("id", "request_id") if k in item}
+            output.write(json.dumps({**record, **result}) + "\n")
+    finally:
+        if output_path:
+            output.close()
+    print(
+        f"⚡ Answered {stats['questions']} questions in {stats['seconds']}s "
+        f"({stats['questions_per_second']} questions/s)",
+        file=sys.stderr
+    )
+
+
 def main():
-    if len(sys.argv) < 3:
-        print("Usage: python src/combined.py [pdf|image|url|text] <file_path|image_path|url|text>")
+    parser = argparse.ArgumentParser(description="Ask questions about a PDF, image, URL or text.")
+    parser.add_argument("input_type", nargs="?", choices=["pdf", "image", "url", "text"])
+    parser.add_argument("input_value", nargs="?", help="file path, image path, URL or text")
+    parser.add_argument("--batch", metavar="QUESTIONS_JSONL",
+                        help="answer the questions in this JSONL file non-interactively")
+    parser.add_argument("--output", metavar="ANSWERS_JSONL", help="where --batch writes answers (default: stdout)")
+    parser.add_argument("--rebuild", action="store_true", help="ignore the cached index for this input and build it again")
+    parser.add_argument("--prune-cache", nargs="?", type=float, const=INDEX_CACHE_MAX_AGE_DAYS, metavar="DAYS",
+                        help=f"delete cached indexes unused for DAYS days (default: {INDEX_CACHE_MAX_AGE_DAYS:g})")
+    args = parser.parse_args()
+
+    if args.prune_cache is not None:
+        removed = get_index_cache().prune(args.prune_cache * 86400)
+        print(f"🧹 Removed {removed} cached indexes unused for {args.prune_cache:g} days", file=sys.stderr)
+        if args.input_type is None:
+            return
+    if args.input_type is None or args.input_value is None:
+        parser.error("input_type and input_value are required")
+
+    input_type = args.input_type
+    input_value = args.input_value
+
+    if not args.batch:
+        print("📄 Processing your content...\n")
+    stats = {}
+    started = time.perf_counter()
+    # The summary is only needed (and only generated) for interactive use
+    source, cached = load_or_build_source(
+        input_type, input_value, summarize=not args.batch, rebuild=args.rebuild, stats=stats
+    )
+    if cached:
+        print(
+            f"⚡ Loaded cached index ({len(source.index.docstore.docs)} chunks) "
+            f"in {time.perf_counter() - started:.2f}s; use --rebuild to start over",
+            file=sys.stderr
+        )
+    if args.batch:
+        run_batch(source.index, args.batch, args.output)
         return
 
-    input_type = sys.argv[1]
-    input_value = sys.argv[2]
-
-    docs = load_from_type(input_type, input_value)
-    engine = build_query_engine(docs)
+    engine = build_retriever_engine([source.index], streaming=True)
+    if stats:
+        print(f"📑 Extracted {stats['pages']} pages in {stats['seconds']}s ({stats['pages_per_second']} pages/s)")
 
-    # Generate and show summary
-    print("📄 Processing your content...\n")
-    summary = generate_summary(docs, input_type)
+    # Show the summary, generating it if this input was first indexed by a --batch run
+    summary = source.summary or generate_summary(source.documents, input_type)
     print("📋 Summary:")
     print(f"{summary}\n")
     print("━" * 50)
@@ -211,10 +761,15 @@ def main():
             print("\n👋 Goodbye!")
             break
         
+        # Print tokens as they arrive instead of waiting for the full answer
         response = engine.query(query)
-        print(response)
+        response_text = ""
+        for token in response.response_gen:
+            response_text += token
+            print(token, end="", flush=True)
+        print()
         
-        if is_answer_not_found(str(response)):
+        if is_answer_not_found(response_text):
             print("\n⚠️  Information not found in the provided text.")
             try:
                 web_search = input("Would you like to search the web instead? (y/n): ").strip().lower()
@@ -0,0 +1,220 @@
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar, copy_context
+
+from llama_index.core.callbacks import CBEventType, EventPayload
+from llama_index.core.callbacks.base_handler import BaseCallbackHandler
+
+from rate_limit import estimate_tokens
+
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# LlamaIndex callback events recorded as pipeline stages
+EVENT_STAGES = {
+    CBEventType.CHUNKING: "chunking",
+    CBEventType.EMBEDDING: "embedding",
+    CBEventType.RETRIEVE: "retrieval",
+    CBEventType.SYNTHESIZE: "synthesis",
+    CBEventType.LLM: "llm",
+    CBEventType.QUERY: "query",
+}
+
+COUNTERS = {
+    "rag_llm_calls_total": "LLM calls made through LlamaIndex",
+    "rag_embedding_calls_total": "Embedding batches sent to the embedding model",
+    "rag_embedded_chunks_total": "Texts sent to the embedding model (embedding cache misses only)",
+    "rag_prompt_tokens_total": "Prompt tokens sent to the LLM",
+    "rag_completion_tokens_total": "Completion tokens received from the LLM",
+    "rag_context_tokens_retrieved_total": "Estimated tokens in retrieved chunks before context compression",
+    "rag_context_tokens_kept_total": "Estimated tokens left after context compression",
+    "rag_keyword_fast_path_total": "Queries retrieved from the keyword index without a query embedding",
+}
+
+# Stage totals for the request or job currently being timed, if any
+_timings = ContextVar("timings", default=None)
+
+
+class Histogram:
+    """Cumulative-bucket histogram with a single label, in Prometheus' layout."""
+
+    def __init__(self, name, help_text, label, buckets=BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.label = label
+        self.buckets = buckets
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, label_value, seconds):
+        with self._lock:
+            series = self._series.setdefault(
+                label_value, {"buckets": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+            )
+            for i, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    series["buckets"][i] += 1
+            series["sum"] += seconds
+            series["count"] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for value, series in sorted(self._series.items()):
+                label = f'{self.label}="{value}"'
+                for bound, count in zip(self.buckets, series["buckets"]):
+                    lines.append(f'{self.name}_bucket{{{label},le="{bound}"}} {count}')
+                lines.append(f'{self.name}_bucket{{{label},le="+Inf"}} {series["count"]}')
+                lines.append(f"{self.name}_sum{{{label}}} {series['sum']:.6f}")
+                lines.append(f"{self.name}_count{{{label}}} {series['count']}")
+        return lines
+
+
+stage_seconds = Histogram("rag_stage_seconds", "Seconds spent in each pipeline stage", "stage")
+request_seconds = Histogram("rag_http_request_seconds", "Seconds spent serving each endpoint", "endpoint")
+counters = Counter()
+_counters_lock = threading.Lock()
+# Worker threads add to the same timings dict as the request that started them
+_timings_lock = threading.Lock()
+
+
+def increment(name, value=1):
+    with _counters_lock:
+        counters[name] += value
+
+
+def observe_stage(stage, seconds):
+    stage_seconds.observe(stage, seconds)
+    timings = _timings.get()
+    if timings is not None:
+        with _timings_lock:
+            timings[stage] = timings.get(stage, 0.0) + seconds
+
+
+@contextmanager
+def timed(stage):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe_stage(stage, time.perf_counter() - started)
+
+
+def start_timings():
+    """Start collecting per-stage seconds in this context; returns ``(timings, token)``."""
+    timings = {}
+    return timings, _timings.set(timings)
+
+
+def stop_timings(token):
+    _timings.reset(token)
+
+
+@contextmanager
+def collect_timings():
+    """Collect per-stage seconds for everything timed in this context.
+
+    Work handed to a thread pool is only included when submitted through
+    ``propagate``.
+    """
+    timings, token = start_timings()
+    try:
+        yield timings
+    finally:
+        stop_timings(token)
+
+
+def propagate(fn):
+    """Wrap ``fn`` so calls on executor threads record into the caller's timings."""
+    context = copy_context()
+
+    def run(*args, **kwargs):
+        # Each call needs its own copy: a context cannot be entered by two threads at once
+        return context.copy().run(fn, *args, **kwargs)
+
+    return run
+
+
+def round_timings(timings):
+    return {stage: round(seconds, 4) for stage, seconds in timings.items()}
+
+
+def _usage(response):
+    """Prompt and completion token counts reported by Gemini, if present."""
+    raw = getattr(response, "raw", None)
+    usage = raw.get("usage_metadata") if isinstance(raw, dict) else None
+    if isinstance(usage, dict) and usage.get("prompt_token_count") is not None:
+        return usage["prompt_token_count"], usage.get("candidates_token_count") or 0
+    return None
+
+
+class MetricsCallbackHandler(BaseCallbackHandler):
+    """Times LlamaIndex stages and counts LLM/embedding calls and tokens."""
+
+    def __init__(self, skip_classes=("CachedEmbedding",)):
+        super().__init__(event_starts_to_ignore=[], event_ends_to_ignore=[])
+        # Wrappers whose inner model fires its own events; counting both would double-count
+        self.skip_classes = skip_classes
+        self._started = {}
+        self._skipped = set()
+        self._lock = threading.Lock()
+
+    def on_event_start(self, event_type, payload=None, event_id="", parent_id="", **kwargs):
+        serialized = (payload or {}).get(EventPayload.SERIALIZED) or {}
+        if event_type == CBEventType.EMBEDDING and serialized.get("class_name") in self.skip_classes:
+            with self._lock:
+                self._skipped.add(event_id)
+        elif event_type in EVENT_STAGES:
+            with self._lock:
+                self._started[event_id] = time.perf_counter()
+        return event_id
+
+    def on_event_end(self, event_type, payload=None, event_id="", **kwargs):
+        with self._lock:
+            if event_id in self._skipped:
+                self._skipped.discard(event_id)
+                return
+            started = self._started.pop(event_id, None)
+        if started is not None:
+            observe_stage(EVENT_STAGES[event_type], time.perf_counter() - started)
+        if payload is None:
+            return
+        if event_type == CBEventType.EMBEDDING:
+            increment("rag_embedding_calls_total")
+            increment("rag_embedded_chunks_total", len(payload.get(EventPayload.CHUNKS) or []))
+        elif event_type == CBEventType.LLM:
+            increment("rag_llm_calls_total")
+            self._count_tokens(payload)
+
+    def _count_tokens(self, payload):
+        response = payload.get(EventPayload.RESPONSE) or payload.get(EventPayload.COMPLETION)
+        usage = _usage(response)
+        if usage is None:
+            # Fall back to an estimate when the model does not report usage
+            if EventPayload.MESSAGES in payload:
+                prompt = " ".join(str(m.content or "") for m in payload[EventPayload.MESSAGES])
+            else:
+                prompt = str(payload.get(EventPayload.PROMPT) or "")
+            if hasattr(response, "message"):
+                completion = str(response.message.content or "")
+            else:
+                completion = str(getattr(response, "text", "") or "")
+            usage = (estimate_tokens(prompt), estimate_tokens(completion) if completion else 0)
+        increment("rag_prompt_tokens_total", usage[0])
+        increment("rag_completion_tokens_total", usage[1])
+
+    def start_trace(self, trace_id=None):
+        pass
+
+    def end_trace(self, trace_id=None, trace_map=None):
+        pass
+
+
+def render():
+    """All metrics in the Prometheus text exposition format."""
+    lines = stage_seconds.render() + request_seconds.render()
+    with _counters_lock:
+        for name, help_text in COUNTERS.items():
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} counter", f"{name} {counters[name]}"]
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,24 @@
+import io
+
+from PIL import Image
+
+
+def prepare_image(image_bytes, max_dimension=2048, quality=85):
+    """Downscale to ``max_dimension`` on the longest side and re-encode as JPEG.
+
+    Returns ``(mime_type, data)``. The original bytes are kept when the image
+    is already small enough and re-encoding would not make the upload smaller.
+    """
+    with Image.open(io.BytesIO(image_bytes)) as image:
+        image_format = (image.format or "").lower()
+        resized = max(image.size) > max_dimension
+        image.thumbnail((max_dimension, max_dimension))
+        if image.mode not in ("RGB", "L"):
+            image = image.convert("RGB")
+        buffer = io.BytesIO()
+        image.save(buffer, format="JPEG", quality=quality, optimize=True)
+
+    data = buffer.getvalue()
+    if not resized and len(data) >= len(image_bytes) and image_format in ("jpeg", "png"):
+        return f"image/{image_format}", image_bytes
+    return "image/jpeg", data
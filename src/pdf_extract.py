@@ -0,0 +1,96 @@
+import multiprocessing
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import pymupdf
+
+PDF_PAGES_PER_TASK = int(os.environ.get("PDF_PAGES_PER_TASK", "16"))
+PDF_WORKERS = int(os.environ.get("PDF_WORKERS", str(os.cpu_count() or 1)))
+
+_pool = None
+
+
+def get_pool():
+    # Shared by every upload so concurrent PDFs cannot oversubscribe the CPU.
+    # Forking a threaded server can deadlock the child on a lock held by
+    # another thread, so workers start from a clean forkserver process.
+    global _pool
+    if _pool is None:
+        context = multiprocessing.get_context("forkserver")
+        # Import the entry point and PyMuPDF once in the server, not in every worker
+        context.set_forkserver_preload(["__main__", "pdf_extract"])
+        _pool = ProcessPoolExecutor(max_workers=PDF_WORKERS, mp_context=context)
+    return _pool
+
+
+def open_pdf(source):
+    """Open a PDF from a file path or from its bytes."""
+    if isinstance(source, bytes):
+        return pymupdf.open(stream=source, filetype="pdf")
+    return pymupdf.open(source)
+
+
+def extract_page_range(source, start, end):
+    with open_pdf(source) as pdf:
+        return [pdf[number].get_text() for number in range(start, end)]
+
+
+def iter_pdf_pages(source, stats=None):
+    """Yield ``(page_number, text, total_pages)`` in page order.
+
+    ``source`` is a file path or the PDF's bytes. Page ranges are extracted
+    on a process pool with a bounded number of ranges in flight, so callers
+    can start chunking and embedding the first pages while later ones are
+    still being extracted. When ``stats`` is given it is filled with page
+    count, elapsed seconds and pages per second.
+    """
+    started = time.perf_counter()
+    with open_pdf(source) as pdf:
+        total_pages = len(pdf)
+
+    pages_per_task = PDF_PAGES_PER_TASK
+    if isinstance(source, bytes):
+        # Every task ships the whole document to its worker, so bytes get
+        # at most two ranges per worker instead of one per PDF_PAGES_PER_TASK
+        pages_per_task = max(pages_per_task, -(-total_pages // (PDF_WORKERS * 2)))
+    ranges = [
+        (start, min(start + pages_per_task, total_pages))
+        for start in range(0, total_pages, pages_per_task)
+    ]
+
+    def report():
+        if stats is not None:
+            elapsed = time.perf_counter() - started
+            stats["pages"] = total_pages
+            stats["seconds"] = round(elapsed, 3)
+            stats["pages_per_second"] = round(total_pages / elapsed, 1) if elapsed > 0 else None
+
+    # Small files are not worth the round trip to a worker process
+    if len(ranges) <= 1:
+        for number, text in enumerate(extract_page_range(source, 0, total_pages)):
+            yield number + 1, text, total_pages
+        report()
+        return
+
+    pool = get_pool()
+    pending = deque()
+    next_range = 0
+    max_in_flight = PDF_WORKERS * 2
+    try:
+        while next_range < len(ranges) or pending:
+            while next_range < len(ranges) and len(pending) < max_in_flight:
+                start, end = ranges[next_range]
+                pending.append((start, end, pool.submit(extract_page_range, source, start, end)))
+                next_range += 1
+
+            start, end, future = pending.popleft()
+            for offset, text in enumerate(future.result()):
+                yield start + offset + 1, text, total_pages
+            if stats is not None:
+                stats["pages_done"] = end
+    finally:
+        for _, _, future in pending:
+            future.cancel()
+    report()
@@ -0,0 +1,147 @@
+import os
+import random
+import threading
+import time
+
+from llama_index.core.instrumentation.event_handlers import BaseEventHandler
+from llama_index.core.instrumentation.events.embedding import EmbeddingStartEvent
+from llama_index.core.instrumentation.events.llm import LLMChatStartEvent, LLMCompletionStartEvent
+
+GEMINI_REQUESTS_PER_MINUTE = int(os.environ.get("GEMINI_REQUESTS_PER_MINUTE", "60"))
+GEMINI_TOKENS_PER_MINUTE = int(os.environ.get("GEMINI_TOKENS_PER_MINUTE", "1000000"))
+GEMINI_MAX_RETRIES = int(os.environ.get("GEMINI_MAX_RETRIES", "4"))
+GEMINI_RETRY_BASE_SECONDS = float(os.environ.get("GEMINI_RETRY_BASE_SECONDS", "1.0"))
+GEMINI_RETRY_MAX_SECONDS = float(os.environ.get("GEMINI_RETRY_MAX_SECONDS", "20.0"))
+
+# Gemini bills an image part at a flat token count regardless of its size
+IMAGE_TOKENS = 258
+
+
+def estimate_tokens(text):
+    """Rough token count (about four characters per token) for budgeting only."""
+    return len(text) // 4 + 1
+
+
+def is_rate_limit_error(error):
+    message = str(error)
+    return any(marker in message for marker in ("429", "RESOURCE_EXHAUSTED", "503", "UNAVAILABLE"))
+
+
+class TokenBucketLimiter:
+    """Process-wide requests-per-minute and tokens-per-minute budget.
+
+    Both buckets refill continuously. ``acquire`` blocks until the request fits
+    in both, so a burst of callers queues up for a moment instead of hitting
+    429s from the API.
+    """
+
+    def __init__(self, requests_per_minute, tokens_per_minute):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self._requests = float(requests_per_minute)
+        self._tokens = float(tokens_per_minute)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+        self._stats = {
+            "requests": 0, "tokens": 0, "throttled": 0,
+            "wait_seconds": 0.0, "max_wait_seconds": 0.0,
+            "retries": 0, "rate_limit_errors": 0,
+        }
+
+    def _refill(self, now):
+        elapsed = now - self._updated
+        self._updated = now
+        self._requests = min(self.requests_per_minute, self._requests + elapsed * self.requests_per_minute / 60)
+        self._tokens = min(self.tokens_per_minute, self._tokens + elapsed * self.tokens_per_minute / 60)
+
+    def acquire(self, tokens=0):
+        # A single request larger than the whole budget would otherwise wait forever
+        tokens = min(tokens, self.tokens_per_minute)
+        started = time.monotonic()
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self._requests >= 1 and self._tokens >= tokens:
+                    self._requests -= 1
+                    self._tokens -= tokens
+                    waited = now - started
+                    self._stats["requests"] += 1
+                    self._stats["tokens"] += tokens
+                    if waited > 0.001:
+                        self._stats["throttled"] += 1
+                        self._stats["wait_seconds"] += waited
+                        self._stats["max_wait_seconds"] = max(self._stats["max_wait_seconds"], waited)
+                    return waited
+                delay = max(
+                    (1 - self._requests) * 60 / self.requests_per_minute,
+                    (tokens - self._tokens) * 60 / self.tokens_per_minute,
+                )
+            time.sleep(min(max(delay, 0.01), 1.0))
+
+    def record(self, name):
+        with self._lock:
+            self._stats[name] += 1
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        stats["requests_per_minute"] = self.requests_per_minute
+        stats["tokens_per_minute"] = self.tokens_per_minute
+        stats["wait_seconds"] = round(stats["wait_seconds"], 3)
+        stats["max_wait_seconds"] = round(stats["max_wait_seconds"], 3)
+        stats["avg_wait_seconds"] = (
+            round(stats["wait_seconds"] / stats["throttled"], 3) if stats["throttled"] else 0.0
+        )
+        return stats
+
+
+gemini_limiter = TokenBucketLimiter(GEMINI_REQUESTS_PER_MINUTE, GEMINI_TOKENS_PER_MINUTE)
+
+
+def call_with_retry(fn, *args, tokens=None, limiter=gemini_limiter, **kwargs):
+    """Call ``fn`` and retry rate-limit and overload errors with full-jitter backoff.
+
+    When ``tokens`` is given every attempt first takes its share of ``limiter``;
+    leave it as None for calls that are already throttled by ``LimiterEventHandler``.
+    """
+    for attempt in range(GEMINI_MAX_RETRIES + 1):
+        if tokens is not None:
+            limiter.acquire(tokens)
+        try:
+            return fn(*args, **kwargs)
+        except Exception as e:
+            if not is_rate_limit_error(e):
+                raise
+            limiter.record("rate_limit_errors")
+            if attempt == GEMINI_MAX_RETRIES:
+                raise
+            limiter.record("retries")
+            time.sleep(random.uniform(0, min(GEMINI_RETRY_MAX_SECONDS, GEMINI_RETRY_BASE_SECONDS * 2 ** attempt)))
+
+
+class LimiterEventHandler(BaseEventHandler):
+    """Throttles every LlamaIndex LLM and embedding call through a shared limiter.
+
+    LlamaIndex fires the start events synchronously right before the request
+    goes out, so blocking here delays the call itself.
+    """
+
+    limiter: TokenBucketLimiter
+    # Wrappers whose inner model fires its own events; counting both would double-charge
+    skip_classes: tuple = ("CachedEmbedding",)
+
+    model_config = {"arbitrary_types_allowed": True}
+
+    @classmethod
+    def class_name(cls):
+        return "LimiterEventHandler"
+
+    def handle(self, event, **kwargs):
+        if isinstance(event, LLMChatStartEvent):
+            self.limiter.acquire(sum(estimate_tokens(str(m.content or "")) for m in event.messages))
+        elif isinstance(event, LLMCompletionStartEvent):
+            self.limiter.acquire(estimate_tokens(event.prompt))
+        elif isinstance(event, EmbeddingStartEvent):
+            if event.model_dict.get("class_name") not in self.skip_classes:
+                self.limiter.acquire()
@@ -0,0 +1,93 @@
+import fcntl
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+
+class SessionCatalog:
+    """SQLite catalog of published sessions, shared by every worker process.
+
+    Each session row carries a version that is bumped whenever its index is
+    rewritten on disk, so a worker can tell whether its in-memory copy is
+    stale. Summaries and ingestion job progress live here too, so a request
+    may land on any worker. ``lock`` serializes writers across processes.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._locks_dir = os.path.join(os.path.dirname(path), ".locks")
+        os.makedirs(self._locks_dir, exist_ok=True)
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS sessions ("
+                "session_id TEXT PRIMARY KEY, version INTEGER NOT NULL, summary TEXT, updated_at REAL)"
+            )
+            conn.execute("CREATE TABLE IF NOT EXISTS jobs (job_id TEXT PRIMARY KEY, data TEXT, updated_at REAL)")
+
+    def _connect(self):
+        # sqlite3 connections cannot be shared between threads, or across a fork
+        if getattr(self._local, "pid", None) != os.getpid():
+            self._local.conn = sqlite3.connect(self.path, timeout=30)
+            self._local.conn.execute("PRAGMA journal_mode=WAL")
+            self._local.pid = os.getpid()
+        return self._local.conn
+
+    def get(self, session_id):
+        """Return ``(version, summary)``, or None if the session was never published."""
+        return self._connect().execute(
+            "SELECT version, summary FROM sessions WHERE session_id = ?", (session_id,)
+        ).fetchone()
+
+    def version(self, session_id):
+        row = self.get(session_id)
+        return row[0] if row else None
+
+    def next_version(self, session_id):
+        return (self.version(session_id) or 0) + 1
+
+    def publish(self, session_id, version, summary):
+        """Point the session at ``version``, which must already be written to disk."""
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO sessions (session_id, version, summary, updated_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(session_id) DO UPDATE SET "
+                "version = excluded.version, summary = excluded.summary, updated_at = excluded.updated_at",
+                (session_id, version, summary, time.time())
+            )
+
+    def set_summary(self, session_id, summary):
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE sessions SET summary = ?, updated_at = ? WHERE session_id = ?",
+                (summary, time.time(), session_id)
+            )
+
+    def count(self):
+        return self._connect().execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+
+    def put_job(self, job_id, data, retention_seconds=3600):
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO jobs (job_id, data, updated_at) VALUES (?, ?, ?)",
+                (job_id, json.dumps(data), now)
+            )
+            conn.execute("DELETE FROM jobs WHERE updated_at < ?", (now - retention_seconds,))
+
+    def get_job(self, job_id):
+        row = self._connect().execute("SELECT data FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    @contextmanager
+    def lock(self, session_id):
+        """Exclusive lock on ``session_id`` across threads and worker processes."""
+        with open(os.path.join(self._locks_dir, f"{session_id}.lock"), "a") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
@@ -0,0 +1,374 @@
+import json
+import os
+import shutil
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from llama_index.core import StorageContext, load_index_from_storage
+from llama_index.core.query_engine import RetrieverQueryEngine
+from llama_index.core.schema import Document
+
+from answer_cache import AnswerCache
+from compression import node_postprocessors
+from hybrid_retrieval import HybridRetriever
+from shared_sources import estimate_index_bytes
+from vector_store import load_vector_store
+
+
+class Session:
+    """A session's view of its content: a shared source plus an optional private overlay.
+
+    The source index is shared read-only with every session that uploaded the
+    same content. Context added later goes into ``overlay``, an index owned by
+    this session alone, and queries search both.
+    """
+
+    def __init__(self, source, summary, overlay=None, documents=None):
+        self.source = source
+        self.overlay = overlay
+        # Only documents added to this session; the source's are shared
+        self.documents = documents if documents is not None else []
+        self.answer_cache = AnswerCache()
+        self.summary = summary
+        self.last_access = time.monotonic()
+        # Catalog version this copy was loaded from (multi-process mode only)
+        self.version = None
+        self._build_engines()
+        self.size_bytes = estimate_session_bytes(self)
+
+    @property
+    def indexes(self):
+        return [self.source.index] + ([self.overlay] if self.overlay is not None else [])
+
+    @property
+    def node_count(self):
+        return sum(len(index.docstore.docs) for index in self.indexes)
+
+    def _build_engines(self):
+        postprocessors = node_postprocessors(self.indexes)
+        self.retriever = HybridRetriever(self.indexes)
+        self.query_engine = RetrieverQueryEngine.from_args(self.retriever, node_postprocessors=postprocessors)
+        self.streaming_engine = RetrieverQueryEngine.from_args(
+            self.retriever, streaming=True, node_postprocessors=postprocessors
+        )
+
+    def add_overlay(self, index):
+        """Copy-on-write: give this session a private index layered over the shared one."""
+        self.overlay = index
+        self._build_engines()
+
+
+def estimate_session_bytes(session):
+    """Memory this session holds on its own; shared sources are counted by the registry."""
+    if session.overlay is None:
+        return sum(len(doc.text) for doc in session.documents)
+    return estimate_index_bytes(session.overlay, session.documents)
+
+
+class SessionStore:
+    """Session registry with a memory budget and idle TTL.
+
+    Sessions pushed out of memory are persisted under ``persist_dir`` through
+    LlamaIndex storage and loaded back the next time they are requested. Their
+    shared sources go to ``sources`` and count against the same budget once.
+
+    With a ``catalog`` (multi-process serving), every change is written
+    through to disk and published there instead, so any worker can serve any
+    session: a worker whose copy is older than the catalog reloads it, with
+    vectors memory-mapped rather than read into each process.
+    """
+
+    def __init__(self, persist_dir, memory_budget_bytes, idle_ttl_seconds, sources, catalog=None):
+        self.persist_dir = persist_dir
+        self.sources = sources
+        self.catalog = catalog
+        self.memory_budget_bytes = memory_budget_bytes
+        self.idle_ttl_seconds = idle_ttl_seconds
+        self.evictions = 0
+        self.expirations = 0
+        self.reloads = 0
+        self._sessions = OrderedDict()
+        # Sessions dropped from memory whose spill to disk has not finished yet
+        self._spilling = {}
+        # Spills finished so far, so a reload that raced one knows it may have read a stale copy
+        self._spills = 0
+        self._lock = threading.RLock()
+        self._write_lock = threading.Lock()
+        # session_id -> [lock, number of callers holding or waiting on it]
+        self._session_locks = {}
+        os.makedirs(persist_dir, exist_ok=True)
+
+    def _session_dir(self, session_id, version=None):
+        # session_id comes from the client, so never let it leave persist_dir
+        if not session_id or session_id.startswith(".") or os.path.basename(session_id) != session_id:
+            return None
+        session_dir = os.path.join(self.persist_dir, session_id)
+        return session_dir if version is None else os.path.join(session_dir, f"v{version}")
+
+    def __contains__(self, session_id):
+        with self._lock:
+            if session_id in self._sessions or session_id in self._spilling:
+                return True
+        session_dir = self._session_dir(session_id)
+        if session_dir is None:
+            return False
+        if self.catalog is not None:
+            return self.catalog.version(session_id) is not None
+        return os.path.exists(os.path.join(session_dir, "session.json"))
+
+    @contextmanager
+    def lock(self, session_id):
+        """Hold while changing a session, so concurrent add-context calls apply in order."""
+        if self.catalog is not None:
+            with self.catalog.lock(session_id):
+                yield
+            return
+        # Counted from before the lock is acquired, so it is only discarded once no caller can still use it
+        with self._lock:
+            entry = self._session_locks.setdefault(session_id, [threading.Lock(), 0])
+            entry[1] += 1
+        try:
+            with entry[0]:
+                yield
+        finally:
+            with self._lock:
+                entry[1] -= 1
+                if entry[1] == 0:
+                    del self._session_locks[session_id]
+
+    def put(self, session_id, source, summary):
+        """Register a session; it takes over the caller's reference to ``source``."""
+        session = Session(source, summary)
+        if self.catalog is not None:
+            self._publish(session_id, session)
+        with self._lock:
+            self._sessions[session_id] = session
+            self._sessions.move_to_end(session_id)
+        self._enforce_limits(keep=session_id)
+        return session
+
+    def get(self, session_id):
+        """Return the live session, reloading it from disk if it was evicted or changed elsewhere.
+
+        Sessions are read from disk outside the store lock, so a slow reload does
+        not hold up requests for other sessions.
+        """
+        session = None
+        while session is None:
+            with self._lock:
+                session = self._resident(session_id)
+                spills = self._spills
+            if session is not None:
+                break
+            loaded = self._load(session_id)
+            with self._lock:
+                session = self._resident(session_id)
+                if session is None and self._spills == spills:
+                    if loaded is None:
+                        return None
+                    session, loaded = loaded, None
+                    self._sessions[session_id] = session
+                    self.reloads += 1
+            if loaded is not None:
+                # Another request brought the session back first, or a spill
+                # finished while it was read and the copy may be stale
+                self.sources.release(loaded.source)
+        with self._lock:
+            session.last_access = time.monotonic()
+            if session_id in self._sessions:
+                self._sessions.move_to_end(session_id)
+        self._enforce_limits(keep=session_id)
+        return session
+
+    def _resident(self, session_id):
+        """The session if it is in memory or still being spilled; called under the store lock."""
+        session = self._sessions.get(session_id)
+        if session is not None and self.catalog is not None:
+            # Another worker may have added context since this copy was loaded
+            version, summary = self.catalog.get(session_id)
+            if session.version != version:
+                self._drop(session_id)
+                session = None
+            else:
+                session.summary = summary
+        if session is None:
+            session = self._spilling.pop(session_id, None)
+            if session is None:
+                return None
+            # Still being written out; take it back rather than read a partial copy
+            self._reacquire_source(session)
+            self._sessions[session_id] = session
+            self.reloads += 1
+        return session
+
+    def touch(self, session_id):
+        """Recompute a session's size after its index or documents changed, publishing it if shared."""
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                return
+            session.size_bytes = estimate_session_bytes(session)
+            if self.catalog is not None:
+                self._publish(session_id, session)
+        self._enforce_limits(keep=session_id)
+
+    def set_summary(self, session_id, summary):
+        with self.lock(session_id):
+            session = self.get(session_id)
+            if session is None:
+                return
+            session.summary = summary
+            if self.catalog is not None:
+                self.catalog.set_summary(session_id, summary)
+
+    def memory_bytes(self):
+        with self._lock:
+            return sum(s.size_bytes for s in self._sessions.values()) + self.sources.memory_bytes()
+
+    def _enforce_limits(self, keep=None):
+        """Spill idle sessions, then least recently used ones until memory fits the budget.
+
+        Victims are chosen under the store lock but written to disk after it is
+        released, so a slow spill does not hold up requests for other sessions.
+        """
+        with self._lock:
+            victims = self._choose_victims(keep)
+        for session_id, session in victims:
+            self._spill(session_id, session)
+
+    def _choose_victims(self, keep):
+        now = time.monotonic()
+        victims = []
+        for session_id, session in list(self._sessions.items()):
+            if session_id != keep and now - session.last_access > self.idle_ttl_seconds:
+                victims.append(self._detach(session_id))
+                self.expirations += 1
+
+        # Least recently used sessions go first; the active one always stays.
+        # A shared source is only freed once every session using it is gone
+        while self.memory_bytes() > self.memory_budget_bytes:
+            victim = next((sid for sid in self._sessions if sid != keep), None)
+            if victim is None:
+                break
+            victims.append(self._detach(victim))
+            self.evictions += 1
+        return victims
+
+    def _write(self, session, session_dir):
+        tmp_dir = f"{session_dir}.{os.getpid()}.tmp"
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+        self.sources.persist(session.source)
+        os.makedirs(tmp_dir)
+        if session.overlay is not None:
+            session.overlay.storage_context.persist(persist_dir=tmp_dir)
+        with open(os.path.join(tmp_dir, "session.json"), "w") as f:
+            json.dump({
+                "source_key": session.source.key,
+                "overlay_index_id": session.overlay.index_id if session.overlay is not None else None,
+                "summary": session.summary,
+                "documents": [doc.to_dict() for doc in session.documents],
+            }, f)
+
+        shutil.rmtree(session_dir, ignore_errors=True)
+        os.replace(tmp_dir, session_dir)
+
+    def _publish(self, session_id, session):
+        # Each version gets its own directory, so readers never see a half-written one
+        version = self.catalog.next_version(session_id)
+        os.makedirs(self._session_dir(session_id), exist_ok=True)
+        self._write(session, self._session_dir(session_id, version))
+        self.catalog.publish(session_id, version, session.summary)
+        session.version = version
+        # The previous version stays for workers that are still loading it
+        for name in os.listdir(self._session_dir(session_id)):
+            if name.startswith("v") and name[1:].isdigit() and int(name[1:]) < version - 1:
+                shutil.rmtree(os.path.join(self._session_dir(session_id), name), ignore_errors=True)
+
+    def _drop(self, session_id):
+        session = self._sessions.pop(session_id)
+        self.sources.release(session.source)
+        return session
+
+    def _detach(self, session_id):
+        """Drop a session from memory, keeping it reachable until ``_spill`` has written it."""
+        session = self._drop(session_id)
+        # Published sessions are already on disk
+        if self.catalog is None:
+            self._spilling[session_id] = session
+        return session_id, session
+
+    def _spill(self, session_id, session):
+        if self.catalog is not None:
+            return
+        # A session taken back and spilled again must not race its earlier write
+        with self._write_lock:
+            self._write(session, self._session_dir(session_id))
+        with self._lock:
+            if self._spilling.get(session_id) is session:
+                del self._spilling[session_id]
+            self._spills += 1
+
+    def _reacquire_source(self, session):
+        source, _ = self.sources.acquire(session.source.key, lambda: session.source)
+        if source is not session.source:
+            # Another session reloaded the same content from disk in the meantime
+            session.source = source
+            session._build_engines()
+
+    def _load(self, session_id):
+        if self.catalog is not None:
+            row = self.catalog.get(session_id) if self._session_dir(session_id) is not None else None
+            if row is None:
+                return None
+            version, summary = row
+            session = self._load_dir(self._session_dir(session_id, version))
+            if session is not None:
+                session.version = version
+                session.summary = summary
+            return session
+        return self._load_dir(self._session_dir(session_id))
+
+    def _load_dir(self, session_dir):
+        if session_dir is None or not os.path.exists(os.path.join(session_dir, "session.json")):
+            return None
+        meta_path = os.path.join(session_dir, "session.json")
+        with open(meta_path) as f:
+            meta = json.load(f)
+        documents = [Document.from_dict(doc) for doc in meta["documents"]]
+
+        source = self.sources.acquire_persisted(meta["source_key"])
+        if source is None:
+            return None
+        overlay = None
+        if meta["overlay_index_id"] is not None:
+            overlay = self._load_index(session_dir, meta["overlay_index_id"])
+        return Session(source, meta["summary"], overlay, documents)
+
+    def _load_index(self, persist_dir, index_id):
+        storage_context = StorageContext.from_defaults(
+            persist_dir=persist_dir, vector_store=load_vector_store(persist_dir, mmap=self.catalog is not None)
+        )
+        return load_index_from_storage(storage_context, index_id=index_id)
+
+    def stats(self):
+        with self._lock:
+            if self.catalog is not None:
+                on_disk = self.catalog.count() - len(self._sessions)
+            else:
+                on_disk = sum(
+                    1 for name in os.listdir(self.persist_dir)
+                    if not name.endswith(".tmp") and name not in self._sessions
+                )
+            return {
+                "sessions_in_memory": len(self._sessions),
+                "sessions_on_disk": on_disk,
+                "memory_bytes": self.memory_bytes(),
+                "memory_budget_bytes": self.memory_budget_bytes,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "reloads": self.reloads,
+                "shared_sources": self.sources.stats(),
+            }
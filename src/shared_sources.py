@@ -0,0 +1,203 @@
+import json
+import os
+import shutil
+import threading
+import time
+from concurrent.futures import Future
+
+from llama_index.core import StorageContext, load_index_from_storage
+from llama_index.core.schema import Document
+
+from vector_store import load_vector_store
+
+
+def estimate_index_bytes(index, documents):
+    """Rough resident size: raw text for documents and nodes plus embedding lists."""
+    text_bytes = sum(len(doc.text) for doc in documents)
+    node_bytes = sum(len(node.get_content()) for node in index.docstore.docs.values())
+    vector_store = index.vector_store
+    vector_bytes = getattr(vector_store, "memory_bytes", 0)
+    embedding_dict = getattr(vector_store, "data", None)
+    if embedding_dict is not None:
+        # Embeddings are Python float lists: ~8 bytes per pointer + 24 per float object
+        vector_bytes = sum(len(e) * 32 for e in embedding_dict.embedding_dict.values())
+    return text_bytes + node_bytes + vector_bytes
+
+
+class SharedSource:
+    """One ingested source: its index, documents and summary, read-only once published.
+
+    Every session that uploaded the same content holds a reference to the
+    same SharedSource instead of building its own copy.
+    """
+
+    def __init__(self, key, index, documents, summary=None, summary_ready=False):
+        self.key = key
+        self.index = index
+        self.documents = documents
+        self.summary = summary
+        self.refs = 0
+        self.size_bytes = estimate_index_bytes(index, documents)
+        self._summary_ready = threading.Event()
+        if summary_ready:
+            self._summary_ready.set()
+
+    def set_summary(self, summary):
+        self.summary = summary
+        self._summary_ready.set()
+
+    def wait_summary(self, timeout=None):
+        self._summary_ready.wait(timeout)
+        return self.summary
+
+
+class SharedSourceRegistry:
+    """Ref-counted sources keyed by content hash.
+
+    ``acquire`` builds a source at most once, even for concurrent uploads of
+    the same content, and ``release`` drops it from memory when its last
+    session goes away. Sources are persisted under ``persist_dir`` when a
+    session referencing them is spilled, so it can be reloaded later. With
+    ``mmap``, reloaded vectors are memory-mapped, so worker processes share
+    their pages instead of each holding a copy.
+    """
+
+    def __init__(self, persist_dir, mmap=False):
+        self.persist_dir = persist_dir
+        self.mmap = mmap
+        self.builds = 0
+        self.hits = 0
+        self.frees = 0
+        self._sources = {}
+        self._building = {}
+        self._lock = threading.Lock()
+        os.makedirs(persist_dir, exist_ok=True)
+
+    def acquire(self, key, build):
+        """Return ``(source, shared)`` holding a new reference, calling ``build()`` only if needed."""
+        while True:
+            with self._lock:
+                source = self._sources.get(key)
+                if source is not None:
+                    source.refs += 1
+                    self.hits += 1
+                    return source, True
+                future = self._building.get(key)
+                owner = future is None
+                if owner:
+                    future = self._building[key] = Future()
+            if owner:
+                break
+            # Someone else is building the same content; wait for it, then take a reference
+            future.result()
+
+        try:
+            source = build()
+        except BaseException as e:
+            with self._lock:
+                del self._building[key]
+            future.set_exception(e)
+            raise
+        with self._lock:
+            source.refs = 1
+            self._sources[key] = source
+            del self._building[key]
+            self.builds += 1
+        future.set_result(source)
+        return source, False
+
+    def release(self, source):
+        with self._lock:
+            source.refs -= 1
+            if source.refs <= 0 and self._sources.get(source.key) is source:
+                del self._sources[source.key]
+                self.frees += 1
+
+    def _source_dir(self, key):
+        return os.path.join(self.persist_dir, key)
+
+    def persist(self, source):
+        """Write ``source`` to disk once; content-keyed sources never change afterwards."""
+        source_dir = self._source_dir(source.key)
+        if os.path.exists(os.path.join(source_dir, "source.json")):
+            return
+        tmp_dir = f"{source_dir}.{os.getpid()}.{threading.get_ident()}.tmp"
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        source.index.storage_context.persist(persist_dir=tmp_dir)
+        with open(os.path.join(tmp_dir, "source.json"), "w") as f:
+            json.dump({
+                "index_id": source.index.index_id,
+                "summary": source.summary,
+                "documents": [doc.to_dict() for doc in source.documents],
+            }, f)
+        try:
+            os.replace(tmp_dir, source_dir)
+        except OSError:
+            # Another thread or worker persisted it first
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    def load(self, key):
+        """Read a persisted source, or return None if it was never persisted."""
+        source_dir = self._source_dir(key)
+        meta_path = os.path.join(source_dir, "source.json")
+        if not os.path.exists(meta_path):
+            return None
+        with open(meta_path) as f:
+            meta = json.load(f)
+        # Records the last use, for prune()
+        os.utime(meta_path)
+        storage_context = StorageContext.from_defaults(
+            persist_dir=source_dir, vector_store=load_vector_store(source_dir, mmap=self.mmap)
+        )
+        index = load_index_from_storage(storage_context, index_id=meta["index_id"])
+        documents = [Document.from_dict(doc) for doc in meta["documents"]]
+        return SharedSource(key, index, documents, meta["summary"], summary_ready=True)
+
+    def discard(self, key):
+        """Delete the persisted copy of ``key``, if any."""
+        shutil.rmtree(self._source_dir(key), ignore_errors=True)
+
+    def prune(self, max_age_seconds):
+        """Delete persisted sources not loaded or written in ``max_age_seconds``; returns how many."""
+        cutoff = time.time() - max_age_seconds
+        removed = 0
+        for name in os.listdir(self.persist_dir):
+            path = os.path.join(self.persist_dir, name)
+            if name.endswith(".tmp"):
+                # Left behind by a run that died while persisting
+                if os.path.getmtime(path) < cutoff:
+                    shutil.rmtree(path, ignore_errors=True)
+                continue
+            meta_path = os.path.join(path, "source.json")
+            if os.path.exists(meta_path) and os.path.getmtime(meta_path) < cutoff:
+                self.discard(name)
+                removed += 1
+        return removed
+
+    def acquire_persisted(self, key):
+        """Acquire ``key`` from memory or disk; returns None when it exists in neither."""
+        def build():
+            source = self.load(key)
+            if source is None:
+                raise KeyError(key)
+            return source
+
+        try:
+            return self.acquire(key, build)[0]
+        except KeyError:
+            return None
+
+    def memory_bytes(self):
+        with self._lock:
+            return sum(source.size_bytes for source in self._sources.values())
+
+    def stats(self):
+        with self._lock:
+            return {
+                "sources_in_memory": len(self._sources),
+                "references": sum(source.refs for source in self._sources.values()),
+                "memory_bytes": sum(source.size_bytes for source in self._sources.values()),
+                "builds": self.builds,
+                "shared_hits": self.hits,
+                "frees": self.frees,
+            }
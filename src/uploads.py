@@ -0,0 +1,139 @@
+import fcntl
+import json
+import os
+import time
+import uuid
+from tempfile import SpooledTemporaryFile
+
+from flask import Request
+
+UPLOAD_BLOCK_SIZE = 1024 * 1024
+
+
+class SpooledUploadRequest(Request):
+    """Request whose multipart files are spooled in memory up to ``spool_bytes``.
+
+    Werkzeug's default rolls files over 500KB into the shared temp directory;
+    here they stay in memory, so they can be handed to PyMuPDF and PIL as
+    bytes, and only larger ones spill to ``spool_dir``.
+    """
+
+    spool_bytes = 32 * 1024 * 1024
+    spool_dir = None
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        return SpooledTemporaryFile(max_size=self.spool_bytes, mode="rb+", dir=self.spool_dir)
+
+
+class ChunkedUploads:
+    """Resumable uploads assembled on disk from chunks sent in separate requests.
+
+    An upload is created with its final size, then filled by writing chunks
+    at increasing offsets. A client that loses its connection asks for
+    ``received`` and continues from there. Uploads live under ``upload_dir``
+    so that any worker can take the next chunk.
+    """
+
+    def __init__(self, upload_dir, max_bytes, retention_seconds=86400):
+        self.upload_dir = upload_dir
+        self.max_bytes = max_bytes
+        self.retention_seconds = retention_seconds
+        os.makedirs(upload_dir, exist_ok=True)
+
+    def _paths(self, upload_id):
+        # upload_id comes from the client, so only accept what create() hands out
+        try:
+            upload_id = uuid.UUID(upload_id).hex
+        except (ValueError, TypeError, AttributeError):
+            raise KeyError(upload_id)
+        base = os.path.join(self.upload_dir, upload_id)
+        if not os.path.exists(f"{base}.json"):
+            raise KeyError(upload_id)
+        return f"{base}.json", f"{base}.part"
+
+    def create(self, filename, size):
+        if not isinstance(size, int) or size <= 0:
+            raise ValueError("size must be a positive number of bytes")
+        if size > self.max_bytes:
+            raise ValueError(f"Upload exceeds the {self.max_bytes // (1024 * 1024)} MB limit")
+        self.prune()
+        upload_id = uuid.uuid4().hex
+        base = os.path.join(self.upload_dir, upload_id)
+        open(f"{base}.part", "wb").close()
+        with open(f"{base}.json", "w") as f:
+            json.dump({"filename": filename, "size": size, "created_at": time.time()}, f)
+        return upload_id
+
+    def status(self, upload_id):
+        meta_path, data_path = self._paths(upload_id)
+        with open(meta_path) as f:
+            meta = json.load(f)
+        if not os.path.exists(data_path):
+            # Already completed
+            raise KeyError(upload_id)
+        return {
+            "upload_id": upload_id,
+            "filename": meta["filename"],
+            "size": meta["size"],
+            "received": os.path.getsize(data_path),
+        }
+
+    def write(self, upload_id, offset, stream):
+        """Copy ``stream`` into the upload at ``offset``; returns the bytes received so far.
+
+        ``offset`` may repeat part of what was already received (a retried
+        chunk) but not skip ahead. The size limit is checked as each block
+        arrives, so an oversized chunk is rejected without being buffered.
+        """
+        status = self.status(upload_id)
+        _, data_path = self._paths(upload_id)
+        with open(data_path, "r+b") as f:
+            # Chunks of one upload may reach different threads or workers
+            fcntl.flock(f, fcntl.LOCK_EX)
+            received = os.fstat(f.fileno()).st_size
+            if offset < 0 or offset > received:
+                raise ValueError(f"Expected offset at most {received}, got {offset}")
+            f.seek(offset)
+            position = offset
+            while True:
+                block = stream.read(UPLOAD_BLOCK_SIZE)
+                if not block:
+                    break
+                position += len(block)
+                if position > status["size"]:
+                    f.truncate(received)
+                    raise ValueError(f"Chunk runs past the declared size of {status['size']} bytes")
+                f.write(block)
+            return max(received, position)
+
+    def complete(self, upload_id):
+        """Claim a fully received upload and return ``(path, filename)``.
+
+        Only one caller can complete an upload; later calls raise KeyError.
+        """
+        status = self.status(upload_id)
+        if status["received"] != status["size"]:
+            raise ValueError(f"Upload incomplete: {status['received']} of {status['size']} bytes received")
+        meta_path, data_path = self._paths(upload_id)
+        complete_path = f"{meta_path[:-len('.json')]}.complete"
+        try:
+            os.rename(data_path, complete_path)
+        except FileNotFoundError:
+            raise KeyError(upload_id)
+        return complete_path, status["filename"]
+
+    def discard(self, upload_id):
+        meta_path, data_path = self._paths(upload_id)
+        for path in (meta_path, data_path, f"{meta_path[:-len('.json')]}.complete"):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def prune(self):
+        cutoff = time.time() - self.retention_seconds
+        for name in os.listdir(self.upload_dir):
+            path = os.path.join(self.upload_dir, name)
+            if name.endswith(".json") and os.path.getmtime(path) < cutoff:
+                base = path[:-len(".json")]
+                for stale in (path, f"{base}.part", f"{base}.complete"):
+                    if os.path.exists(stale):
+                        os.remove(stale)
@@ -0,0 +1,287 @@
+import json
+import os
+import threading
+
+import numpy as np
+from llama_index.core.vector_stores.types import (
+    BasePydanticVectorStore,
+    VectorStoreQuery,
+    VectorStoreQueryMode,
+    VectorStoreQueryResult,
+)
+from pydantic import PrivateAttr
+
+from keyword_index import KeywordIndex
+
+
+class NumpyVectorStore(BasePydanticVectorStore):
+    """Vector store keeping all embeddings in one contiguous matrix.
+
+    Rows are L2-normalized on insert so cosine similarity is a single
+    matrix-vector product. With ``quantization="int8"`` each row is stored as
+    int8 with a per-row scale, a quarter of the float32 footprint. The matrix
+    grows by doubling, so added context is appended in place.
+
+    Node text is also kept in a BM25 keyword index, used by the ``hybrid``
+    and ``text_search`` query modes.
+    """
+
+    stores_text: bool = False
+    quantization: str = "float32"
+
+    _ids: list = PrivateAttr(default_factory=list)
+    _ref_doc_ids: list = PrivateAttr(default_factory=list)
+    _row_by_id: dict = PrivateAttr(default_factory=dict)
+    _matrix: np.ndarray = PrivateAttr(default=None)
+    _scales: np.ndarray = PrivateAttr(default=None)
+    _keywords: KeywordIndex = PrivateAttr(default_factory=KeywordIndex)
+    _lock: threading.Lock = PrivateAttr(default_factory=threading.Lock)
+
+    def __init__(self, quantization="float32", **kwargs):
+        if quantization not in ("float32", "int8"):
+            raise ValueError(f"Unsupported quantization: {quantization}")
+        super().__init__(quantization=quantization, **kwargs)
+
+    @classmethod
+    def class_name(cls):
+        return "NumpyVectorStore"
+
+    @property
+    def client(self):
+        return None
+
+    @property
+    def node_count(self):
+        return len(self._ids)
+
+    @property
+    def keyword_index(self):
+        return self._keywords
+
+    @property
+    def memory_bytes(self):
+        if self._matrix is None:
+            return 0
+        scale_bytes = self._scales.nbytes if self._scales is not None else 0
+        return self._matrix.nbytes + scale_bytes + self._keywords.memory_bytes
+
+    def _ensure_capacity(self, rows, dim):
+        if self._matrix is None:
+            dtype = np.int8 if self.quantization == "int8" else np.float32
+            self._matrix = np.zeros((max(rows, 16), dim), dtype=dtype)
+            if self.quantization == "int8":
+                self._scales = np.zeros(max(rows, 16), dtype=np.float32)
+            return
+        if rows <= self._matrix.shape[0]:
+            return
+        capacity = max(rows, self._matrix.shape[0] * 2)
+        matrix = np.zeros((capacity, dim), dtype=self._matrix.dtype)
+        matrix[:len(self._ids)] = self._matrix[:len(self._ids)]
+        self._matrix = matrix
+        if self._scales is not None:
+            scales = np.zeros(capacity, dtype=np.float32)
+            scales[:len(self._ids)] = self._scales[:len(self._ids)]
+            self._scales = scales
+
+    def _write_rows(self, start, vectors):
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        vectors = vectors / np.where(norms == 0, 1.0, norms)
+        end = start + len(vectors)
+        if self.quantization == "int8":
+            peaks = np.abs(vectors).max(axis=1)
+            scales = np.where(peaks == 0, 1.0, peaks) / 127.0
+            self._matrix[start:end] = np.round(vectors / scales[:, None]).astype(np.int8)
+            self._scales[start:end] = scales
+        else:
+            self._matrix[start:end] = vectors
+
+    def add(self, nodes, **add_kwargs):
+        if not nodes:
+            return []
+        vectors = np.asarray([node.get_embedding() for node in nodes], dtype=np.float32)
+        with self._lock:
+            start = len(self._ids)
+            self._ensure_capacity(start + len(nodes), vectors.shape[1])
+            self._write_rows(start, vectors)
+            for offset, node in enumerate(nodes):
+                self._ids.append(node.node_id)
+                self._ref_doc_ids.append(node.ref_doc_id or "None")
+                self._row_by_id[node.node_id] = start + offset
+                self._keywords.add(node.node_id, node.get_content())
+        return [node.node_id for node in nodes]
+
+    def _keep_rows(self, keep):
+        size = len(self._ids)
+        keep = np.asarray(keep, dtype=bool)
+        self._keywords.remove([node_id for node_id, k in zip(self._ids, keep) if not k])
+        if self._matrix is not None:
+            self._matrix = self._matrix[:size][keep]
+            if self._scales is not None:
+                self._scales = self._scales[:size][keep]
+        self._ids = [i for i, k in zip(self._ids, keep) if k]
+        self._ref_doc_ids = [r for r, k in zip(self._ref_doc_ids, keep) if k]
+        self._row_by_id = {node_id: row for row, node_id in enumerate(self._ids)}
+
+    def delete(self, ref_doc_id, **delete_kwargs):
+        with self._lock:
+            self._keep_rows([r != ref_doc_id for r in self._ref_doc_ids])
+
+    def delete_nodes(self, node_ids=None, filters=None, **delete_kwargs):
+        if filters is not None:
+            raise ValueError("NumpyVectorStore does not support metadata filters")
+        drop = set(node_ids or [])
+        with self._lock:
+            self._keep_rows([node_id not in drop for node_id in self._ids])
+
+    def clear(self):
+        with self._lock:
+            self._keep_rows([False] * len(self._ids))
+
+    def scores(self, query_embedding):
+        """Cosine similarity of ``query_embedding`` against every stored row."""
+        query = np.asarray(query_embedding, dtype=np.float32)
+        query = query / (np.linalg.norm(query) or 1.0)
+        size = len(self._ids)
+        if self.quantization == "int8":
+            return (self._matrix[:size] @ query) * self._scales[:size]
+        return self._matrix[:size] @ query
+
+    def _boost(self, scores, query_str, alpha):
+        """Raise each row's score toward 1 by ``1 - alpha`` times its BM25 score relative to the best.
+
+        Works in place on a full column of scores. Rows without a keyword
+        match keep their cosine similarity, so thresholds on it keep their
+        meaning; the best keyword match with ``alpha=0.7`` closes 30% of its
+        gap to 1.
+        """
+        hits = self._keywords.search(query_str)
+        if not hits or alpha >= 1:
+            return scores
+        best = hits[0][1]
+        rows = np.asarray([self._row_by_id[node_id] for node_id, _ in hits], dtype=np.int64)
+        weights = np.asarray([score / best for _, score in hits], dtype=np.float32) * (1 - alpha)
+        scores[rows] += weights * (1 - scores[rows])
+        return scores
+
+    def _keyword_query(self, query):
+        hits = self._keywords.search(query.query_str or "")
+        if query.node_ids is not None:
+            allowed = set(query.node_ids)
+            hits = [hit for hit in hits if hit[0] in allowed]
+        hits = hits[:query.similarity_top_k]
+        best = hits[0][1] if hits else 1.0
+        return VectorStoreQueryResult(
+            similarities=[score / best for _, score in hits],
+            ids=[node_id for node_id, _ in hits],
+        )
+
+    def query(self, query: VectorStoreQuery, **kwargs):
+        if query.filters is not None:
+            raise ValueError("NumpyVectorStore does not support metadata filters")
+        if query.mode == VectorStoreQueryMode.TEXT_SEARCH:
+            # BM25 alone, scaled so the best match scores 1; needs no query embedding
+            return self._keyword_query(query)
+        with self._lock:
+            if not self._ids:
+                return VectorStoreQueryResult(similarities=[], ids=[])
+            scores = self.scores(query.query_embedding)
+            if query.mode == VectorStoreQueryMode.HYBRID and query.query_str:
+                scores = self._boost(scores, query.query_str, 0.5 if query.alpha is None else query.alpha)
+            ids = self._ids
+            if query.node_ids is not None:
+                rows = np.asarray(
+                    [self._row_by_id[n] for n in query.node_ids if n in self._row_by_id], dtype=np.int64
+                )
+                scores = scores[rows]
+                ids = [ids[row] for row in rows]
+
+        k = min(query.similarity_top_k, len(ids))
+        if k == 0:
+            return VectorStoreQueryResult(similarities=[], ids=[])
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return VectorStoreQueryResult(
+            similarities=scores[top].astype(float).tolist(),
+            ids=[ids[row] for row in top],
+        )
+
+    def query_batch(self, query_embeddings, similarity_top_k, block_size=128, query_strs=None, alpha=None):
+        """Top-k results for many queries, scored ``block_size`` queries per matrix product.
+
+        With ``query_strs`` and ``alpha`` < 1, scores are fused with BM25 as in hybrid ``query``.
+        """
+        queries = np.asarray(query_embeddings, dtype=np.float32)
+        norms = np.linalg.norm(queries, axis=1, keepdims=True)
+        queries = queries / np.where(norms == 0, 1.0, norms)
+        results = []
+        with self._lock:
+            size = len(self._ids)
+            k = min(similarity_top_k, size)
+            if k == 0:
+                return [VectorStoreQueryResult(similarities=[], ids=[]) for _ in queries]
+            for start in range(0, len(queries), block_size):
+                scores = self._matrix[:size] @ queries[start:start + block_size].T
+                if self.quantization == "int8":
+                    scores *= self._scales[:size, None]
+                if query_strs is not None and alpha is not None:
+                    for column in range(scores.shape[1]):
+                        self._boost(scores[:, column], query_strs[start + column], alpha)
+                top = np.argpartition(-scores, k - 1, axis=0)[:k]
+                for column in range(scores.shape[1]):
+                    rows = top[:, column]
+                    rows = rows[np.argsort(-scores[rows, column])]
+                    results.append(VectorStoreQueryResult(
+                        similarities=scores[rows, column].astype(float).tolist(),
+                        ids=[self._ids[row] for row in rows],
+                    ))
+        return results
+
+    def persist(self, persist_path, fs=None):
+        """Write ids as JSON at ``persist_path`` and the matrix as ``.npy`` next to it."""
+        dirpath = os.path.dirname(persist_path)
+        if dirpath:
+            os.makedirs(dirpath, exist_ok=True)
+        with self._lock:
+            size = len(self._ids)
+            if self._matrix is not None:
+                np.save(f"{persist_path}.npy", self._matrix[:size])
+                if self._scales is not None:
+                    np.save(f"{persist_path}.scales.npy", self._scales[:size])
+            with open(f"{persist_path}.keywords.json", "w") as f:
+                json.dump(self._keywords.to_dict(), f)
+            with open(persist_path, "w") as f:
+                json.dump({
+                    "class_name": self.class_name(),
+                    "quantization": self.quantization,
+                    "ids": self._ids,
+                    "ref_doc_ids": self._ref_doc_ids,
+                }, f)
+
+    @classmethod
+    def from_persist_path(cls, persist_path, mmap=False):
+        with open(persist_path) as f:
+            meta = json.load(f)
+        store = cls(quantization=meta["quantization"])
+        store._ids = meta["ids"]
+        store._ref_doc_ids = meta["ref_doc_ids"]
+        store._row_by_id = {node_id: row for row, node_id in enumerate(store._ids)}
+        if store._ids:
+            mmap_mode = "r" if mmap else None
+            store._matrix = np.load(f"{persist_path}.npy", mmap_mode=mmap_mode)
+            if store.quantization == "int8":
+                store._scales = np.load(f"{persist_path}.scales.npy", mmap_mode=mmap_mode)
+        with open(f"{persist_path}.keywords.json") as f:
+            store._keywords = KeywordIndex.from_dict(json.load(f))
+        return store
+
+
+def load_vector_store(persist_dir, mmap=False):
+    """Load a persisted NumpyVectorStore, or None when the directory holds another store."""
+    persist_path = os.path.join(persist_dir, "default__vector_store.json")
+    try:
+        with open(persist_path) as f:
+            if json.load(f).get("class_name") != NumpyVectorStore.class_name():
+                return None
+    except (OSError, ValueError):
+        return None
+    return NumpyVectorStore.from_persist_path(persist_path, mmap=mmap)
@@ -0,0 +1,101 @@
+import contextvars
+import hashlib
+import json
+import os
+import threading
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+
+import html2text
+import requests
+from requests.adapters import HTTPAdapter
+
+
+def html_to_text(html):
+    return html2text.html2text(html)
+
+
+class WebFetcher:
+    """Fetches pages concurrently over one pooled session, with a revalidating disk cache.
+
+    Converted text is cached per URL together with the response's ETag and
+    Last-Modified headers. A cached page is revalidated with a conditional
+    request, so an unchanged page costs a 304 and no re-parsing. HTML-to-text
+    conversion runs on the fetch workers, not on the caller's thread.
+    """
+
+    def __init__(self, cache_dir, max_workers=8, per_host=4, timeout=20):
+        self.cache_dir = cache_dir
+        self.timeout = timeout
+        os.makedirs(cache_dir, exist_ok=True)
+        self._session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=max_workers, pool_maxsize=max_workers)
+        self._session.mount("http://", adapter)
+        self._session.mount("https://", adapter)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="fetch")
+        self._host_slots = defaultdict(lambda: threading.Semaphore(per_host))
+        self._lock = threading.Lock()
+        self._stats = Counter()
+
+    def _path(self, url):
+        return os.path.join(self.cache_dir, hashlib.sha256(url.encode()).hexdigest() + ".json")
+
+    def _read_cache(self, url):
+        try:
+            with open(self._path(url)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write_cache(self, url, entry):
+        path = self._path(url)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(entry, f)
+        os.replace(tmp_path, path)
+
+    def _count(self, name):
+        with self._lock:
+            self._stats[name] += 1
+
+    def fetch(self, url):
+        """Return the page at ``url`` as text, from the cache when the server says it is unchanged."""
+        cached = self._read_cache(url)
+        headers = {}
+        if cached is not None:
+            if cached.get("etag"):
+                headers["If-None-Match"] = cached["etag"]
+            if cached.get("last_modified"):
+                headers["If-Modified-Since"] = cached["last_modified"]
+
+        with self._lock:
+            slot = self._host_slots[urlparse(url).netloc]
+        with slot:
+            response = self._session.get(url, headers=headers, timeout=self.timeout)
+
+        if response.status_code == 304 and cached is not None:
+            self._count("not_modified")
+            return cached["text"]
+        response.raise_for_status()
+        self._count("fetched")
+
+        text = html_to_text(response.text)
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+        if etag or last_modified:
+            self._write_cache(url, {"url": url, "etag": etag, "last_modified": last_modified, "text": text})
+        return text
+
+    def fetch_many(self, urls):
+        """Fetch ``urls`` concurrently; returns their texts in the same order."""
+        # Run in the caller's context so per-request state (e.g. stage timings) follows the fetch
+        context = contextvars.copy_context()
+        return list(self._executor.map(lambda url: context.copy().run(self.fetch, url), urls))
+
+    def stats(self):
+        with self._lock:
+            return {
+                "fetched": self._stats["fetched"],
+                "not_modified": self._stats["not_modified"],
+            }
@@ -1,4 +1,5 @@
 let currentSessionId = null;
+let pendingSessionId = null;
 let currentQuestion = null;
 
 // Initialize event listeners
@@ -41,25 +42,18 @@ document.addEventListener('DOMContentLoaded', function() {
 });
 
 function handleFileUpload(event) {
-    const file = event.target.files[0];
-    if (!file) return;
+    const files = Array.from(event.target.files);
+    if (!files.length) return;
     
     showProcessing();
     
-    const formData = new FormData();
-    formData.append('file', file);
-    
-    fetch('/api/upload', {
-        method: 'POST',
-        body: formData
-    })
-    .then(response => response.json())
+    sendFiles('/api/upload', files)
     .then(data => {
-        hideProcessing();
         if (data.success) {
-            currentSessionId = data.session_id;
-            showContentInfo(data.summary);
+            pendingSessionId = data.session_id;
+            waitForIngestion(data.session_id);
         } else {
+            hideProcessing();
             showError(data.error || 'Failed to upload file');
         }
     })
@@ -69,6 +63,66 @@ function handleFileUpload(event) {
     });
 }
 
+// Files above this size go up in resumable chunks instead of one request
+const CHUNKED_UPLOAD_THRESHOLD = 16 * 1024 * 1024;
+const UPLOAD_CHUNK_SIZE = 8 * 1024 * 1024;
+
+function sendFiles(url, files, sessionId = null) {
+    if (files.length === 1 && files[0].size > CHUNKED_UPLOAD_THRESHOLD) {
+        return uploadInChunks(files[0], sessionId);
+    }
+    const formData = new FormData();
+    files.forEach(file => formData.append('file', file));
+    if (sessionId) formData.append('session_id', sessionId);
+    return fetch(url, {
+        method: 'POST',
+        body: formData
+    }).then(response => response.json());
+}
+
+// Returns the same response as /api/upload, or /api/add-context with a sessionId
+async function uploadInChunks(file, sessionId = null) {
+    const created = await fetch('/api/uploads', {
+        method: 'POST',
+        headers: {'Content-Type': 'application/json'},
+        body: JSON.stringify({filename: file.name, size: file.size})
+    }).then(response => response.json());
+    if (!created.success) return created;
+    
+    const uploadId = created.upload_id;
+    let offset = 0;
+    let failures = 0;
+    while (offset < file.size) {
+        try {
+            const data = await fetch(`/api/uploads/${uploadId}?offset=${offset}`, {
+                method: 'PUT',
+                body: file.slice(offset, offset + UPLOAD_CHUNK_SIZE)
+            }).then(response => response.json());
+            if (!data.success) return data;
+            offset = data.received;
+            failures = 0;
+        } catch (error) {
+            if (++failures > 3) throw error;
+            // Continue from whatever arrived before the connection dropped
+            const status = await fetch(`/api/uploads/${uploadId}`).then(response => response.json());
+            if (!status.success) return status;
+            offset = status.received;
+        }
+    }
+    
+    return fetch(`/api/uploads/${uploadId}/complete`, {
+        method: 'POST',
+        headers: {'Content-Type': 'application/json'},
+        body: JSON.stringify(sessionId ? {session_id: sessionId} : {})
+    }).then(response => response.json());
+}
+
+// Several URLs can be entered separated by spaces or commas
+function parseUrls(value) {
+    const urls = value.split(/[\s,]+/).filter(Boolean);
+    return urls.length === 1 ? urls[0] : urls;
+}
+
 function processUrl() {
     const url = document.getElementById('urlInput').value.trim();
     if (!url) {
@@ -83,15 +137,15 @@ function processUrl() {
         headers: {
             'Content-Type': 'application/json'
         },
-        body: JSON.stringify({ url: url })
+        body: JSON.stringify({ url: parseUrls(url) })
     })
     .then(response => response.json())
     .then(data => {
-        hideProcessing();
         if (data.success) {
-            currentSessionId = data.session_id;
-            showContentInfo(data.summary);
+            pendingSessionId = data.session_id;
+            waitForIngestion(data.session_id);
         } else {
+            hideProcessing();
             showError(data.error || 'Failed to process URL');
         }
     })
@@ -119,11 +173,11 @@ function processText() {
     })
     .then(response => response.json())
     .then(data => {
-        hideProcessing();
         if (data.success) {
-            currentSessionId = data.session_id;
-            showContentInfo(data.summary);
+            pendingSessionId = data.session_id;
+            waitForIngestion(data.session_id);
         } else {
+            hideProcessing();
             showError(data.error || 'Failed to process text');
         }
     })
@@ -133,6 +187,46 @@ function processText() {
     });
 }
 
+// Poll the ingestion job: chat opens once the index is ready and the summary
+// fills in when it finishes
+function waitForIngestion(sessionId) {
+    fetch(`/api/jobs/${sessionId}`)
+    .then(response => response.json())
+    .then(data => {
+        // Stop polling once the user has started over
+        if (sessionId !== pendingSessionId) return;
+        
+        if (!data.success || data.status === 'failed') {
+            hideProcessing();
+            document.getElementById('uploadSection').style.display = 'block';
+            showError(data.error || 'Failed to process content');
+            return;
+        }
+        
+        if (data.status === 'processing') {
+            setTimeout(() => waitForIngestion(sessionId), 1000);
+            return;
+        }
+        
+        if (currentSessionId !== sessionId) {
+            currentSessionId = sessionId;
+            hideProcessing();
+            showContentInfo(data.summary || '⏳ Generating summary...');
+        } else if (data.summary) {
+            document.getElementById('summaryContent').textContent = data.summary;
+        }
+        
+        if (data.status === 'ready') {
+            setTimeout(() => waitForIngestion(sessionId), 1000);
+        }
+    })
+    .catch(error => {
+        hideProcessing();
+        document.getElementById('uploadSection').style.display = 'block';
+        showError('Processing failed: ' + error.message);
+    });
+}
+
 function askQuestion() {
     const question = document.getElementById('questionInput').value.trim();
     if (!question || !currentSessionId) return;
@@ -148,7 +242,7 @@ function askQuestion() {
     askButton.disabled = true;
     askButton.textContent = 'Thinking...';
     
-    fetch('/api/query', {
+    fetch('/api/query-stream', {
         method: 'POST',
         headers: {
             'Content-Type': 'application/json'
@@ -158,20 +252,18 @@ function askQuestion() {
             question: question
         })
     })
-    .then(response => response.json())
-    .then(data => {
+    .then(response => {
+        // Validation errors come back as plain JSON rather than an event stream
+        if (!response.headers.get('Content-Type').startsWith('text/event-stream')) {
+            return response.json().then(data => {
+                throw new Error(data.error || 'Failed to get answer');
+            });
+        }
+        return readAnswerStream(response);
+    })
+    .then(() => {
         askButton.disabled = false;
         askButton.textContent = 'Ask';
-        
-        if (data.success) {
-            addMessage(data.answer, 'assistant', data.source);
-            
-            if (data.not_found && data.can_search_web) {
-                showWebSearchPrompt();
-            }
-        } else {
-            showError(data.error || 'Failed to get answer');
-        }
     })
     .catch(error => {
         askButton.disabled = false;
@@ -180,6 +272,64 @@ function askQuestion() {
     });
 }
 
+function readAnswerStream(response) {
+    const messageDiv = addMessage('', 'assistant');
+    const contentDiv = messageDiv.querySelector('.message-content');
+    const messagesContainer = document.getElementById('chatMessages');
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    
+    function handleEvent(data) {
+        if (data.type === 'token') {
+            contentDiv.textContent += data.token;
+            messagesContainer.scrollTop = messagesContainer.scrollHeight;
+        } else if (data.type === 'fallback') {
+            addMessage(data.answer, getWebMessageClass(data.source), data.source, data.message);
+        } else if (data.type === 'done') {
+            // A speculative fallback may have answered from the web instead
+            if (data.source !== 'document') {
+                messageDiv.className = `message ${getWebMessageClass(data.source)}`;
+                contentDiv.innerHTML = formatMarkdown(contentDiv.textContent);
+            }
+            
+            const sourceDiv = document.createElement('div');
+            sourceDiv.className = 'message-source';
+            sourceDiv.textContent = `Source: ${getSourceLabel(data.source)}${data.cached ? ' (cached)' : ''}`;
+            messageDiv.appendChild(sourceDiv);
+            
+            if (data.not_found && data.can_search_web) {
+                showWebSearchPrompt();
+            }
+        } else if (data.type === 'error') {
+            if (!contentDiv.textContent) {
+                messageDiv.remove();
+            }
+            showError(data.error || 'Failed to get answer');
+        }
+    }
+    
+    function read() {
+        return reader.read().then(({ done, value }) => {
+            if (done) return;
+            buffer += decoder.decode(value, { stream: true });
+            
+            // Events are separated by a blank line
+            const events = buffer.split('\n\n');
+            buffer = events.pop();
+            events.forEach(event => {
+                const dataLine = event.split('\n').find(line => line.startsWith('data: '));
+                if (dataLine) {
+                    handleEvent(JSON.parse(dataLine.slice(6)));
+                }
+            });
+            return read();
+        });
+    }
+    
+    return read();
+}
+
 function searchWeb() {
     if (!currentQuestion) return;
     
@@ -203,14 +353,7 @@ function searchWeb() {
         searchMessage.remove();
         
         if (data.success) {
-            let messageClass = 'assistant';
-            if (data.source === 'google_search') {
-                messageClass = 'web-search';
-            } else if (data.source === 'gemini_fallback') {
-                messageClass = 'gemini-fallback';
-            }
-            
-            addMessage(data.answer, messageClass, data.source, data.message);
+            addMessage(data.answer, getWebMessageClass(data.source), data.source, data.message);
         } else {
             showError(data.error || 'Web search failed');
         }
@@ -287,6 +430,15 @@ function addMessage(text, type, source = null, additionalMessage = null) {
     return messageDiv;
 }
 
+function getWebMessageClass(source) {
+    if (source === 'google_search') {
+        return 'web-search';
+    } else if (source === 'gemini_fallback') {
+        return 'gemini-fallback';
+    }
+    return 'assistant';
+}
+
 function getSourceLabel(source) {
     const labels = {
         'document': '📄 Your Document',
@@ -326,6 +478,7 @@ function showError(message) {
 // Restart session function
 function restartSession() {
     currentSessionId = null;
+    pendingSessionId = null;
     currentQuestion = null;
     
     // Clear all inputs
@@ -373,8 +526,8 @@ function hideAddContextModal() {
 
 // Context upload handlers
 function handleContextFileUpload(event) {
-    const file = event.target.files[0];
-    if (!file) return;
+    const files = Array.from(event.target.files);
+    if (!files.length) return;
     
     if (!currentSessionId) {
         showError('Please start a session first');
@@ -384,15 +537,7 @@ function handleContextFileUpload(event) {
     hideAddContextModal();
     showContextProcessing();
     
-    const formData = new FormData();
-    formData.append('file', file);
-    formData.append('session_id', currentSessionId);
-    
-    fetch('/api/add-context', {
-        method: 'POST',
-        body: formData
-    })
-    .then(response => response.json())
+    sendFiles('/api/add-context', files, currentSessionId)
     .then(data => {
         hideProcessing();
         if (data.success) {
@@ -422,7 +567,7 @@ function handleContextFileUpload(event) {
                 `;
                 addMessage(previewHtml, 'assistant', 'system');
             } else {
-                addMessage(`📄 Added new file: ${file.name}`, 'assistant', 'system');
+                addMessage(`📄 Added new file: ${files.map(file => file.name).join(', ')}`, 'assistant', 'system');
             }
         } else {
             document.getElementById('contentInfo').style.display = 'block';
@@ -457,7 +602,7 @@ function addContextUrl() {
             'Content-Type': 'application/json'
         },
         body: JSON.stringify({ 
-            url: url,
+            url: parseUrls(url),
             session_id: currentSessionId 
         })
     })
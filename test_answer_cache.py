@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+
+import sys
+sys.path.append('src')
+
+from answer_cache import AnswerCache, key_terms
+
+
+def test_exact_and_semantic_hits():
+    cache = AnswerCache()
+    cache.put("What was revenue in 2022?", [1.0, 0.0], {"answer": "$5M"})
+
+    assert cache.get_exact("what was REVENUE in 2022") == {"answer": "$5M"}
+    assert cache.get_exact("What was revenue?") is None
+    assert cache.get_similar("How much revenue was there in 2022?", [0.99, 0.05]) == {"answer": "$5M"}
+    assert cache.get_similar("What was revenue in 2022?", [0.0, 1.0]) is None
+
+
+def test_similar_questions_about_different_numbers_or_names_miss():
+    cache = AnswerCache(similarity_threshold=0.9)
+    cache.put("What was revenue in 2022?", [1.0, 0.0], {"answer": "$5M"})
+    cache.put("Who audits Acme?", [0.0, 1.0], {"answer": "KPMG"})
+
+    # Same embedding, different year or company: the cached answer would be wrong
+    assert cache.get_similar("What was revenue in 2023?", [1.0, 0.0]) is None
+    assert cache.get_similar("Who audits Globex?", [0.0, 1.0]) is None
+    assert key_terms("Where is part ZX-991 used in Acme's 2 plants?") == {"zx-991", "acme", "2"}
+
+
+def test_clear_drops_answers_computed_against_the_old_index():
+    cache = AnswerCache()
+    generation = cache.generation
+    cache.put("What is the warranty?", [1.0, 0.0], {"answer": "One year"})
+    cache.clear()
+    # An answer that was being computed while the index changed is not stored
+    cache.put("What is the warranty?", [1.0, 0.0], {"answer": "One year"}, generation)
+
+    assert len(cache) == 0
+    assert cache.get_exact("What is the warranty?") is None
+
+
+def test_app_serves_cached_answers_until_context_is_added(client, upload):
+    session_id = upload('Revenue was five million in 2022. ' * 20)
+
+    def ask(question):
+        result = client.post('/api/query', json={'session_id': session_id, 'question': question}).get_json()
+        return result.get('cache_match') if result['cached'] else None
+
+    # MockEmbedding gives every question the same vector
+    questions = ['How much revenue was there in 2022?', 'how much revenue was there in 2022',
+                 'What were the earnings in 2022?', 'What were the earnings in 2023?']
+    assert [ask(question) for question in questions] == [None, 'exact', 'semantic', None]
+    client.post('/api/add-context', json={'session_id': session_id, 'text': 'Revenue was six million in 2023.'})
+    assert ask(questions[0]) is None
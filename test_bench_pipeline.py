@@ -0,0 +1,24 @@
+#!/usr/bin/env python3
+
+import json
+import os
+import subprocess
+import sys
+
+
+def test_offline_benchmark_runs_without_gemini(tmp_path):
+    output = tmp_path / 'results.json'
+    env = {k: v for k, v in os.environ.items() if k not in ('GEMINI_API_KEY', 'CACHE_DIR')}
+    # Without CACHE_DIR the run uses a temporary cache, removed when it exits
+    env['TMPDIR'] = str(tmp_path)
+    subprocess.run(
+        [sys.executable, 'benchmarks/bench_pipeline.py', '--quick', '--output', str(output)],
+        env=env, capture_output=True, check=True, timeout=300
+    )
+    results = json.loads(output.read_text())
+
+    assert results['ingestion']['pdf']['documents'] == 3
+    assert results['query']['count'] == 5
+    assert [step['sources'] for step in results['add_context']] == [2, 3]
+    assert results['sessions']['sessions'] == 2
+    assert not [name for name in os.listdir(tmp_path) if name.startswith('bench-cache-')]
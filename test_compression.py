@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+
+import sys
+sys.path.append('src')
+
+from llama_index.core import Settings, StorageContext, VectorStoreIndex
+from llama_index.core.embeddings import MockEmbedding
+from llama_index.core.schema import NodeWithScore, TextNode
+
+from compression import ContextCompressor, collect
+from vector_store import NumpyVectorStore
+
+Settings.embed_model = MockEmbedding(embed_dim=8)
+
+HEADER = "ACME Corp Annual Report - Page 12"
+
+
+def make_index(texts):
+    return VectorStoreIndex(
+        nodes=[TextNode(id_=str(i), text=text) for i, text in enumerate(texts)],
+        storage_context=StorageContext.from_defaults(vector_store=NumpyVectorStore()),
+    )
+
+
+def test_duplicates_and_boilerplate_are_removed():
+    texts = [
+        f"{HEADER}\nRevenue grew by twelve percent in the third quarter of the year.",
+        f"{HEADER.replace('12', '13')}\nThe board approved a new dividend policy for shareholders.",
+        f"{HEADER.replace('12', '14')}\nHeadcount stayed flat across all regional offices.",
+    ]
+    index = make_index(texts)
+    compressor = ContextCompressor([index], token_budget=1000)
+    nodes = [
+        NodeWithScore(node=TextNode(text=texts[0]), score=0.9),
+        # Overlapping chunk that repeats the first one almost verbatim
+        NodeWithScore(node=TextNode(text=texts[0] + " Growth"), score=0.8),
+        NodeWithScore(node=TextNode(text=texts[1]), score=0.7),
+    ]
+
+    compressed, stats = compressor.compress(nodes, "How much did revenue grow?")
+
+    assert [n.score for n in compressed] == [0.9, 0.7]
+    assert stats["duplicates_removed"] == 1
+    assert stats["boilerplate_lines_removed"] == 2
+    assert all("ACME" not in n.node.get_content() for n in compressed)
+    assert stats["saved_tokens"] == stats["retrieved_tokens"] - stats["context_tokens"] > 0
+    # The retrieved nodes themselves are left untouched
+    assert nodes[0].node.get_content().startswith(HEADER)
+
+
+def test_over_budget_context_keeps_sentences_matching_the_question():
+    filler = " ".join(f"Section {i} describes the office furniture inventory in detail." for i in range(20))
+    nodes = [
+        NodeWithScore(node=TextNode(text=filler), score=0.9),
+        NodeWithScore(node=TextNode(text="The warranty covers water damage for two years."), score=0.5),
+    ]
+    compressor = ContextCompressor([], token_budget=30)
+
+    with collect() as context:
+        compressed = compressor.postprocess_nodes(nodes, query_str="Does the warranty cover water damage?")
+
+    text = " ".join(n.node.get_content() for n in compressed)
+    assert "warranty covers water damage" in text
+    assert context["context_tokens"] <= 30
+    assert context["retrieved_tokens"] > context["context_tokens"]
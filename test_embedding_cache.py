@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+
+import sys
+sys.path.append('src')
+
+from embedding_cache import EmbeddingCache
+
+
+def test_embedding_cache_roundtrip_and_eviction(tmp_path):
+    cache = EmbeddingCache(str(tmp_path), "test-model", max_entries=2)
+    cache.put_many(["a", "b"], [[1.0, 0.0], [0.0, 1.0]])
+    assert cache.get_many(["a", "c"]) == [[1.0, 0.0], None]
+
+    # "b" is now least recently used, so it is the one evicted
+    cache.put_many(["c"], [[0.5, 0.5]])
+    assert cache.get_many(["b"]) == [None]
+    assert cache.stats()["evictions"] == 1
+
+    reopened = EmbeddingCache(str(tmp_path), "test-model", max_entries=2)
+    assert reopened.get_many(["a", "c"]) == [[1.0, 0.0], [0.5, 0.5]]
+    assert reopened.stats()["hits"] == 2
+
+
+def test_instances_sharing_a_directory_never_return_each_others_vectors(tmp_path):
+    server = EmbeddingCache(str(tmp_path), "test-model", max_entries=2)
+    cli = EmbeddingCache(str(tmp_path), "test-model", max_entries=2)
+    server.put_many(["server chunk"], [[1.0, 0.0]])
+    cli.put_many(["cli chunk"], [[0.0, 1.0]])
+
+    assert server.get_many(["server chunk", "cli chunk"]) == [[1.0, 0.0], [0.0, 1.0]]
+    assert cli.get_many(["server chunk"]) == [[1.0, 0.0]]
+
+    # The CLI reuses the least recently used slot; the server's stale map must not serve it
+    cli.put_many(["another"], [[0.5, 0.5]])
+    assert server.get_many(["server chunk", "cli chunk", "another"]) == [[1.0, 0.0], None, [0.5, 0.5]]
+
+    reopened = EmbeddingCache(str(tmp_path), "test-model", max_entries=2)
+    assert reopened.get_many(["another"]) == [[0.5, 0.5]]
+
+
+WRITER = """
+import sys
+sys.path.append('src')
+from embedding_cache import EmbeddingCache
+cache = EmbeddingCache(sys.argv[1], "test-model", max_entries=1000)
+name = sys.argv[2]
+for i in range(20):
+    cache.put_many([f"{name}-{i}-{j}" for j in range(10)], [[float(i), float(j), float(len(name))] for j in range(10)])
+"""
+
+
+def test_concurrent_processes_allocate_distinct_slots(tmp_path):
+    import subprocess
+
+    writers = [
+        subprocess.Popen([sys.executable, '-c', WRITER, str(tmp_path), name])
+        for name in ('a', 'bb', 'ccc')
+    ]
+    for writer in writers:
+        assert writer.wait(timeout=60) == 0
+
+    cache = EmbeddingCache(str(tmp_path), "test-model", max_entries=1000)
+    for name in ('a', 'bb', 'ccc'):
+        texts = [f"{name}-{i}-{j}" for i in range(20) for j in range(10)]
+        expected = [[float(i), float(j), float(len(name))] for i in range(20) for j in range(10)]
+        assert cache.get_many(texts) == expected
+    assert cache.stats()["entries"] == 600
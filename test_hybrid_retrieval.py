@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+
+import sys
+sys.path.append('src')
+
+from llama_index.core import QueryBundle, StorageContext, VectorStoreIndex
+from llama_index.core.embeddings import MockEmbedding
+from llama_index.core.schema import TextNode
+
+from hybrid_retrieval import HybridRetriever
+from keyword_index import KeywordIndex
+from vector_store import NumpyVectorStore
+
+
+def make_index(nodes):
+    return VectorStoreIndex(
+        nodes=nodes, embed_model=MockEmbedding(embed_dim=2),
+        storage_context=StorageContext.from_defaults(vector_store=NumpyVectorStore())
+    )
+
+
+def test_keyword_index_updates_incrementally():
+    keywords = KeywordIndex()
+    keywords.add("a", "The pump uses part ZX-991.")
+    keywords.add("b", "The pump runs quietly.")
+    assert [node_id for node_id, _ in keywords.search("ZX-991 pump")] == ["a", "b"]
+    assert keywords.exact_matches("pump zx 991") == {"a"}
+
+    keywords.add("c", "Replacement ZX-991 kits ship monthly.")
+    assert keywords.exact_matches("ZX-991") == {"a", "c"}
+    keywords.remove(["a"])
+    assert keywords.exact_matches("ZX-991") == {"c"}
+
+    restored = KeywordIndex.from_dict(keywords.to_dict())
+    assert restored.search("pump") == keywords.search("pump")
+
+
+def test_keyword_matches_raise_vector_scores(tmp_path):
+    index = make_index([
+        TextNode(id_="near", text="General notes on maintenance.", embedding=[1.0, 0.2]),
+        TextNode(id_="keyword", text="Order part ZX-991 for the pump.", embedding=[0.2, 1.0]),
+    ])
+    retriever = HybridRetriever([index])
+    nodes = retriever.retrieve(QueryBundle("Which part fits the pump?", embedding=[1.0, 0.0]))
+    scores = {n.node.node_id: n.score for n in nodes}
+    cosine = 0.2 / (1.04 ** 0.5)
+    assert abs(scores["near"] - 1.0 / (1.04 ** 0.5)) < 1e-5
+    assert scores["keyword"] > cosine + 0.1
+
+    # The keyword index is persisted with the vectors
+    store = index.vector_store
+    store.persist(str(tmp_path / "store.json"))
+    loaded = NumpyVectorStore.from_persist_path(str(tmp_path / "store.json"))
+    assert loaded.keyword_index.search("ZX-991") == store.keyword_index.search("ZX-991")
+
+
+def test_confident_keyword_queries_skip_the_embedding():
+    source = make_index([TextNode(text=f"Section {i} covers general upkeep.", embedding=[1.0, 0.0]) for i in range(5)])
+    overlay = make_index([TextNode(id_="part", text="The spare part is ZX-991.", embedding=[0.0, 1.0])])
+    retriever = HybridRetriever([source, overlay])
+
+    query = QueryBundle("ZX-991 part")
+    nodes = retriever.retrieve(query)
+    assert query.embedding is None
+    assert nodes[0].node.node_id == "part"
+
+    # Every section matches, so keyword scores alone cannot rank them
+    query = QueryBundle("general upkeep")
+    assert not retriever.keyword_confident(query.query_str)
+    retriever.retrieve(query)
+    assert query.embedding is not None
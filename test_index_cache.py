@@ -0,0 +1,31 @@
+#!/usr/bin/env python3
+
+import os
+import sys
+sys.path.append('src')
+
+from llama_index.core import Settings
+
+
+def test_cli_reuses_the_persisted_index_and_summary(pipeline, gemini, monkeypatch):
+    text = "The pump manual lists part ZX-991 for the impeller. " * 40
+    built, cached = pipeline.load_or_build_source("text", text)
+    assert cached is False
+    calls = len(gemini.prompts)
+
+    # Loaded from disk: same chunks and summary, no new summary call
+    reused, cached = pipeline.load_or_build_source("text", text)
+    assert cached is True
+    assert reused.summary == built.summary
+    assert len(reused.index.docstore.docs) == len(built.index.docstore.docs)
+    assert len(gemini.prompts) == calls
+
+    assert pipeline.load_or_build_source("text", text, rebuild=True)[1] is False
+    # A different chunk size produces different nodes, so it gets its own entry
+    monkeypatch.setattr(Settings, 'chunk_size', 256)
+    assert pipeline.load_or_build_source("text", text, summarize=False)[1] is False
+
+    cache = pipeline.get_index_cache()
+    assert cache.prune(3600) == 0
+    assert cache.prune(-1) == 2
+    assert os.listdir(cache.persist_dir) == []
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+
+import sys
+import threading
+import time
+sys.path.append('src')
+
+from jobs import IngestionQueue
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def test_jobs_report_progress_stage_by_stage():
+    changes = []
+    queue = IngestionQueue(max_workers=2, on_change=lambda job: changes.append(job.status))
+    index_built, finish = threading.Event(), threading.Event()
+
+    def ingest(job):
+        with job.stage('load') as stage:
+            stage['pages'] = 3
+        with job.stage('index'):
+            pass
+        index_built.set()
+        finish.wait(5)
+        with job.stage('summary'):
+            job.summary = "Summary"
+
+    job = queue.submit(ingest, 'pdf', job_id='s1')
+    assert job.to_dict()['session_id'] == 's1'
+    assert index_built.wait(5)
+    # Questions are accepted once the index exists, before the summary
+    assert queue.get('s1').status == 'ready'
+    finish.set()
+    wait_for(lambda: job.finished_at is not None)
+
+    result = job.to_dict()
+    assert result['status'] == 'done' and result['summary'] == "Summary"
+    assert result['stages']['load']['pages'] == 3
+    assert all(stage['status'] == 'done' for stage in result['stages'].values())
+    assert changes[0] == 'processing' and changes[-1] == 'done' and 'ready' in changes
+
+
+def test_failed_jobs_keep_the_error_and_expire():
+    queue = IngestionQueue(max_workers=1, retention_seconds=0)
+
+    def broken(job):
+        with job.stage('load'):
+            raise ValueError("unreadable file")
+
+    job = queue.submit(broken, 'image')
+    wait_for(lambda: job.finished_at is not None)
+    result = job.to_dict()
+    assert result['status'] == 'failed' and result['error'] == "unreadable file"
+    assert result['stages']['load']['status'] == 'failed'
+    assert result['stages']['index']['status'] == 'pending'
+
+    # Finished jobs past their retention are dropped when the next one is queued
+    time.sleep(0.01)
+    queue.submit(lambda job: None, 'text')
+    assert queue.get(job.job_id) is None
+
+
+def test_summary_runs_while_pages_are_still_being_embedded(client, upload, pipeline, gemini, monkeypatch):
+    summarizing = threading.Event()
+    generate_content = gemini.generate_content
+    monkeypatch.setattr(gemini, 'generate_content', lambda *args, **kwargs: (
+        summarizing.set(), generate_content(*args, **kwargs)
+    )[1])
+    embedded_after_summary = []
+    insert_documents = pipeline.insert_documents
+
+    def insert_after_summary(index, documents):
+        embedded_after_summary.append(summarizing.wait(5))
+        insert_documents(index, documents)
+
+    monkeypatch.setattr(pipeline, 'insert_documents', insert_after_summary)
+    session_id = upload('The pump runs at four bar of pressure. ' * 20)
+
+    # Embedding held back until the summary had started, so the two overlapped
+    assert embedded_after_summary == [True]
+    stages = client.get(f'/api/jobs/{session_id}').get_json()['stages']
+    assert all(stage['status'] == 'done' for stage in stages.values())
+    # Load and index are timed separately: waiting for pages is not index time
+    assert 'waiting' in stages['index'] and 'waiting' not in stages['load']
+
+
+def test_load_failures_fail_the_job_after_the_pages_already_indexed(client, upload, monkeypatch):
+    import app
+    from llama_index.core.schema import Document
+
+    def broken(input_type, value, stats=None):
+        yield Document(text="The first page extracted fine.")
+        raise ValueError("unreadable page 2")
+
+    monkeypatch.setattr(app, 'iter_from_type', broken)
+    session_id = upload('ignored')
+    result = client.get(f'/api/jobs/{session_id}').get_json()
+    assert result['status'] == 'failed' and result['error'] == "unreadable page 2"
+    assert result['stages']['load']['status'] == 'failed'
+    assert result['stages']['summary']['status'] == 'pending'
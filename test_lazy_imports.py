@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+
+import json
+import os
+import subprocess
+import sys
+
+PROBE = """
+import json, sys
+import main
+list(main.iter_from_type("text", "hello"))
+print(json.dumps(sorted(sys.modules)))
+"""
+
+
+def test_text_only_import_skips_heavy_dependencies():
+    env = {k: v for k, v in os.environ.items() if k != 'GEMINI_API_KEY'}
+    output = subprocess.run(
+        [sys.executable, '-c', PROBE], cwd='src', env=env, capture_output=True, text=True, check=True
+    ).stdout
+    modules = set(json.loads(output.strip().splitlines()[-1]))
+
+    for name in ('pymupdf', 'google.generativeai', 'llama_index.readers.web',
+                 'llama_index.llms.google_genai', 'llama_index.embeddings.google_genai'):
+        assert name not in modules, f"{name} imported eagerly"
+
+
+SIDE_EFFECTS = """
+import json
+from llama_index.core import Settings
+from llama_index.core.instrumentation import get_dispatcher
+import main
+print(json.dumps([len(Settings.callback_manager.handlers), len(get_dispatcher().event_handlers)]))
+"""
+
+
+def test_importing_main_installs_no_global_hooks_or_directories(tmp_path):
+    env = {**os.environ, 'CACHE_DIR': str(tmp_path / 'cache')}
+    output = subprocess.run(
+        [sys.executable, '-c', SIDE_EFFECTS], cwd='src', env=env, capture_output=True, text=True, check=True
+    ).stdout
+
+    # configure_models installs the metrics callback and rate limiter; caches are created on first write
+    assert json.loads(output.strip().splitlines()[-1]) == [0, 1]
+    assert not (tmp_path / 'cache').exists()
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+
+import sys
+sys.path.append('src')
+
+from collections import Counter
+
+from llama_index.core.callbacks import CallbackManager
+from llama_index.core.embeddings import MockEmbedding
+
+import metrics
+from embedding_cache import CachedEmbedding, EmbeddingCache
+from metrics import Histogram, MetricsCallbackHandler, collect_timings, observe_stage
+
+
+def test_histogram_renders_cumulative_buckets():
+    histogram = Histogram('test_seconds', 'Test', 'stage', buckets=(0.1, 1.0))
+    histogram.observe('load', 0.05)
+    histogram.observe('load', 0.5)
+    histogram.observe('load', 5.0)
+    lines = histogram.render()
+
+    assert 'test_seconds_bucket{stage="load",le="0.1"} 1' in lines
+    assert 'test_seconds_bucket{stage="load",le="1.0"} 2' in lines
+    assert 'test_seconds_bucket{stage="load",le="+Inf"} 3' in lines
+    assert 'test_seconds_count{stage="load"} 3' in lines
+
+
+def test_collect_timings_sums_stages_and_feeds_histogram(monkeypatch):
+    monkeypatch.setattr(metrics, 'stage_seconds', Histogram('rag_stage_seconds', 'Test', 'stage'))
+    with collect_timings() as timings:
+        observe_stage('embedding', 0.25)
+        observe_stage('embedding', 0.5)
+    observe_stage('embedding', 1.0)
+
+    assert timings == {'embedding': 0.75}
+    assert 'rag_stage_seconds_count{stage="embedding"} 3' in metrics.render()
+
+
+def test_cached_embedding_counts_only_calls_to_the_wrapped_model(tmp_path, monkeypatch):
+    monkeypatch.setattr(metrics, 'counters', Counter())
+    monkeypatch.setattr(metrics, 'stage_seconds', Histogram('test_seconds', 'Test', 'stage'))
+    callback_manager = CallbackManager([MetricsCallbackHandler()])
+    embed_model = CachedEmbedding(
+        MockEmbedding(embed_dim=2, callback_manager=callback_manager),
+        EmbeddingCache(str(tmp_path), "mock"),
+        callback_manager=callback_manager
+    )
+
+    embed_model.get_text_embedding_batch(["a", "b", "c"])
+    embed_model.get_text_embedding_batch(["a", "b", "d"])
+    embed_model.get_text_embedding_batch(["a", "b"])
+    embed_model.get_query_embedding("question")
+
+    # Two batches with cache misses plus the query; the fully cached batch makes no call
+    assert metrics.counters['rag_embedding_calls_total'] == 3
+    assert metrics.counters['rag_embedded_chunks_total'] == 5
+    assert 'test_seconds_count{stage="embedding"} 3' in metrics.stage_seconds.render()
+
+
+def test_propagated_work_on_executor_threads_is_timed(monkeypatch):
+    from concurrent.futures import ThreadPoolExecutor
+
+    monkeypatch.setattr(metrics, 'stage_seconds', Histogram('test_seconds', 'Test', 'stage'))
+    with collect_timings() as timings:
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            list(executor.map(metrics.propagate(lambda _: observe_stage('summary', 0.5)), range(8)))
+            executor.submit(observe_stage, 'ocr', 1.0).result()
+
+    # Only the propagated calls reach the request's timings
+    assert timings == {'summary': 4.0}
@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+
+import io
+import sys
+sys.path.append('src')
+
+from PIL import Image
+
+from ocr import prepare_image
+
+
+def encode(image, image_format, **kwargs):
+    buffer = io.BytesIO()
+    image.save(buffer, format=image_format, **kwargs)
+    return buffer.getvalue()
+
+
+def test_small_images_keep_their_original_bytes():
+    original = encode(Image.new("RGB", (64, 32), "white"), "PNG")
+    assert prepare_image(original, max_dimension=128) == ("image/png", original)
+
+
+def test_large_images_are_always_downscaled():
+    # A 1-bit PNG is smaller than any JPEG, but its dimensions are still too large to send
+    original = encode(Image.new("1", (400, 100), 1), "PNG")
+    mime_type, data = prepare_image(original, max_dimension=100)
+
+    assert len(data) > len(original)
+    assert mime_type == "image/jpeg"
+    with Image.open(io.BytesIO(data)) as image:
+        assert image.size == (100, 25)
+
+
+def test_repeated_images_are_served_from_the_ocr_cache(pipeline, gemini, monkeypatch):
+    image = encode(Image.new("RGB", (300, 200), "white"), "PNG")
+    texts = [pipeline.ocr_image(image), pipeline.ocr_image(image)]
+    # A different OCR_MAX_DIMENSION sends a different image, so it is not a hit
+    monkeypatch.setattr(pipeline, 'OCR_MAX_DIMENSION', 100)
+    texts.append(pipeline.ocr_image(image))
+
+    assert texts == ["Response 1.", "Response 1.", "Response 2."]
+    assert len(gemini.prompts) == 2
+    assert pipeline.ocr_cache.stats() == {"hits": 1, "misses": 2}
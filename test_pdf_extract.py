@@ -0,0 +1,33 @@
+#!/usr/bin/env python3
+
+import sys
+sys.path.append('src')
+
+import pymupdf
+
+import pdf_extract
+
+
+def test_pages_extracted_on_the_pool_come_back_in_order(tmp_path, monkeypatch):
+    path = str(tmp_path / "doc.pdf")
+    with pymupdf.open() as pdf:
+        for number in range(1, 12):
+            pdf.new_page().insert_text((72, 72), f"Page number {number}")
+        pdf.save(path)
+
+    monkeypatch.setattr(pdf_extract, 'PDF_PAGES_PER_TASK', 2)
+    monkeypatch.setattr(pdf_extract, 'PDF_WORKERS', 2)
+    monkeypatch.setattr(pdf_extract, '_pool', None)
+    stats = {}
+    try:
+        pages = list(pdf_extract.iter_pdf_pages(path, stats))
+        pool = pdf_extract._pool
+    finally:
+        if pdf_extract._pool is not None:
+            pdf_extract._pool.shutdown()
+
+    # Six ranges, so the work really went through the worker processes
+    assert pool is not None and pool._mp_context.get_start_method() == "forkserver"
+    assert [number for number, _, _ in pages] == list(range(1, 12))
+    assert [text.strip() for _, text, _ in pages] == [f"Page number {n}" for n in range(1, 12)]
+    assert stats["pages"] == stats["pages_done"] == 11
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+
+import sys
+import time
+sys.path.append('src')
+
+import rate_limit
+from rate_limit import TokenBucketLimiter, call_with_retry
+
+
+def test_limiter_waits_once_budget_is_spent():
+    limiter = TokenBucketLimiter(requests_per_minute=600, tokens_per_minute=10000)
+    started = time.monotonic()
+    for _ in range(605):
+        limiter.acquire(1)
+    elapsed = time.monotonic() - started
+
+    stats = limiter.stats()
+    assert stats["requests"] == 605
+    assert stats["throttled"] >= 1
+    assert 0.3 < elapsed < 3
+
+
+def test_call_with_retry_retries_rate_limit_errors_only(monkeypatch):
+    monkeypatch.setattr(rate_limit, "GEMINI_RETRY_BASE_SECONDS", 0.001)
+    limiter = TokenBucketLimiter(requests_per_minute=1000, tokens_per_minute=100000)
+    attempts = []
+
+    def flaky():
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise RuntimeError("429 RESOURCE_EXHAUSTED")
+        return "ok"
+
+    assert call_with_retry(flaky, tokens=10, limiter=limiter) == "ok"
+    assert limiter.stats()["retries"] == 2
+    assert limiter.stats()["requests"] == 3
+
+    def broken():
+        raise ValueError("bad request")
+
+    try:
+        call_with_retry(broken, tokens=10, limiter=limiter)
+        assert False, "non rate-limit errors should not be retried"
+    except ValueError:
+        pass
+    assert limiter.stats()["retries"] == 2
+
+
+def test_token_budget_throttles_large_prompts():
+    limiter = TokenBucketLimiter(requests_per_minute=10000, tokens_per_minute=6000)
+    limiter.acquire(6000)
+    started = time.monotonic()
+    # The bucket refills at 100 tokens a second
+    waited = limiter.acquire(50)
+    elapsed = time.monotonic() - started
+
+    assert 0.3 < elapsed < 2 and waited > 0.3
+    # A prompt larger than the whole budget is charged the budget rather than waiting forever
+    limiter = TokenBucketLimiter(requests_per_minute=10000, tokens_per_minute=100)
+    assert limiter.acquire(10**6) < 0.01
+    assert limiter.stats()["tokens"] == 100
+
+
+def test_rate_limit_errors_are_raised_once_retries_run_out(monkeypatch):
+    monkeypatch.setattr(rate_limit, "GEMINI_RETRY_BASE_SECONDS", 0.001)
+    monkeypatch.setattr(rate_limit, "GEMINI_MAX_RETRIES", 2)
+    limiter = TokenBucketLimiter(requests_per_minute=1000, tokens_per_minute=100000)
+
+    def overloaded():
+        raise RuntimeError("503 UNAVAILABLE")
+
+    try:
+        call_with_retry(overloaded, tokens=10, limiter=limiter)
+        assert False, "the last rate-limit error should be raised"
+    except RuntimeError:
+        pass
+    stats = limiter.stats()
+    assert (stats["requests"], stats["retries"], stats["rate_limit_errors"]) == (3, 2, 3)
+
+
+def test_event_handler_charges_prompts_and_skips_the_cache_wrapper():
+    from llama_index.core.instrumentation.events.embedding import EmbeddingStartEvent
+    from llama_index.core.instrumentation.events.llm import LLMCompletionStartEvent
+
+    limiter = TokenBucketLimiter(requests_per_minute=1000, tokens_per_minute=100000)
+    handler = rate_limit.LimiterEventHandler(limiter=limiter)
+    handler.handle(LLMCompletionStartEvent(prompt="x" * 400, additional_kwargs={}, model_dict={}))
+    handler.handle(EmbeddingStartEvent(model_dict={"class_name": "CachedEmbedding"}))
+    handler.handle(EmbeddingStartEvent(model_dict={"class_name": "GoogleGenAIEmbedding"}))
+
+    stats = limiter.stats()
+    assert stats["requests"] == 2
+    assert stats["tokens"] == 101
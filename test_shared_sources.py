@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+
+import sys
+import threading
+import time
+sys.path.append('src')
+
+from llama_index.core import Settings, StorageContext, VectorStoreIndex
+from llama_index.core.embeddings import MockEmbedding
+from llama_index.core.llms import MockLLM
+from llama_index.core.schema import Document, TextNode
+
+from session_store import SessionStore
+from shared_sources import SharedSource, SharedSourceRegistry
+from vector_store import NumpyVectorStore
+
+Settings.llm = MockLLM()
+Settings.embed_model = MockEmbedding(embed_dim=8)
+
+
+def make_source(key, texts):
+    index = VectorStoreIndex(
+        nodes=[TextNode(id_=f"{key}-{i}", text=text) for i, text in enumerate(texts)],
+        storage_context=StorageContext.from_defaults(vector_store=NumpyVectorStore()),
+    )
+    return SharedSource(key, index, [Document(text=text) for text in texts], summary="summary", summary_ready=True)
+
+
+def test_concurrent_acquires_build_once_and_free_on_last_release(tmp_path):
+    registry = SharedSourceRegistry(str(tmp_path))
+    builds = []
+
+    def build():
+        builds.append(1)
+        time.sleep(0.05)
+        return make_source("k", ["alpha", "beta"])
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(registry.acquire("k", build))) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(builds) == 1
+    assert len({id(source) for source, _ in results}) == 1
+    assert sorted(shared for _, shared in results) == [False, True, True, True]
+
+    source = results[0][0]
+    for _ in range(3):
+        registry.release(source)
+    assert registry.stats()["sources_in_memory"] == 1
+    registry.release(source)
+    assert registry.stats()["sources_in_memory"] == 0
+    assert registry.memory_bytes() == 0
+
+
+def test_spilled_sessions_share_one_reloaded_source(tmp_path):
+    registry = SharedSourceRegistry(str(tmp_path / "shared"))
+    store = SessionStore(str(tmp_path / "sessions"), memory_budget_bytes=10**9, idle_ttl_seconds=3600, sources=registry)
+    source, _ = registry.acquire("k", lambda: make_source("k", ["alpha", "beta"]))
+    store.put("a", source, "summary")
+    source, shared = registry.acquire("k", lambda: make_source("k", ["unused"]))
+    assert shared
+    store.put("b", source, "summary")
+
+    # Copy-on-write: context added to one session stays out of the shared index
+    overlay = VectorStoreIndex(nodes=[], storage_context=StorageContext.from_defaults(vector_store=NumpyVectorStore()))
+    overlay.insert_nodes([TextNode(id_="extra", text="gamma")])
+    store.get("b").add_overlay(overlay)
+    assert store.get("a").node_count == 2
+    assert store.get("b").node_count == 3
+
+    store.memory_budget_bytes = 0
+    store._enforce_limits()
+    assert registry.stats()["sources_in_memory"] == 0
+
+    a, b = store.get("a"), store.get("b")
+    assert a.source is b.source
+    assert b.node_count == 3
+    assert b.query_engine.retrieve("gamma")
+
+
+def test_workers_sharing_a_catalog_see_each_others_changes(tmp_path):
+    from session_catalog import SessionCatalog
+
+    def worker():
+        # Each worker process has its own registry and store over the same directories
+        return SessionStore(
+            str(tmp_path / "sessions"), memory_budget_bytes=10**9, idle_ttl_seconds=3600,
+            sources=SharedSourceRegistry(str(tmp_path / "shared"), mmap=True),
+            catalog=SessionCatalog(str(tmp_path / "sessions" / "catalog.sqlite3")),
+        )
+
+    first, second = worker(), worker()
+    source, _ = first.sources.acquire("k", lambda: make_source("k", ["alpha", "beta"]))
+    first.put("s", source, None)
+    first.set_summary("s", "summary")
+
+    assert "s" in second
+    session = second.get("s")
+    assert session.summary == "summary"
+    assert session.node_count == 2
+
+    with second.lock("s"):
+        session = second.get("s")
+        overlay = VectorStoreIndex(nodes=[], storage_context=StorageContext.from_defaults(vector_store=NumpyVectorStore()))
+        overlay.insert_nodes([TextNode(id_="extra", text="gamma")])
+        session.add_overlay(overlay)
+        session.summary = "updated"
+        second.touch("s")
+
+    # The first worker's copy is now stale and gets reloaded from disk
+    session = first.get("s")
+    assert session.version == 2
+    assert session.node_count == 3
+    assert session.summary == "updated"
+
+
+def test_spills_are_written_outside_the_store_lock(tmp_path, monkeypatch):
+    registry = SharedSourceRegistry(str(tmp_path / "shared"))
+    store = SessionStore(str(tmp_path / "sessions"), memory_budget_bytes=10**9, idle_ttl_seconds=3600, sources=registry)
+    store.put("a", registry.acquire("ka", lambda: make_source("ka", ["alpha"]))[0], "summary")
+    store.put("b", registry.acquire("kb", lambda: make_source("kb", ["beta"]))[0], "summary")
+    session = store.get("a")
+    with store.lock("a"):
+        pass
+
+    writing, release = threading.Event(), threading.Event()
+    write = store._write
+
+    def slow_write(session, session_dir):
+        writing.set()
+        release.wait(5)
+        write(session, session_dir)
+
+    monkeypatch.setattr(store, "_write", slow_write)
+    store.memory_budget_bytes = 0
+    spill = threading.Thread(target=store.get, args=("b",))
+    spill.start()
+    assert writing.wait(5)
+
+    # Other requests go on while "a" is written, and its idle lock is gone
+    assert store.stats()["sessions_in_memory"] == 1
+    assert "a" in store and "a" not in store._session_locks
+    # Asking for it mid-spill hands back the same session instead of a partial copy
+    store.memory_budget_bytes = 10**9
+    assert store.get("a") is session
+    release.set()
+    spill.join()
+
+    assert store._spilling == {}
+    assert registry.stats()["references"] == 2
+    assert store.get("a").query_engine.retrieve("alpha")
+
+
+def test_sessions_are_reloaded_outside_the_store_lock(tmp_path, monkeypatch):
+    registry = SharedSourceRegistry(str(tmp_path / "shared"))
+    store = SessionStore(str(tmp_path / "sessions"), memory_budget_bytes=10**9, idle_ttl_seconds=3600, sources=registry)
+    store.put("a", registry.acquire("ka", lambda: make_source("ka", ["alpha"]))[0], "summary")
+    store.put("b", registry.acquire("kb", lambda: make_source("kb", ["beta"]))[0], "summary")
+    store.memory_budget_bytes = 0
+    store._enforce_limits()
+    store.memory_budget_bytes = 10**9
+
+    loading, release = threading.Event(), threading.Event()
+    load = store._load
+
+    def slow_load(session_id):
+        loading.set()
+        release.wait(5)
+        return load(session_id)
+
+    monkeypatch.setattr(store, "_load", slow_load)
+    results = []
+    readers = [threading.Thread(target=lambda: results.append(store.get("a"))) for _ in range(2)]
+    for reader in readers:
+        reader.start()
+    assert loading.wait(5)
+
+    # The store lock is free while "a" is read from disk
+    assert store._lock.acquire(timeout=1)
+    store._lock.release()
+    release.set()
+    for reader in readers:
+        reader.join()
+
+    # Both readers end up with the one session kept; the other copy's source reference is released
+    assert results[0] is results[1]
+    assert registry.stats()["references"] == 1
+    assert store.get("a").query_engine.retrieve("alpha")
+
+
+def test_session_locks_outlive_eviction_while_callers_use_them(tmp_path):
+    registry = SharedSourceRegistry(str(tmp_path / "shared"))
+    store = SessionStore(str(tmp_path / "sessions"), memory_budget_bytes=10**9, idle_ttl_seconds=3600, sources=registry)
+    store.put("a", registry.acquire("ka", lambda: make_source("ka", ["alpha"]))[0], "summary")
+    order, holding, release = [], threading.Event(), threading.Event()
+
+    def first():
+        with store.lock("a"):
+            holding.set()
+            release.wait(5)
+            order.append("first")
+
+    def second():
+        with store.lock("a"):
+            order.append("second")
+
+    threads = [threading.Thread(target=first), threading.Thread(target=second)]
+    threads[0].start()
+    assert holding.wait(5)
+    # Evicting the session must not discard the lock the first caller holds
+    store.memory_budget_bytes = 0
+    store._enforce_limits()
+    threads[1].start()
+    time.sleep(0.05)
+    assert order == []
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert order == ["first", "second"]
+    # The lock goes once nobody holds or waits on it
+    assert store._session_locks == {}
+
+
+def test_url_sources_are_keyed_by_the_fetched_page(client, upload, pipeline, monkeypatch):
+    import app
+
+    page = {"text": "The pump runs at four bar of pressure. " * 20}
+    monkeypatch.setattr(pipeline, 'load_url', lambda url: [Document(text=page["text"], id_=url)])
+
+    def stages(session_id):
+        return client.get(f'/api/jobs/{session_id}').get_json()['stages']
+
+    first = upload(url="https://example.com/pump")
+    app.sessions.memory_budget_bytes = 0
+    app.sessions._enforce_limits()
+    app.sessions.memory_budget_bytes = 10**9
+
+    # The page changed: the new upload is built from the new text, not the persisted source
+    page["text"] = "The pump runs at six bar of pressure. " * 20
+    second = upload(url="https://example.com/pump")
+    assert stages(second)['index']['shared'] is False
+    assert "six bar" in app.sessions.get(second).source.documents[0].text
+    assert "four bar" in app.sessions.get(first).source.documents[0].text
+
+    third = upload(url="https://example.com/pump")
+    assert stages(third)['index']['shared'] is True
+    assert stages(third)['load']['status'] == 'done'
+    assert app.sessions.get(third).source is app.sessions.get(second).source
@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+
+import sys
+from types import SimpleNamespace
+sys.path.append('src')
+
+from llama_index.core.schema import NodeWithScore, TextNode
+
+
+def fake_session(*scores):
+    nodes = [NodeWithScore(node=TextNode(text="x"), score=score) for score in scores]
+    return SimpleNamespace(query_engine=SimpleNamespace(retrieve=lambda query_bundle: nodes))
+
+
+def test_retrieval_score_thresholds_choose_the_fallback(client, upload, monkeypatch):
+    import app
+
+    monkeypatch.setattr(app, 'FALLBACK_SKIP_SCORE', 0.45)
+    monkeypatch.setattr(app, 'FALLBACK_RACE_SCORE', 0.6)
+    plans = [
+        app.plan_fallback(fake_session(*scores), None)[2]
+        for scores in ((), (0.2, 0.44), (0.45,), (0.59, 0.1), (0.6,), (0.3, 0.9))
+    ]
+    assert plans == ['web', 'web', 'race', 'race', 'document', 'document']
+
+    searches = []
+    monkeypatch.setattr(app, 'answer_from_web', lambda question: searches.append(question) or {
+        "answer": "From the web", "source": "google_search"
+    })
+    session_id = upload('The pump runs at four bar of pressure. ' * 20)
+
+    def ask(question, skip, race):
+        monkeypatch.setattr(app, 'FALLBACK_SKIP_SCORE', skip)
+        monkeypatch.setattr(app, 'FALLBACK_RACE_SCORE', race)
+        # Every question has the same mock embedding, so it would otherwise be a semantic cache hit
+        app.sessions.get(session_id).answer_cache.clear()
+        result = client.post('/api/query', json={
+            'session_id': session_id, 'question': question, 'speculative': True
+        }).get_json()
+        return [result['source'], 'document_answer' in result, len(searches)]
+
+    # MockEmbedding scores every chunk 1.0, so the thresholds alone pick the plan.
+    # Below the skip score the document is never synthesized; the web answer is returned alone
+    assert ask('skip the document', 2.0, 3.0) == ['google_search', False, 1]
+    # A race starts the search alongside synthesis and returns it only when the document has no answer
+    assert ask('answered by the document', 0.5, 2.0) == ['document', False, 2]
+    monkeypatch.setattr(app, 'is_answer_not_found', lambda text: True)
+    assert ask('not in the document', 0.5, 2.0) == ['google_search', True, 3]
@@ -0,0 +1,26 @@
+#!/usr/bin/env python3
+
+import json
+
+
+def stream(client, session_id, question):
+    response = client.post('/api/query-stream', json={'session_id': session_id, 'question': question})
+    body = response.get_data(as_text=True)
+    return response.mimetype, [json.loads(event[len('data: '):]) for event in body.split('\n\n') if event]
+
+
+def test_answers_stream_as_token_events_then_done(client, upload):
+    session_id = upload('The pump runs at four bar of pressure. ' * 20)
+    mimetype, events = stream(client, session_id, 'What pressure does the pump run at?')
+
+    assert mimetype == 'text/event-stream'
+    assert [event['type'] for event in events] == ['token'] * (len(events) - 1) + ['done']
+    assert len(events) > 2
+    done = events[-1]
+    assert done['success'] and not done['cached'] and 'answer' not in done
+    answer = ''.join(event['token'] for event in events[:-1])
+
+    # The repeat is served from the answer cache as a single token event
+    _, cached_events = stream(client, session_id, 'What pressure does the pump run at?')
+    assert cached_events[0] == {'type': 'token', 'token': answer}
+    assert cached_events[1]['type'] == 'done' and cached_events[1]['cache_match'] == 'exact'
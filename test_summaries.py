@@ -0,0 +1,32 @@
+#!/usr/bin/env python3
+
+import sys
+sys.path.append('src')
+
+from llama_index.core.schema import Document
+
+
+def test_long_content_is_summarized_by_sections_then_merged(pipeline, gemini, monkeypatch):
+    monkeypatch.setattr(pipeline, 'SUMMARY_CHUNK_CHARS', 300)
+    paragraphs = [f"Paragraph {i} explains how the pump handles pressure stage {i}. " * 3 for i in range(8)]
+    documents = [Document(text="\n\n".join(paragraphs))]
+    sections = pipeline.split_text(documents[0].text, 300)
+
+    summary = pipeline.generate_summary(documents, "pdf")
+    calls = list(gemini.prompts)
+
+    assert len(sections) > 1 and all(len(section) <= 300 for section in sections)
+    # One call per section in the map step, then one call over the joined section summaries
+    assert len(calls) == len(sections) + 1
+    assert sorted(call.split("\n\n", 1)[1] for call in calls[:-1]) == sorted(sections)
+    assert "summaries of its consecutive sections" in calls[-1]
+    assert summary == f"Response {len(calls)}."
+
+    # The cache answers the repeat; merging a first summary needs no call, a second needs one
+    assert pipeline.generate_summary(documents, "pdf") == summary
+    assert pipeline.merge_summaries(None, "New.") == "New."
+    assert len(gemini.prompts) == len(calls)
+    pipeline.merge_summaries(summary, "New.")
+    assert len(gemini.prompts) == len(calls) + 1
+    assert gemini.prompts[-1].startswith("Combine these two summaries")
+    assert gemini.prompts[-1].endswith(f"{summary}\n\nNew.")
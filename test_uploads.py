@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+
+import io
+import sys
+sys.path.append('src')
+
+import pytest
+
+from uploads import ChunkedUploads
+
+
+def test_chunked_upload_resumes_and_completes_once(tmp_path):
+    uploads = ChunkedUploads(str(tmp_path), max_bytes=1000)
+    data = bytes(range(256)) * 3
+    upload_id = uploads.create("doc.pdf", len(data))
+
+    assert uploads.write(upload_id, 0, io.BytesIO(data[:300])) == 300
+    # A dropped connection leaves a partial chunk; the client resumes from ``received``
+    uploads.write(upload_id, 300, io.BytesIO(data[300:350]))
+    received = uploads.status(upload_id)["received"]
+    assert received == 350
+    with pytest.raises(ValueError):
+        uploads.write(upload_id, received + 10, io.BytesIO(data[received + 10:]))
+    with pytest.raises(ValueError):
+        uploads.complete(upload_id)
+
+    assert uploads.write(upload_id, received, io.BytesIO(data[received:])) == len(data)
+    path, filename = uploads.complete(upload_id)
+    with open(path, "rb") as f:
+        assert f.read() == data
+    assert filename == "doc.pdf"
+    with pytest.raises(KeyError):
+        uploads.complete(upload_id)
+
+    uploads.discard(upload_id)
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_chunked_upload_limits(tmp_path):
+    uploads = ChunkedUploads(str(tmp_path), max_bytes=100)
+    with pytest.raises(ValueError):
+        uploads.create("big.pdf", 101)
+
+    upload_id = uploads.create("small.pdf", 10)
+    with pytest.raises(ValueError):
+        uploads.write(upload_id, 0, io.BytesIO(b"x" * 11))
+    assert uploads.status(upload_id)["received"] == 0
+
+    for bad_id in ("../etc", "nothex", None):
+        with pytest.raises(KeyError):
+            uploads.status(bad_id)
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+
+import sys
+sys.path.append('src')
+
+import numpy as np
+from llama_index.core.schema import NodeRelationship, RelatedNodeInfo, TextNode
+from llama_index.core.vector_stores.types import VectorStoreQuery
+
+from vector_store import NumpyVectorStore, load_vector_store
+
+
+def make_nodes(vectors, ref_doc_id="doc"):
+    return [
+        TextNode(
+            id_=f"{ref_doc_id}-{i}", text=str(i), embedding=v.tolist(),
+            relationships={NodeRelationship.SOURCE: RelatedNodeInfo(node_id=ref_doc_id)}
+        )
+        for i, v in enumerate(vectors)
+    ]
+
+
+def brute_force_top_k(vectors, query, k):
+    normalized = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    scores = normalized @ (query / np.linalg.norm(query))
+    return list(np.argsort(-scores)[:k])
+
+
+def test_numpy_vector_store_matches_brute_force():
+    rng = np.random.default_rng(0)
+    vectors = rng.normal(size=(200, 32)).astype(np.float32)
+    query = rng.normal(size=32).astype(np.float32)
+
+    for quantization in ("float32", "int8"):
+        store = NumpyVectorStore(quantization=quantization)
+        # Two adds exercise the in-place append path
+        store.add(make_nodes(vectors[:50]))
+        store.add(make_nodes(vectors[50:], ref_doc_id="more"))
+        result = store.query(VectorStoreQuery(query_embedding=query.tolist(), similarity_top_k=5))
+
+        expected = brute_force_top_k(vectors, query, 5)
+        ids = [f"doc-{i}" if i < 50 else f"more-{i - 50}" for i in expected]
+        if quantization == "float32":
+            assert result.ids == ids
+        else:
+            assert result.ids[0] == ids[0]
+
+
+def test_query_batch_matches_single_queries():
+    rng = np.random.default_rng(2)
+    queries = rng.normal(size=(7, 16)).astype(np.float32)
+
+    for quantization in ("float32", "int8"):
+        store = NumpyVectorStore(quantization=quantization)
+        store.add(make_nodes(rng.normal(size=(100, 16)).astype(np.float32)))
+        batch = store.query_batch(queries, similarity_top_k=3, block_size=3)
+
+        assert len(batch) == len(queries)
+        for query, result in zip(queries, batch):
+            single = store.query(VectorStoreQuery(query_embedding=query.tolist(), similarity_top_k=3))
+            assert result.ids == single.ids
+            assert np.allclose(result.similarities, single.similarities, atol=1e-5)
+
+
+def test_numpy_vector_store_delete_and_persist(tmp_path):
+    rng = np.random.default_rng(1)
+    store = NumpyVectorStore()
+    store.add(make_nodes(rng.normal(size=(10, 8)).astype(np.float32), ref_doc_id="a"))
+    store.add(make_nodes(rng.normal(size=(5, 8)).astype(np.float32), ref_doc_id="b"))
+    store.delete("a")
+    assert store.node_count == 5
+
+    store.persist(str(tmp_path / "default__vector_store.json"))
+    loaded = load_vector_store(str(tmp_path), mmap=True)
+    query = VectorStoreQuery(query_embedding=rng.normal(size=8).tolist(), similarity_top_k=3)
+    assert loaded.query(query).ids == store.query(query).ids
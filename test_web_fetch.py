@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+sys.path.append('src')
+
+from web_fetch import WebFetcher
+
+
+class PageHandler(BaseHTTPRequestHandler):
+    requests_seen = []
+    delay = 0.2
+
+    def do_GET(self):
+        PageHandler.requests_seen.append(self.path)
+        etag = f'"{self.path}"'
+        if self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.end_headers()
+            return
+        time.sleep(self.delay)
+        body = f"<html><body><h1>Page {self.path}</h1><p>Hello</p></body></html>".encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html')
+        self.send_header('ETag', etag)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def test_fetch_many_is_concurrent_and_revalidates(tmp_path):
+    server = ThreadingHTTPServer(('127.0.0.1', 0), PageHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f'http://127.0.0.1:{server.server_port}'
+    urls = [f'{base}/page{i}' for i in range(4)]
+    try:
+        fetcher = WebFetcher(str(tmp_path), max_workers=4, per_host=4)
+        started = time.perf_counter()
+        texts = fetcher.fetch_many(urls)
+        elapsed = time.perf_counter() - started
+
+        assert [t.strip().splitlines()[0] for t in texts] == [f'# Page /page{i}' for i in range(4)]
+        # Four 0.2s pages fetched in parallel, not one after another
+        assert elapsed < 0.6
+        assert fetcher.stats() == {'fetched': 4, 'not_modified': 0}
+
+        # A fresh fetcher reads the disk cache and gets 304s for unchanged pages
+        cached = WebFetcher(str(tmp_path))
+        assert cached.fetch_many(urls) == texts
+        assert cached.stats() == {'fetched': 0, 'not_modified': 4}
+    finally:
+        server.shutdown()
+
+
+def test_per_host_limit_serializes_requests(tmp_path):
+    server = ThreadingHTTPServer(('127.0.0.1', 0), PageHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f'http://127.0.0.1:{server.server_port}'
+    try:
+        fetcher = WebFetcher(str(tmp_path), max_workers=4, per_host=1)
+        started = time.perf_counter()
+        fetcher.fetch_many([f'{base}/slow{i}' for i in range(3)])
+        assert time.perf_counter() - started >= 0.6
+    finally:
+        server.shutdown()